@@ -11,10 +11,14 @@ from flask_socketio import SocketIO
 
 from app.utils.resource import resource_path
 from app.utils.ip import get_local_ip
-from app.core.config import SECRET_KEY, UPLOAD_FOLDER, TEMP_CHUNKS_DIR, SERVER_PORT
+from app.core.config import (
+    SECRET_KEY, UPLOAD_FOLDER, TEMP_CHUNKS_DIR, SERVER_PORT,
+    CHUNK_SIZE, CHUNKED_UPLOAD_THRESHOLD, UPLOAD_MAX_PARALLEL_CHUNKS
+)
 from app.services.file.storage import StorageService
-from app.services.cache.cache_service import clean_caches, get_files_info
+from app.services.cache.cache_service import clean_caches, get_files_info, start_file_watcher
 from app.core.error_handler import register_error_handlers
+from app.core.async_runtime import start_async_runtime
 
 # 创建日志对象
 logger = logging.getLogger(__name__)
@@ -49,6 +53,12 @@ def create_app():
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
     os.makedirs(TEMP_CHUNKS_DIR, exist_ok=True)
 
+    # 启动共享的异步IO运行时，分块处理等协程都提交到该事件循环
+    start_async_runtime()
+
+    # 监视上传目录，文件列表从内存索引读取
+    start_file_watcher()
+
     # 注册统一错误处理器
     register_error_handlers(app)
 
@@ -58,7 +68,12 @@ def create_app():
         return render_template('index.html',
                             server_ip=get_local_ip(),
                             server_port=SERVER_PORT,
-                            files=get_files_info(force_refresh=False))
+                            files=get_files_info(force_refresh=False),
+                            upload_config={
+                                'chunkSize': CHUNK_SIZE,
+                                'chunkedUploadThreshold': CHUNKED_UPLOAD_THRESHOLD,
+                                'maxParallelChunks': UPLOAD_MAX_PARALLEL_CHUNKS
+                            })
 
     # 注册API路由
     from app.api.v1 import register_routes as register_api_v1_routes
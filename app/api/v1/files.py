@@ -9,16 +9,24 @@
 import logging
 import time
 import os
-from flask import jsonify, send_from_directory, request
+from flask import jsonify, request
+from flask_socketio import emit
 
 from app.services.file.storage import StorageService
 from app.services.file.metadata import MetadataService
-from app.services.cache.cache_service import get_files_info
-from app.core.exceptions import api_error_handler, FileNotFoundError, FileDeleteError
+from app.services.file.download import DownloadService
+from app.services.cache.cache_service import (
+    get_files_snapshot, query_files_info, set_files_notifier, sync_files_index, MAX_FILES_PAGE_SIZE
+)
+from app.core.exceptions import api_error_handler, FileNotFoundError, FileDeleteError, FileTransferError
+from app.core.config import FILES_PAGE_SIZE
 
 # 创建日志对象
 logger = logging.getLogger(__name__)
 
+# 任一参数出现时按分页方式返回文件列表
+PAGINATION_PARAMS = ('limit', 'cursor', 'sort', 'order', 'prefix', 'ext')
+
 def register_routes(app, socketio):
     """注册文件相关路由
 
@@ -27,37 +35,80 @@ def register_routes(app, socketio):
         socketio: Socket.IO实例
     """
 
+    # 文件索引的每次变化以增量（files_delta 事件）通知所有客户端
+    set_files_notifier(lambda delta: socketio.emit('files_delta', delta))
+
     @app.route('/api/v1/files', methods=['GET'])
     @api_error_handler
     def get_files():
-        """返回所有文件的信息"""
+        """返回文件信息
+
+        不带分页参数时返回所有文件；带有 limit、cursor、sort、order、prefix 或 ext 参数时按游标分页返回
+        """
         # 检查是否需要强制刷新
         force_refresh = request.args.get('force_refresh', '').lower() in ['true', '1', 'yes']
 
-        # 获取文件列表
-        files = get_files_info(force_refresh=force_refresh)
+        if any(name in request.args for name in PAGINATION_PARAMS):
+            return get_files_page(force_refresh)
+
+        # 获取文件列表及其版本号
+        files, revision = get_files_snapshot(force_refresh=force_refresh)
 
         # 返回文件列表
         return jsonify({
             'success': True,
             'files': files,
+            'revision': revision,
             'cache_time': time.time(),
             'current_time': time.time(),
             'cache_ttl': 5  # 缓存有效期（秒）
         })
 
+    def get_files_page(force_refresh):
+        """按游标分页返回文件信息"""
+        limit = request.args.get('limit', FILES_PAGE_SIZE, type=int)
+        if limit < 1 or limit > MAX_FILES_PAGE_SIZE:
+            raise FileTransferError(f"limit 必须在 1 到 {MAX_FILES_PAGE_SIZE} 之间", code=400)
+
+        order = request.args.get('order', 'asc').lower()
+        if order not in ('asc', 'desc'):
+            raise FileTransferError("order 必须是 asc 或 desc", code=400)
+
+        extensions = [ext for ext in request.args.get('ext', '').split(',') if ext.strip()]
+
+        try:
+            files, next_cursor, total = query_files_info(
+                sort=request.args.get('sort', 'name'),
+                descending=order == 'desc',
+                limit=limit,
+                cursor=request.args.get('cursor') or None,
+                prefix=request.args.get('prefix') or None,
+                extensions=extensions,
+                force_refresh=force_refresh
+            )
+        except ValueError as e:
+            raise FileTransferError(str(e), code=400)
+
+        return jsonify({
+            'success': True,
+            'files': files,
+            'next_cursor': next_cursor,
+            'total': total,
+            'current_time': time.time()
+        })
+
     @app.route('/api/v1/files/<filename>', methods=['GET'])
     @api_error_handler
     def download_file(filename):
-        """下载文件"""
+        """下载文件，支持 Range 断点续传和分段并行下载"""
         # 验证文件是否存在
+        filename = os.path.basename(filename)
         file_path = StorageService.get_file_path(filename)
-        if not os.path.exists(file_path):
+        if not os.path.isfile(file_path):
             raise FileNotFoundError(filename)
 
-        # 从上传目录发送文件
-        from app.core.config import UPLOAD_FOLDER
-        return send_from_directory(UPLOAD_FOLDER, filename, as_attachment=True)
+        # 根据 Range 和条件请求头返回完整文件、部分内容或 304
+        return DownloadService.send_file(request, file_path, filename)
 
     @app.route('/api/v1/files/<filename>', methods=['DELETE'])
     @api_error_handler
@@ -66,11 +117,8 @@ def register_routes(app, socketio):
         # 使用StorageService删除文件
         StorageService.delete_file(filename)
 
-        # 获取最新的文件列表
-        files = get_files_info(force_refresh=True)
-
-        # 通知所有客户端文件已更新
-        socketio.emit('files_updated', {'files': files})
+        # 同步文件索引，变化以增量通知所有客户端
+        sync_files_index()
 
         return jsonify(success=True)
 
@@ -81,19 +129,26 @@ def register_routes(app, socketio):
         # 使用StorageService删除所有文件
         success, deleted_count = StorageService.delete_all_files()
 
-        # 获取最新的文件列表
-        files = get_files_info(force_refresh=True)
-
-        # 通知所有客户端文件已更新
-        socketio.emit('files_updated', {'files': files})
+        # 同步文件索引，变化以增量通知所有客户端
+        sync_files_index()
 
         return jsonify(success=True, deleted_count=deleted_count)
 
     # Socket.IO 事件处理
+    def send_files_snapshot():
+        """向当前客户端发送完整的文件列表及其版本号，之后的变化通过 files_delta 增量接收"""
+        files, revision = get_files_snapshot()
+        emit('files_updated', {'files': files, 'revision': revision})
+
     @socketio.on('connect')
     def handle_connect():
-        # 连接时发送最新的文件列表，强制刷新缓存
-        socketio.emit('files_updated', {'files': get_files_info(force_refresh=True)})
+        # 连接时只向该客户端发送文件列表快照（由目录监视器维护，无需重新读取目录）
+        send_files_snapshot()
+
+    @socketio.on('files_resync')
+    def handle_files_resync():
+        # 客户端错过了增量（版本号不连续）时请求重新发送快照
+        send_files_snapshot()
 
     @socketio.on('upload_progress')
     def handle_upload_progress(data):
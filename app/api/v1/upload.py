@@ -7,15 +7,19 @@
 """
 
 import os
+import time
 import logging
-import asyncio
 from flask import request, jsonify
 
 from app.core.file_transfer.transfer_manager import TransferManager
 from app.services.upload.chunk import ChunkUploadService
 from app.services.upload.validator import UploadValidatorService
+from app.services.upload.chunk_sizing import ChunkSizingService
 from app.core.exceptions import api_error_handler, FileUploadError, ChunkUploadError
-from app.services.cache.cache_service import get_files_info
+from app.core.async_runtime import run_coroutine
+from app.core.file_transfer.merge_queue import set_merge_notifier
+from app.core.config import UPLOAD_STATUS
+from app.services.cache.cache_service import sync_files_index
 
 # 创建日志对象
 logger = logging.getLogger(__name__)
@@ -28,6 +32,16 @@ def register_routes(app, socketio):
         socketio: Socket.IO实例
     """
     
+    def notify_merge_event(event):
+        """将后台合并的进度和结果发送给所有客户端"""
+        socketio.emit('upload_state_updated', event)
+        if event.get('status') == UPLOAD_STATUS['COMPLETED']:
+            # 合并后的文件以增量（files_delta 事件）通知所有客户端
+            sync_files_index()
+    
+    # 后台合并任务的进度和结果通过 upload_state_updated 事件通知客户端
+    set_merge_notifier(notify_merge_event)
+    
     @app.route('/api/v1/upload', methods=['POST'])
     @api_error_handler
     def upload_file():
@@ -65,58 +79,86 @@ def register_routes(app, socketio):
         # 使用ChunkUploadService保存文件
         ChunkUploadService.save_file(file, filename)
         
-        # 通知所有客户端文件已更新
-        socketio.emit('files_updated', {'files': get_files_info(force_refresh=True)})
+        # 同步文件索引，新文件以增量通知所有客户端
+        sync_files_index()
         return jsonify(success=True, filename=filename)
     
     @app.route('/api/v1/upload/chunk', methods=['POST'])
     @api_error_handler
     def upload_chunk():
-        """处理分块上传"""
+        """处理分块上传
+
+        支持两种请求格式：
+        - multipart/form-data：参数在表单中，块数据在 file 字段中
+        - application/octet-stream：参数在查询字符串中，请求体即块数据，不经过 multipart 解析和缓存
+
+        提供 offset 参数时按字节偏移上传可变长度的分块，此时 chunk_size 为块粒度，
+        块编号和总块数由偏移和文件大小计算得出。
+        """
+        # 原始请求体模式下不访问 request.form，避免触发表单解析
+        raw_body = request.mimetype == 'application/octet-stream'
+        params = request.args if raw_body else request.form
+
         # 获取参数
-        chunk_number = int(request.form.get('chunk_number', 0))
-        total_chunks = int(request.form.get('total_chunks', 0))
-        filename = request.form.get('filename', '')
+        chunk_number = params.get('chunk_number', 0, type=int)
+        total_chunks = params.get('total_chunks', 0, type=int)
+        filename = params.get('filename', '')
+        # 直写模式参数（可选）
+        file_size = params.get('file_size', type=int)
+        chunk_size = params.get('chunk_size', type=int)
+        # 可变长度分块的写入偏移（可选）
+        offset = params.get('offset', type=int)
+        if offset is not None and file_size and chunk_size and chunk_size > 0:
+            chunk_number = offset // chunk_size
+            total_chunks = -(-file_size // chunk_size)
         
         # 检查参数
-        if not filename or 'file' not in request.files:
+        if not filename or (not raw_body and 'file' not in request.files):
             raise FileUploadError('Invalid request parameters')
         
         # 确保文件名安全
         filename = os.path.basename(filename)
-        chunk = request.files['file']
         
         # 验证分块上传请求
         UploadValidatorService.validate_chunk_request(filename, chunk_number, total_chunks)
+        if file_size is not None or chunk_size is not None:
+            UploadValidatorService.validate_direct_write_request(file_size, chunk_size, total_chunks)
         
-        # 读取块数据
-        chunk_data = chunk.read()
+        # 块数据以流的形式传递，在IO线程池中按缓冲区边读边写
+        chunk_stream = request.stream if raw_body else request.files['file'].stream
         
-        # 使用ChunkUploadService异步处理分块上传
-        success, result = asyncio.run(ChunkUploadService.process_upload_chunk(filename, chunk_number, total_chunks, chunk_data))
+        # 将分块处理提交到共享的异步IO运行时并等待结果
+        started = time.monotonic()
+        success, result = run_coroutine(ChunkUploadService.process_upload_chunk(
+            filename, chunk_number, total_chunks, chunk_stream, file_size=file_size, chunk_size=chunk_size,
+            offset=offset))
         
         if success:
-            # 如果状态为完成，通知所有客户端文件已更新
-            if result.get('status') == 'completed':
-                socketio.emit('files_updated', {'files': get_files_info(force_refresh=True)})
+            # 记录吞吐量样本，用于推荐分块大小
+            ChunkSizingService.record_throughput(request.content_length, time.monotonic() - started)
             
+            # 状态为 merging 时文件在后台合并，完成后通过 upload_state_updated 事件通知
             return jsonify(success=True, filename=filename, status=result.get('status', 'chunk_uploaded'))
         else:
             # 如果是暂停状态，返回特定的暂停标记
             if result.get('paused'):
                 return jsonify(success=False, error='Upload paused', paused=True)
             
-            # 如果是合并失败，返回缺失块信息
-            if result.get('merge_failed'):
-                return jsonify(
-                    success=False,
-                    error='Failed to merge chunks',
-                    merge_failed=True,
-                    missing_chunks=result.get('missing_chunks', [])
-                )
-            
             raise FileUploadError(result.get('error', 'Unknown error'))
     
+    @app.route('/api/v1/upload/params', methods=['GET'])
+    @api_error_handler
+    def get_upload_params():
+        """获取推荐的分块上传参数"""
+        file_size = request.args.get('file_size', type=int)
+        throughput = request.args.get('throughput', type=float)
+        
+        if not file_size or file_size <= 0:
+            raise FileUploadError('Invalid file size')
+        
+        params = ChunkSizingService.recommend(file_size, throughput)
+        return jsonify(success=True, **params)
+    
     @app.route('/api/v1/upload/<filename>/cancel', methods=['POST'])
     @api_error_handler
     def cancel_upload(filename):
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+异步IO运行时模块
+提供一个长期运行的事件循环线程，供请求线程提交协程任务
+"""
+
+import asyncio
+import logging
+import threading
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, Optional
+
+from app.core.config import ASYNC_IO_WORKERS
+
+# 创建日志对象
+logger = logging.getLogger(__name__)
+
+
+class AsyncRuntime:
+    """共享的异步IO运行时
+
+    在后台线程中运行一个事件循环，并为其设置有界的默认线程池，
+    aiofiles 和 run_in_executor 的阻塞IO都在该线程池中执行。
+    请求线程通过 submit/run 提交协程，避免每个请求都创建和销毁事件循环。
+    """
+
+    def __init__(self, max_workers: int = ASYNC_IO_WORKERS):
+        """初始化运行时
+
+        Args:
+            max_workers: 默认线程池的最大线程数
+        """
+        self.max_workers = max_workers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        """运行时是否正在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """启动事件循环线程，重复调用不会创建新的线程"""
+        with self._lock:
+            if self.is_running:
+                return
+
+            loop = asyncio.new_event_loop()
+            executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='async-io')
+            loop.set_default_executor(executor)
+            ready = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=run_loop, name='async-runtime', daemon=True)
+            thread.start()
+            ready.wait()
+
+            self._loop = loop
+            self._executor = executor
+            self._thread = thread
+
+            logger.info(f"异步IO运行时已启动，线程池大小: {self.max_workers}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止事件循环线程并关闭线程池
+
+        Args:
+            timeout: 等待事件循环线程退出的时间（秒）
+        """
+        with self._lock:
+            if not self.is_running:
+                return
+
+            loop, thread, executor = self._loop, self._thread, self._executor
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            if not thread.is_alive():
+                loop.close()
+            executor.shutdown(wait=False)
+
+            self._loop = None
+            self._thread = None
+            self._executor = None
+            logger.info("异步IO运行时已停止")
+
+    def submit(self, coro: Coroutine) -> Future:
+        """提交协程到事件循环
+
+        Args:
+            coro: 要执行的协程
+
+        Returns:
+            concurrent.futures.Future: 协程的执行结果
+        """
+        if not self.is_running:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """提交协程并等待其结果
+
+        Args:
+            coro: 要执行的协程
+            timeout: 等待时间（秒），为None时一直等待
+
+        Returns:
+            协程的返回值
+        """
+        return self.submit(coro).result(timeout)
+
+
+# 全局异步IO运行时
+async_runtime = AsyncRuntime()
+
+
+def start_async_runtime() -> AsyncRuntime:
+    """启动全局异步IO运行时
+
+    Returns:
+        AsyncRuntime: 全局异步IO运行时
+    """
+    async_runtime.start()
+    return async_runtime
+
+
+def stop_async_runtime() -> None:
+    """停止全局异步IO运行时"""
+    async_runtime.stop()
+
+
+def run_coroutine(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """在全局异步IO运行时中执行协程并等待结果
+
+    Args:
+        coro: 要执行的协程
+        timeout: 等待时间（秒），为None时一直等待
+
+    Returns:
+        协程的返回值
+    """
+    return async_runtime.run(coro, timeout)
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """在当前事件循环的默认线程池中执行阻塞函数
+
+    共享事件循环中的协程不能直接执行阻塞IO，否则会阻塞所有请求
+
+    Args:
+        func: 阻塞函数
+        *args: 位置参数
+        **kwargs: 关键字参数
+
+    Returns:
+        函数的返回值
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
@@ -75,6 +75,49 @@ class BaseConfig(BaseModel):
         description="启用分块上传的文件大小阈值（字节）"
     )
 
+    UPLOAD_MAX_PARALLEL_CHUNKS: int = Field(
+        default=4,
+        ge=1,
+        le=16,
+        description="浏览器端同时上传的分块请求数"
+    )
+
+    ADAPTIVE_CHUNK_ENABLED: bool = Field(
+        default=True,
+        description="是否启用自适应分块大小（需要直写模式，客户端按字节偏移上传可变长度的分块）"
+    )
+
+    ADAPTIVE_CHUNK_MIN_SIZE: int = Field(
+        default=1 * MB,  # 1MB
+        ge=64 * KB,
+        le=16 * MB,
+        description="自适应分块的最小大小（字节），同时作为直写位图的块粒度"
+    )
+
+    ADAPTIVE_CHUNK_MAX_SIZE: int = Field(
+        default=64 * MB,  # 64MB
+        ge=1 * MB,
+        le=256 * MB,
+        description="自适应分块的最大大小（字节）"
+    )
+
+    ADAPTIVE_CHUNK_TARGET_SECONDS: int = Field(
+        default=2,  # 2秒
+        ge=1,
+        le=30,
+        description="自适应分块的目标请求耗时（秒），客户端据此增大或减小分块"
+    )
+
+    DIRECT_WRITE_ENABLED: bool = Field(
+        default=True,
+        description="是否启用分块直写模式（分块直接写入预分配的目标文件，无需合并）"
+    )
+
+    DIRECT_WRITE_PREALLOCATE: bool = Field(
+        default=True,
+        description="直写模式下是否预分配磁盘空间（关闭时创建稀疏文件）"
+    )
+
     TEMP_FILES_MAX_AGE: int = Field(
         default=2,  # 2小时
         ge=1,
@@ -87,7 +130,53 @@ class BaseConfig(BaseModel):
         default=5,  # 5秒
         ge=1,
         le=3600,
-        description="文件列表缓存有效期（秒）"
+        description="文件列表缓存有效期（秒），使用轮询方式监视上传目录时为扫描间隔"
+    )
+
+    FILES_PAGE_SIZE: int = Field(
+        default=200,
+        ge=1,
+        le=1000,
+        description="分页查询文件列表时的默认每页数量"
+    )
+
+    FILES_WATCHER: str = Field(
+        default="auto",
+        description="上传目录的监视方式：auto（Linux 使用 inotify，其他平台轮询）、inotify、polling 或 off（按有效期重新读取目录）"
+    )
+
+    # 异步IO配置
+    ASYNC_IO_WORKERS: int = Field(
+        default=8,
+        ge=1,
+        le=64,
+        description="异步IO运行时线程池大小（处理分块写入和合并等阻塞IO）"
+    )
+
+    STREAM_BUFFER_SIZE: int = Field(
+        default=256 * KB,  # 256KB
+        ge=4 * KB,
+        le=16 * MB,
+        description="流式写入分块时每次读取的缓冲区大小（字节）"
+    )
+
+    MERGE_WORKERS: int = Field(
+        default=2,
+        ge=1,
+        le=16,
+        description="后台合并分块和提交直写文件的工作线程数（同时进行的合并任务数）"
+    )
+
+    DOWNLOAD_MAX_RANGES: int = Field(
+        default=16,
+        ge=1,
+        le=256,
+        description="下载请求的 Range 头中允许的最大范围数，超过时返回完整文件"
+    )
+
+    UPLOAD_SESSION_PERSISTENT: bool = Field(
+        default=True,
+        description="是否将上传会话持久化到临时分块目录下的 SQLite（WAL模式）数据库，服务重启后可继续上传"
     )
 
     # 日志配置
@@ -120,6 +209,14 @@ class BaseConfig(BaseModel):
             raise ValueError(f"无效的日志级别，必须是以下之一: {', '.join(valid_levels)}")
         return v
 
+    @validator('FILES_WATCHER')
+    def validate_files_watcher(cls, v):
+        """验证上传目录的监视方式"""
+        valid_modes = ['auto', 'inotify', 'polling', 'off']
+        if v not in valid_modes:
+            raise ValueError(f"无效的监视方式，必须是以下之一: {', '.join(valid_modes)}")
+        return v
+
     @validator('CHUNKED_UPLOAD_THRESHOLD')
     def validate_threshold(cls, v, values):
         """验证分块上传阈值"""
@@ -129,6 +226,13 @@ class BaseConfig(BaseModel):
             raise ValueError("分块上传阈值必须小于或等于最大内容长度")
         return v
 
+    @validator('ADAPTIVE_CHUNK_MAX_SIZE')
+    def validate_adaptive_chunk_max_size(cls, v, values):
+        """验证自适应分块的最大大小"""
+        if 'ADAPTIVE_CHUNK_MIN_SIZE' in values and v < values['ADAPTIVE_CHUNK_MIN_SIZE']:
+            raise ValueError("自适应分块的最大大小必须大于或等于最小大小")
+        return v
+
     @validator('CHUNK_SIZE')
     def validate_chunk_size(cls, v, values):
         """验证分块大小"""
@@ -8,6 +8,7 @@ from datetime import datetime
 
 from app.config import UPLOAD_FOLDER
 from app.services.cache.cache_service import invalidate_files_cache, get_files_info
+from app.utils.fs import scan_files
 
 # 创建日志对象
 logger = logging.getLogger(__name__)
@@ -62,16 +63,15 @@ class FileManager:
             tuple: (是否成功, 删除的文件数量)
         """
         try:
-            # 记录删除前的文件数量
-            files_before = len([f for f in os.listdir(UPLOAD_FOLDER) if os.path.isfile(os.path.join(UPLOAD_FOLDER, f))])
+            # 扫描一次目录，记录删除前的文件数量
+            entries = scan_files(UPLOAD_FOLDER)
+            files_before = len(entries)
             
             # 删除所有文件
             deleted_count = 0
-            for filename in os.listdir(UPLOAD_FOLDER):
-                file_path = os.path.join(UPLOAD_FOLDER, filename)
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
-                    deleted_count += 1
+            for entry in entries:
+                os.remove(entry.path)
+                deleted_count += 1
             
             # 使缓存失效
             invalidate_files_cache()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分块索引模块
+在内存中维护每个上传的块信息，避免每个块都扫描临时目录
+"""
+
+import os
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from app.core.config import TEMP_CHUNKS_DIR
+
+# 创建日志对象
+logger = logging.getLogger(__name__)
+
+# 块文件名前缀，完整格式为 chunk_<块编号>_<哈希值>
+CHUNK_PREFIX = 'chunk_'
+
+
+class ChunkRecord:
+    """单个块的记录"""
+
+    __slots__ = ('number', 'hash', 'size', 'path')
+
+    def __init__(self, number: int, chunk_hash: str, size: int, path: str):
+        """初始化块记录
+
+        Args:
+            number: 块编号
+            chunk_hash: 块哈希值
+            size: 块大小
+            path: 块文件路径
+        """
+        self.number = number
+        self.hash = chunk_hash
+        self.size = size
+        self.path = path
+
+    def to_dict(self) -> Dict[str, object]:
+        """转换为字典"""
+        return {'number': self.number, 'hash': self.hash, 'size': self.size}
+
+
+def parse_chunk_filename(name: str) -> Optional[tuple]:
+    """解析块文件名
+
+    Args:
+        name: 块文件名
+
+    Returns:
+        (块编号, 哈希值)，不是块文件时返回None
+    """
+    if not name.startswith(CHUNK_PREFIX):
+        return None
+    parts = name.split('_')
+    if len(parts) != 3:
+        return None
+    try:
+        return int(parts[1]), parts[2]
+    except ValueError:
+        return None
+
+
+class ChunkIndex:
+    """单个上传的块索引
+
+    以块编号为键保存哈希值、大小和路径，首次使用时扫描一次临时目录，
+    之后在写入和删除块时同步更新，去重、缺失块检查和合并排序都只需 O(1) 查找。
+    """
+
+    def __init__(self, file_temp_dir: str):
+        """初始化块索引
+
+        Args:
+            file_temp_dir: 该文件的临时分块目录
+        """
+        self.file_temp_dir = file_temp_dir
+        self._records: Dict[int, ChunkRecord] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """从临时目录加载块记录（只扫描一次目录）"""
+        records = {}
+        if os.path.isdir(self.file_temp_dir):
+            with os.scandir(self.file_temp_dir) as entries:
+                for entry in entries:
+                    parsed = parse_chunk_filename(entry.name)
+                    if parsed is None or not entry.is_file():
+                        continue
+                    number, chunk_hash = parsed
+                    records[number] = ChunkRecord(number, chunk_hash, entry.stat().st_size, entry.path)
+
+        with self._lock:
+            self._records = records
+
+        if records:
+            logger.debug(f"已从磁盘加载块索引: {self.file_temp_dir}, 共 {len(records)} 块")
+
+    def __contains__(self, number: int) -> bool:
+        return number in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, number: int) -> Optional[ChunkRecord]:
+        """获取块记录
+
+        Args:
+            number: 块编号
+
+        Returns:
+            块记录，不存在时返回None
+        """
+        return self._records.get(number)
+
+    def add(self, number: int, chunk_hash: str, size: int, path: str) -> Optional[ChunkRecord]:
+        """添加或替换块记录
+
+        Args:
+            number: 块编号
+            chunk_hash: 块哈希值
+            size: 块大小
+            path: 块文件路径
+
+        Returns:
+            被替换的旧记录，没有时返回None
+        """
+        with self._lock:
+            old = self._records.get(number)
+            self._records[number] = ChunkRecord(number, chunk_hash, size, path)
+            return old
+
+    def remove(self, number: int) -> Optional[ChunkRecord]:
+        """移除块记录
+
+        Args:
+            number: 块编号
+
+        Returns:
+            被移除的记录，不存在时返回None
+        """
+        with self._lock:
+            return self._records.pop(number, None)
+
+    def numbers(self) -> List[int]:
+        """获取所有块编号（升序）"""
+        return sorted(self._records)
+
+    def missing(self, total_chunks: int) -> List[int]:
+        """获取缺失的块编号
+
+        Args:
+            total_chunks: 总块数
+
+        Returns:
+            缺失的块编号列表
+        """
+        records = self._records
+        return [i for i in range(total_chunks) if i not in records]
+
+    def ordered_paths(self, total_chunks: int) -> List[str]:
+        """按块编号顺序获取块文件路径
+
+        Args:
+            total_chunks: 总块数
+
+        Returns:
+            块文件路径列表
+
+        Raises:
+            KeyError: 当有块缺失时
+        """
+        records = self._records
+        return [records[i].path for i in range(total_chunks)]
+
+
+# 所有上传的块索引 {filename: ChunkIndex}
+_chunk_indexes: Dict[str, ChunkIndex] = {}
+_chunk_indexes_lock = threading.Lock()
+
+
+def get_chunk_index(filename: str, file_temp_dir: Optional[str] = None) -> ChunkIndex:
+    """获取上传的块索引，首次获取时从磁盘加载
+
+    Args:
+        filename: 文件名
+        file_temp_dir: 临时分块目录，默认为 TEMP_CHUNKS_DIR/<filename>
+
+    Returns:
+        块索引
+    """
+    with _chunk_indexes_lock:
+        index = _chunk_indexes.get(filename)
+        if index is None:
+            index = ChunkIndex(file_temp_dir or os.path.join(TEMP_CHUNKS_DIR, filename))
+            _chunk_indexes[filename] = index
+        return index
+
+
+def drop_chunk_index(filename: str) -> None:
+    """丢弃上传的块索引（取消、完成或清理临时目录时调用）
+
+    Args:
+        filename: 文件名
+    """
+    with _chunk_indexes_lock:
+        _chunk_indexes.pop(filename, None)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+合并任务队列模块
+在独立的工作线程池中执行分块合并和直写提交，最后一个分块请求无需等待合并完成；
+合并的进度和结果通过通知回调（通常是 Socket.IO 的 upload_state_updated 事件）发送给客户端
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import MERGE_WORKERS, UPLOAD_STATUS
+
+# 创建日志对象
+logger = logging.getLogger(__name__)
+
+# 同一文件两次合并进度通知之间的最小间隔（秒）
+PROGRESS_INTERVAL = 0.5
+
+
+class MergeQueue:
+    """合并任务队列
+
+    任务按提交顺序进入线程池的队列，同时执行的任务数不超过工作线程数，
+    避免多个大文件同时合并争抢磁盘带宽。同一文件的合并由上传状态锁保证只提交一次。
+    """
+
+    def __init__(self, max_workers: int = MERGE_WORKERS):
+        """初始化合并任务队列
+
+        Args:
+            max_workers: 工作线程数
+        """
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, Future] = {}
+        self._progress_times: Dict[str, float] = {}
+        self._notifier: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._lock = threading.Lock()
+
+    def set_notifier(self, notifier: Optional[Callable[[Dict[str, Any]], None]]) -> None:
+        """设置合并事件的通知回调
+
+        Args:
+            notifier: 回调函数，参数为事件数据（包含 filename 和 status）
+        """
+        self._notifier = notifier
+
+    def notify(self, event: Dict[str, Any]) -> None:
+        """发送合并事件，通知失败不影响合并任务
+
+        Args:
+            event: 事件数据
+        """
+        notifier = self._notifier
+        if notifier is None:
+            return
+        try:
+            notifier(event)
+        except Exception as e:
+            logger.error(f"发送合并事件时出错: {str(e)}")
+
+    def submit(self, filename: str, func: Callable[..., Dict[str, Any]], *args, **kwargs) -> Future:
+        """提交合并任务
+
+        任务函数返回的字典作为完成事件发送，其中需要包含 status。
+
+        Args:
+            filename: 文件名
+            func: 任务函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            任务的 Future
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='merge-worker')
+                logger.info(f"合并任务队列已启动，工作线程数: {self.max_workers}")
+            future = self._executor.submit(self._run, filename, func, args, kwargs)
+            self._jobs[filename] = future
+        future.add_done_callback(lambda done: self._forget(filename, done))
+        return future
+
+    def _forget(self, filename: str, future: Future) -> None:
+        """任务结束后移除记录（同一文件已提交新任务时保留新任务）"""
+        with self._lock:
+            if self._jobs.get(filename) is future:
+                del self._jobs[filename]
+
+    def _run(self, filename: str, func: Callable[..., Dict[str, Any]], args: tuple, kwargs: dict) -> Dict[str, Any]:
+        """在工作线程中执行任务并发送开始和完成事件"""
+        self.notify({'filename': filename, 'status': UPLOAD_STATUS['MERGING'], 'progress': 0.0, 'paused': False})
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"合并任务出错: {filename}, {str(e)}")
+            result = {'status': UPLOAD_STATUS['FAILED'], 'error': str(e)}
+        finally:
+            with self._lock:
+                self._progress_times.pop(filename, None)
+
+        logger.info(f"合并任务结束: {filename}, 状态: {result.get('status')}, 耗时: {time.monotonic() - started:.2f}秒")
+        self.notify(dict(result, filename=filename, paused=False))
+        return result
+
+    def report_progress(self, filename: str, done: int, total: int) -> None:
+        """报告合并进度，按 PROGRESS_INTERVAL 限制通知频率
+
+        Args:
+            filename: 文件名
+            done: 已合并的块数
+            total: 总块数
+        """
+        now = time.monotonic()
+        with self._lock:
+            if done < total and now - self._progress_times.get(filename, 0.0) < PROGRESS_INTERVAL:
+                return
+            self._progress_times[filename] = now
+        self.notify({
+            'filename': filename,
+            'status': UPLOAD_STATUS['MERGING'],
+            'progress': done / total if total else 1.0,
+            'paused': False
+        })
+
+    def wait(self, filename: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """等待文件的合并任务完成
+
+        Args:
+            filename: 文件名
+            timeout: 等待时间（秒），为None时一直等待
+
+        Returns:
+            任务结果，没有排队或正在执行的任务时返回None
+        """
+        with self._lock:
+            future = self._jobs.get(filename)
+        if future is None:
+            return None
+        return future.result(timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭工作线程池
+
+        Args:
+            wait: 是否等待正在执行和排队的任务完成
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._jobs.clear()
+        if executor is not None:
+            executor.shutdown(wait=wait)
+            logger.info("合并任务队列已关闭")
+
+
+# 全局合并任务队列
+merge_queue = MergeQueue()
+
+
+def set_merge_notifier(notifier: Optional[Callable[[Dict[str, Any]], None]]) -> None:
+    """设置全局合并任务队列的通知回调
+
+    Args:
+        notifier: 回调函数，参数为事件数据
+    """
+    merge_queue.set_notifier(notifier)
+
+
+def submit_merge(filename: str, func: Callable[..., Dict[str, Any]], *args, **kwargs) -> Future:
+    """提交合并任务到全局合并任务队列
+
+    Args:
+        filename: 文件名
+        func: 任务函数，返回包含 status 的结果字典
+        *args: 位置参数
+        **kwargs: 关键字参数
+
+    Returns:
+        任务的 Future
+    """
+    return merge_queue.submit(filename, func, *args, **kwargs)
+
+
+def wait_for_merge(filename: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """等待文件的合并任务完成
+
+    Args:
+        filename: 文件名
+        timeout: 等待时间（秒），为None时一直等待
+
+    Returns:
+        任务结果，没有排队或正在执行的任务时返回None
+    """
+    return merge_queue.wait(filename, timeout)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+上传会话存储模块
+在内存中保存上传状态以便快速查询，同时写入 SQLite（WAL模式）日志，服务重启后无需扫描临时目录即可续传
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from collections.abc import MutableMapping
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import TEMP_CHUNKS_DIR, UPLOAD_STATUS, UPLOAD_SESSION_PERSISTENT
+
+# 创建日志对象
+logger = logging.getLogger(__name__)
+
+# 会话数据库文件名（位于临时分块目录下，以 . 开头，不会被当作分块目录清理）
+SESSION_DB_FILENAME = '.upload_sessions.sqlite3'
+
+# 以集合形式保存在内存中的字段，已上传的块单独按行记录
+_SET_FIELDS = ('uploaded_chunks', 'failed_chunks')
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS upload_sessions ('
+    ' filename TEXT PRIMARY KEY,'
+    ' state TEXT NOT NULL,'
+    ' updated_at REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS upload_chunks ('
+    ' filename TEXT NOT NULL,'
+    ' chunk_number INTEGER NOT NULL,'
+    ' PRIMARY KEY (filename, chunk_number)) WITHOUT ROWID',
+)
+
+
+def _encode_state(state: Dict[str, Any]) -> str:
+    """将上传状态编码为JSON（不含已上传的块）
+
+    Args:
+        state: 上传状态
+
+    Returns:
+        JSON字符串
+    """
+    data = {}
+    for key, value in state.items():
+        if key == 'uploaded_chunks':
+            continue
+        if isinstance(value, (set, frozenset)):
+            value = sorted(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        data[key] = value
+    return json.dumps(data)
+
+
+def _decode_state(text: str) -> Dict[str, Any]:
+    """从JSON解码上传状态
+
+    Args:
+        text: JSON字符串
+
+    Returns:
+        上传状态
+    """
+    state = json.loads(text)
+    for key in _SET_FIELDS:
+        state[key] = set(state.get(key) or ())
+    if state.get('timestamp'):
+        state['timestamp'] = datetime.fromisoformat(state['timestamp'])
+    return state
+
+
+class UploadSessionStore(MutableMapping):
+    """上传会话存储
+
+    以字典的方式访问：store[filename] 返回该上传的状态字典，可以直接修改其中的字段。
+    就地修改后需要调用 save() 写入日志；新增的已上传块通过 save() 的 chunks 参数按行追加，
+    不会每次重写整个块集合。每个会话有独立的可重入锁，用于保护并发分块请求对状态的修改。
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        """初始化会话存储
+
+        Args:
+            db_path: SQLite数据库路径，为None时仅保存在内存中
+        """
+        self.db_path = db_path
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.RLock] = {}
+        self._guard = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._loaded = False
+
+    def _ensure_loaded(self) -> None:
+        """首次访问时打开数据库并加载会话"""
+        if self._loaded:
+            return
+        with self._guard:
+            if self._loaded:
+                return
+            if self.db_path:
+                try:
+                    self._open()
+                except (sqlite3.Error, OSError) as e:
+                    # 数据库不可用时退化为仅内存存储
+                    logger.error(f"打开上传会话数据库失败，上传状态将不会持久化: {str(e)}")
+                    self._conn = None
+            self._loaded = True
+
+    def _open(self) -> None:
+        """打开数据库，启用WAL模式并加载已有的会话"""
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # WAL 模式下 NORMAL 只在检查点时同步，断电最多丢失最近的少量提交，进程崩溃不会丢失
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+        sessions = {}
+        for filename, text in conn.execute('SELECT filename, state FROM upload_sessions'):
+            try:
+                state = _decode_state(text)
+            except (ValueError, TypeError) as e:
+                logger.warning(f"忽略无法解析的上传会话: {filename}, {str(e)}")
+                continue
+            # 重启时中断的合并由下一次分块请求重新触发
+            if state.get('status') == UPLOAD_STATUS['MERGING']:
+                state['status'] = UPLOAD_STATUS['UPLOADING']
+            sessions[filename] = state
+
+        for filename, chunk_number in conn.execute('SELECT filename, chunk_number FROM upload_chunks'):
+            state = sessions.get(filename)
+            if state is not None:
+                state['uploaded_chunks'].add(chunk_number)
+
+        self._conn = conn
+        self._sessions.update(sessions)
+        if sessions:
+            logger.info(f"已从会话数据库恢复 {len(sessions)} 个上传会话: {self.db_path}")
+
+    def _execute(self, statements: List[Tuple[str, Any]]) -> None:
+        """在一个事务中执行写操作
+
+        Args:
+            statements: (SQL, 参数) 列表，参数为列表时使用 executemany
+        """
+        if self._conn is None:
+            return
+        try:
+            with self._db_lock, self._conn:
+                for sql, params in statements:
+                    if isinstance(params, list):
+                        self._conn.executemany(sql, params)
+                    else:
+                        self._conn.execute(sql, params)
+        except sqlite3.Error as e:
+            logger.error(f"写入上传会话数据库失败: {str(e)}")
+
+    def _session_row(self, filename: str, state: Dict[str, Any]) -> Tuple[str, Any]:
+        """生成写入会话记录的语句"""
+        updated = state.get('timestamp')
+        updated_at = updated.timestamp() if isinstance(updated, datetime) else datetime.now().timestamp()
+        return ('INSERT OR REPLACE INTO upload_sessions (filename, state, updated_at) VALUES (?, ?, ?)',
+                (filename, _encode_state(state), updated_at))
+
+    def lock(self, filename: str) -> threading.RLock:
+        """获取会话的锁
+
+        Args:
+            filename: 文件名
+
+        Returns:
+            该会话的可重入锁
+        """
+        with self._guard:
+            lock = self._locks.get(filename)
+            if lock is None:
+                lock = self._locks[filename] = threading.RLock()
+            return lock
+
+    def save(self, filename: str, chunks: Iterable[int] = (), removed: Iterable[int] = ()) -> None:
+        """将会话的当前状态写入日志
+
+        Args:
+            filename: 文件名
+            chunks: 本次新增的已上传块编号
+            removed: 本次移除的已上传块编号
+        """
+        self._ensure_loaded()
+        with self.lock(filename):
+            state = self._sessions.get(filename)
+            if state is None:
+                return
+            statements = [self._session_row(filename, state)]
+            chunk_rows = [(filename, number) for number in chunks]
+            if chunk_rows:
+                statements.append(('INSERT OR IGNORE INTO upload_chunks (filename, chunk_number) VALUES (?, ?)',
+                                   chunk_rows))
+            removed_rows = [(filename, number) for number in removed]
+            if removed_rows:
+                statements.append(('DELETE FROM upload_chunks WHERE filename = ? AND chunk_number = ?',
+                                   removed_rows))
+            self._execute(statements)
+
+    def __getitem__(self, filename: str) -> Dict[str, Any]:
+        self._ensure_loaded()
+        return self._sessions[filename]
+
+    def __setitem__(self, filename: str, state: Dict[str, Any]) -> None:
+        """替换会话状态，同时重写该会话的已上传块记录"""
+        self._ensure_loaded()
+        for key in _SET_FIELDS:
+            state[key] = set(state.get(key) or ())
+        with self.lock(filename):
+            self._sessions[filename] = state
+            statements = [
+                self._session_row(filename, state),
+                ('DELETE FROM upload_chunks WHERE filename = ?', (filename,))
+            ]
+            if state['uploaded_chunks']:
+                statements.append(('INSERT INTO upload_chunks (filename, chunk_number) VALUES (?, ?)',
+                                   [(filename, number) for number in state['uploaded_chunks']]))
+            self._execute(statements)
+
+    def __delitem__(self, filename: str) -> None:
+        """删除会话及其日志记录，并释放会话锁"""
+        self._ensure_loaded()
+        with self._guard:
+            del self._sessions[filename]
+            self._locks.pop(filename, None)
+        self._execute([
+            ('DELETE FROM upload_sessions WHERE filename = ?', (filename,)),
+            ('DELETE FROM upload_chunks WHERE filename = ?', (filename,))
+        ])
+
+    def __contains__(self, filename: object) -> bool:
+        self._ensure_loaded()
+        return filename in self._sessions
+
+    def __iter__(self) -> Iterator[str]:
+        self._ensure_loaded()
+        return iter(list(self._sessions))
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._sessions)
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """返回会话的快照，遍历时其他线程可以修改存储"""
+        self._ensure_loaded()
+        return list(self._sessions.items())
+
+    def values(self) -> List[Dict[str, Any]]:
+        """返回会话状态的快照"""
+        self._ensure_loaded()
+        return list(self._sessions.values())
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# 全局上传会话存储，分块上传和旧版上传管理器共用
+upload_states = UploadSessionStore(
+    os.path.join(TEMP_CHUNKS_DIR, SESSION_DB_FILENAME) if UPLOAD_SESSION_PERSISTENT else None
+)
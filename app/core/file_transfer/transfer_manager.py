@@ -9,19 +9,26 @@
 import os
 import logging
 import shutil
-import hashlib
+import functools
+import threading
 from datetime import datetime
-from typing import Dict, Any, Tuple, List, Set, Optional, Union
+from typing import Dict, Any, Tuple, List, Set, Optional, Union, BinaryIO
 
-from app.core.config import UPLOAD_FOLDER, TEMP_CHUNKS_DIR, UPLOAD_STATUS
-from app.core.exceptions import FileTransferError, FileMergeError, FileNotFoundError
+from app.core.config import UPLOAD_FOLDER, TEMP_CHUNKS_DIR, UPLOAD_STATUS, DIRECT_WRITE_ENABLED
+from app.core.exceptions import FileTransferError, FileMergeError, FileNotFoundError, ChunkUploadError
 from app.services.file.storage import StorageService
+from app.services.file.direct_write import DirectWriteFile, get_direct_writer, release_direct_writer
+from app.core.file_transfer.chunk_index import ChunkIndex, get_chunk_index, drop_chunk_index
+from app.core.file_transfer.session_store import upload_states
+from app.core.file_transfer.merge_queue import merge_queue, submit_merge
+from app.services.file.ingest import as_stream, ingest_chunk_file
+from app.core.async_runtime import run_blocking, run_coroutine
 from app.services.cache.cache_service import invalidate_files_cache
 
 # 创建日志对象
 logger = logging.getLogger(__name__)
 
-# 使用字典存储上传状态信息
+# 上传状态保存在会话存储中，以字典的方式访问，修改后调用 upload_states.save() 写入日志
 # {filename: {
 #     'status': UPLOAD_STATUS['UPLOADING'],  # 当前状态
 #     'last_chunk': 12,                      # 最后上传的块索引
@@ -29,9 +36,24 @@ logger = logging.getLogger(__name__)
 #     'timestamp': datetime.now(),           # 最后更新时间
 #     'error': None,                         # 错误信息
 #     'uploaded_chunks': set(),              # 已上传的块集合
-#     'failed_chunks': set()                 # 上传失败的块集合
+#     'failed_chunks': set(),                # 上传失败的块集合
+#     'direct_write': False                  # 是否使用直写模式
 # }}
-upload_states: Dict[str, Dict[str, Any]] = {}
+
+
+def get_upload_lock(filename: str) -> threading.RLock:
+    """获取上传的状态锁
+
+    客户端并发上传多个分块时用于保护状态更新，并保证只有一个请求执行合并
+
+    Args:
+        filename: 文件名
+
+    Returns:
+        该上传的状态锁
+    """
+    return upload_states.lock(filename)
+
 
 class TransferManager:
     """文件传输管理器，处理文件传输的核心功能"""
@@ -70,6 +92,11 @@ class TransferManager:
         if not upload_in_progress and current_status not in [UPLOAD_STATUS['COMPLETED'], UPLOAD_STATUS['PAUSED']]:
             current_status = UPLOAD_STATUS['COMPLETED']
 
+        # 在状态锁内复制块集合，避免与并发的分块请求同时修改
+        with get_upload_lock(filename):
+            uploaded_chunks = list(file_state.get('uploaded_chunks', set()))
+            failed_chunks = list(file_state.get('failed_chunks', set()))
+
         # 构建返回的状态信息
         return {
             'success': True,
@@ -79,8 +106,8 @@ class TransferManager:
             'total_chunks': file_state.get('total_chunks', 0),
             'upload_in_progress': upload_in_progress,
             'error': file_state.get('error', None),
-            'uploaded_chunks': list(file_state.get('uploaded_chunks', set())),
-            'failed_chunks': list(file_state.get('failed_chunks', set()))
+            'uploaded_chunks': uploaded_chunks,
+            'failed_chunks': failed_chunks
         }
 
     @staticmethod
@@ -111,9 +138,11 @@ class TransferManager:
                 file_state = upload_states[filename]
 
                 # 更新状态
-                file_state['status'] = UPLOAD_STATUS['PAUSED']
-                file_state['last_chunk'] = max(file_state.get('last_chunk', 0), chunk_index)
-                file_state['timestamp'] = datetime.now()
+                with get_upload_lock(filename):
+                    file_state['status'] = UPLOAD_STATUS['PAUSED']
+                    file_state['last_chunk'] = max(file_state.get('last_chunk', 0), chunk_index)
+                    file_state['timestamp'] = datetime.now()
+                    upload_states.save(filename)
 
             logger.info(f"暂停上传文件: {filename}, 当前块: {chunk_index}")
             return True
@@ -152,16 +181,20 @@ class TransferManager:
 
             # 清理损坏的块
             cleaned_count = 0
+            cleaned_chunks = []
             if 'failed_chunks' in file_state and file_state['failed_chunks']:
                 from app.services.file.storage import clean_corrupted_chunks
-                cleaned_count, _ = clean_corrupted_chunks(filename, list(file_state['failed_chunks']))
-                # 清除失败块记录
-                file_state['failed_chunks'] = set()
+                cleaned_count, cleaned_chunks = clean_corrupted_chunks(filename, list(file_state['failed_chunks']))
 
             # 更新状态为上传中
-            file_state['status'] = UPLOAD_STATUS['UPLOADING']
-            file_state['timestamp'] = datetime.now()
-            file_state['error'] = None  # 清除错误信息
+            with get_upload_lock(filename):
+                # 清除失败块记录，已删除的块需要重新上传
+                file_state['failed_chunks'] = set()
+                file_state['uploaded_chunks'].difference_update(cleaned_chunks)
+                file_state['status'] = UPLOAD_STATUS['UPLOADING']
+                file_state['timestamp'] = datetime.now()
+                file_state['error'] = None  # 清除错误信息
+                upload_states.save(filename, removed=cleaned_chunks)
 
             logger.info(f"恢复上传文件: {filename}, 从块 {last_chunk} 开始, 是否有临时目录: {has_temp_dir}")
             return True, {
@@ -189,6 +222,10 @@ class TransferManager:
             file_temp_dir = os.path.join(TEMP_CHUNKS_DIR, filename)
             cleaned_count = 0
 
+            # 释放直写对象和块索引
+            release_direct_writer(filename)
+            drop_chunk_index(filename)
+
             if os.path.exists(file_temp_dir):
                 try:
                     # 删除整个临时目录
@@ -222,14 +259,27 @@ class TransferManager:
             return False, {'error': str(e)}
 
     @staticmethod
-    async def process_chunk_upload(filename: str, chunk_number: int, total_chunks: int, chunk_data: bytes) -> Tuple[bool, Dict[str, Any]]:
+    async def process_chunk_upload(filename: str, chunk_number: int, total_chunks: int,
+                                   chunk_data: Union[bytes, BinaryIO], file_size: Optional[int] = None,
+                                   chunk_size: Optional[int] = None, offset: Optional[int] = None) -> Tuple[bool, Dict[str, Any]]:
         """处理分块上传
 
+        客户端提供文件大小和分块大小且启用了直写模式时，分块直接写入目标文件；
+        否则按原方式保存为临时分块文件，最后一块到达后再合并。
+        块数据可以是请求体的流，此时在线程池中按缓冲区边读边写，不会整块读入内存。
+        提供 offset 时为可变长度分块：数据写入目标文件的该偏移处，chunk_size 为块粒度，
+        一次请求可以覆盖多个块（仅支持直写模式）。
+        所有块到达后，合并或提交在后台合并队列中进行，本次请求立即返回 merging 状态，
+        结果通过合并队列的通知回调发送。
+
         Args:
             filename: 文件名
             chunk_number: 块编号
             total_chunks: 总块数
-            chunk_data: 块数据
+            chunk_data: 块数据或块数据流
+            file_size: 文件总大小（可选，直写模式需要）
+            chunk_size: 分块大小（可选，直写模式需要；按偏移上传时为块粒度）
+            offset: 写入偏移（可选，按偏移上传可变长度分块时使用）
 
         Returns:
             tuple: (是否成功, 上传信息)
@@ -237,8 +287,9 @@ class TransferManager:
         file_temp_dir = None
 
         try:
-            # 初始化上传状态（如果不存在）
-            if filename not in upload_states:
+            # 初始化上传状态（如果不存在，或上一次同名上传已完成）
+            file_state = upload_states.get(filename)
+            if file_state is None or file_state.get('status') == UPLOAD_STATUS['COMPLETED']:
                 upload_states[filename] = {
                     'status': UPLOAD_STATUS['UPLOADING'],
                     'last_chunk': 0,
@@ -261,103 +312,257 @@ class TransferManager:
             file_temp_dir = os.path.join(TEMP_CHUNKS_DIR, filename)
             os.makedirs(file_temp_dir, exist_ok=True)
 
-            # 计算块的哈希值
-            chunk_hash = hashlib.md5(chunk_data).hexdigest()
+            # 直写模式：分块直接写入目标文件
+            if DIRECT_WRITE_ENABLED and file_size and chunk_size:
+                return await run_blocking(
+                    TransferManager._process_direct_write_chunk,
+                    filename, file_state, file_temp_dir, chunk_number, total_chunks, chunk_data, file_size, chunk_size,
+                    offset
+                )
+
+            if offset is not None:
+                raise ChunkUploadError(message="按偏移上传需要启用直写模式并提供文件大小和块大小")
+
+            # 获取块索引，并从索引恢复已上传的块（例如服务重启后续传）
+            chunk_index = get_chunk_index(filename, file_temp_dir)
+            if len(file_state['uploaded_chunks']) < len(chunk_index):
+                with get_upload_lock(filename):
+                    file_state['uploaded_chunks'].update(chunk_index.numbers())
+                    upload_states.save(filename, chunks=chunk_index.numbers())
+
+            # 计算哈希并保存块文件（在线程池中执行，避免阻塞共享事件循环）
+            await run_blocking(TransferManager._save_chunk_file, chunk_index, chunk_number, chunk_data)
+
+            with get_upload_lock(filename):
+                # 更新上传状态
+                file_state['last_chunk'] = max(file_state['last_chunk'], chunk_number)
+                file_state['timestamp'] = datetime.now()
+                file_state['uploaded_chunks'].add(chunk_number)
+                file_state['failed_chunks'].discard(chunk_number)
+
+                # 所有块都已上传时，由第一个发现的请求负责合并
+                all_chunks_uploaded = len(file_state['uploaded_chunks']) == total_chunks
+                merge_started = all_chunks_uploaded and file_state['status'] != UPLOAD_STATUS['MERGING']
+                if merge_started:
+                    file_state['status'] = UPLOAD_STATUS['MERGING']
+                upload_states.save(filename, chunks=(chunk_number,))
+
+            # 所有块都已上传，合并任务提交到后台合并队列，请求立即返回
+            if merge_started:
+                logger.info(f"所有块已上传，提交合并任务: {filename}")
+                submit_merge(filename, TransferManager._merge_chunks_job,
+                             filename, file_state, file_temp_dir, total_chunks, chunk_index)
+                return True, {'status': UPLOAD_STATUS['MERGING']}
 
-            # 生成块文件名
-            chunk_filename = f"chunk_{chunk_number}_{chunk_hash}"
-            chunk_path = os.path.join(file_temp_dir, chunk_filename)
+            # 返回当前状态
+            return True, {
+                'status': 'chunk_uploaded',
+                'chunk': chunk_number,
+                'total': total_chunks,
+                'progress': len(file_state['uploaded_chunks']) / total_chunks
+            }
 
-            # 保存块文件
-            with open(chunk_path, 'wb') as f:
-                f.write(chunk_data)
+        except Exception as e:
+            logger.error(f"处理分块上传时出错: {str(e)}")
 
-            # 更新上传状态
-            file_state['last_chunk'] = max(file_state['last_chunk'], chunk_number)
-            file_state['timestamp'] = datetime.now()
-            file_state['uploaded_chunks'].add(chunk_number)
-            if chunk_number in file_state['failed_chunks']:
-                file_state['failed_chunks'].remove(chunk_number)
+            # 更新上传状态，标记错误
+            file_state = upload_states.get(filename)
+            if file_state is not None:
+                with get_upload_lock(filename):
+                    file_state['status'] = UPLOAD_STATUS['FAILED']
+                    file_state['error'] = str(e)
+                    file_state['timestamp'] = datetime.now()
+                    if 'failed_chunks' in file_state and chunk_number is not None:
+                        file_state['failed_chunks'].add(chunk_number)
+                    upload_states.save(filename)
 
-            # 检查是否所有块都已上传
-            all_chunks_uploaded = len(file_state['uploaded_chunks']) == total_chunks
+            return False, {'error': str(e)}
 
-            # 如果所有块都已上传，合并文件
-            if all_chunks_uploaded:
-                logger.info(f"所有块已上传，开始合并文件: {filename}")
-                file_state['status'] = UPLOAD_STATUS['MERGING']
+    @staticmethod
+    def _save_chunk_file(chunk_index: ChunkIndex, chunk_number: int, chunk_data: Union[bytes, BinaryIO]) -> str:
+        """流式计算块的哈希值并保存为临时块文件
 
-                # 合并文件
-                final_path = os.path.join(UPLOAD_FOLDER, filename)
-                from app.services.file.storage import merge_chunks_async
-                success = await merge_chunks_async(file_temp_dir, final_path, total_chunks)
+        通过块索引去重：哈希值相同的块不再重复保存，哈希值不同时替换旧块文件。
 
-                if not success:
-                    # 合并失败，更新状态并记录错误
-                    file_state['status'] = UPLOAD_STATUS['FAILED']
-                    file_state['error'] = 'Failed to merge chunks'
-
-                    # 检查是否有缺失的块
-                    missing_chunks = []
-                    for i in range(total_chunks):
-                        found = False
-                        for existing_file in os.listdir(file_temp_dir):
-                            if existing_file.startswith(f"chunk_{i}_"):
-                                found = True
-                                break
-                        if not found:
-                            missing_chunks.append(i)
-                            file_state['failed_chunks'].add(i)
-
-                    if missing_chunks:
-                        logger.warning(f"发现缺失的块: {missing_chunks}")
-
-                    logger.error(f"合并文件块失败: {filename}")
-                    return False, {
-                        'error': 'Failed to merge chunks',
-                        'merge_failed': True,
-                        'missing_chunks': missing_chunks
-                    }
-
-                # 合并成功，清理临时文件
-                try:
-                    shutil.rmtree(file_temp_dir)
-                    file_temp_dir = None  # 标记为已清理
-                except Exception as e:
-                    logger.error(f"清理临时分块目录出错: {str(e)}")
+        Args:
+            chunk_index: 该文件的块索引
+            chunk_number: 块编号
+            chunk_data: 块数据或块数据流
 
-                # 更新状态为已完成
-                file_state['status'] = UPLOAD_STATUS['COMPLETED']
-                file_state['timestamp'] = datetime.now()
+        Returns:
+            块文件路径
+        """
+        return ingest_chunk_file(chunk_index, chunk_number, as_stream(chunk_data)).path
 
-                # 使缓存失效
-                invalidate_files_cache()
+    @staticmethod
+    def _merge_chunks_job(filename: str, file_state: Dict[str, Any], file_temp_dir: str, total_chunks: int,
+                          chunk_index: ChunkIndex) -> Dict[str, Any]:
+        """合并任务：按顺序合并临时块文件（在合并工作线程中执行）
 
-                logger.info(f"文件上传完成: {filename}")
-                return True, {'status': 'completed'}
+        Args:
+            filename: 文件名
+            file_state: 文件上传状态
+            file_temp_dir: 临时目录
+            total_chunks: 总块数
+            chunk_index: 该文件的块索引
 
-            # 返回当前状态
-            return True, {
-                'status': 'chunk_uploaded',
-                'chunk': chunk_number,
-                'total': total_chunks,
-                'progress': len(file_state['uploaded_chunks']) / total_chunks
+        Returns:
+            合并结果，status 为 completed 或 failed，失败时包含缺失的块
+        """
+        from app.services.file.storage import merge_chunks_async, remove_partial_file
+        final_path = os.path.join(UPLOAD_FOLDER, filename)
+
+        try:
+            run_coroutine(merge_chunks_async(
+                file_temp_dir, final_path, total_chunks, chunk_index,
+                progress_callback=functools.partial(merge_queue.report_progress, filename)))
+        except Exception as e:
+            logger.error(f"合并文件块失败: {filename}, {str(e)}")
+            remove_partial_file(final_path)
+
+            # 检查是否有缺失的块，客户端重新上传这些块后会再次触发合并
+            missing_chunks = chunk_index.missing(total_chunks)
+            if missing_chunks:
+                logger.warning(f"发现缺失的块: {missing_chunks}")
+
+            with get_upload_lock(filename):
+                file_state['status'] = UPLOAD_STATUS['FAILED']
+                file_state['error'] = 'Failed to merge chunks'
+                file_state['timestamp'] = datetime.now()
+                file_state['failed_chunks'].update(missing_chunks)
+                upload_states.save(filename)
+
+            return {
+                'status': UPLOAD_STATUS['FAILED'],
+                'error': 'Failed to merge chunks',
+                'merge_failed': True,
+                'missing_chunks': missing_chunks
             }
 
+        # 合并成功，清理块索引和临时文件
+        drop_chunk_index(filename)
+        try:
+            shutil.rmtree(file_temp_dir)
         except Exception as e:
-            logger.error(f"处理分块上传时出错: {str(e)}")
+            logger.error(f"清理临时分块目录出错: {str(e)}")
 
-            # 删除部分写入的文件
-            final_path = os.path.join(UPLOAD_FOLDER, filename)
-            from app.services.file.storage import remove_partial_file
-            remove_partial_file(final_path)
+        TransferManager._mark_completed(filename, file_state)
+        return {'status': UPLOAD_STATUS['COMPLETED']}
 
-            # 更新上传状态，标记错误
-            if filename in upload_states:
-                upload_states[filename]['status'] = UPLOAD_STATUS['FAILED']
-                upload_states[filename]['error'] = str(e)
-                upload_states[filename]['timestamp'] = datetime.now()
-                if 'failed_chunks' in upload_states[filename] and chunk_number is not None:
-                    upload_states[filename]['failed_chunks'].add(chunk_number)
+    @staticmethod
+    def _finalize_direct_write_job(filename: str, file_state: Dict[str, Any], writer: DirectWriteFile,
+                                   file_temp_dir: str) -> Dict[str, Any]:
+        """直写提交任务：fsync 后重命名为最终文件（在合并工作线程中执行）
 
-            return False, {'error': str(e)}
+        Args:
+            filename: 文件名
+            file_state: 文件上传状态
+            writer: 直写文件对象
+            file_temp_dir: 临时目录
+
+        Returns:
+            提交结果，status 为 completed 或 failed
+        """
+        final_path = os.path.join(UPLOAD_FOLDER, filename)
+        try:
+            writer.finalize(final_path)
+        except Exception as e:
+            # 目标文件仍在临时目录中，可以重新上传最后一块再次触发提交
+            logger.error(f"提交直写文件失败: {filename}, {str(e)}")
+            with get_upload_lock(filename):
+                file_state['status'] = UPLOAD_STATUS['FAILED']
+                file_state['error'] = str(e)
+                file_state['timestamp'] = datetime.now()
+                upload_states.save(filename)
+            return {'status': UPLOAD_STATUS['FAILED'], 'error': str(e)}
+
+        release_direct_writer(filename)
+        try:
+            shutil.rmtree(file_temp_dir)
+        except Exception as e:
+            logger.error(f"清理临时分块目录出错: {str(e)}")
+
+        TransferManager._mark_completed(filename, file_state)
+        return {'status': UPLOAD_STATUS['COMPLETED']}
+
+    @staticmethod
+    def _mark_completed(filename: str, file_state: Dict[str, Any]) -> None:
+        """将上传标记为已完成并使文件列表缓存失效
+
+        Args:
+            filename: 文件名
+            file_state: 文件上传状态
+        """
+        with get_upload_lock(filename):
+            file_state['status'] = UPLOAD_STATUS['COMPLETED']
+            file_state['timestamp'] = datetime.now()
+            upload_states.save(filename)
+
+        # 使缓存失效
+        invalidate_files_cache()
+
+        logger.info(f"文件上传完成: {filename}")
+
+    @staticmethod
+    def _process_direct_write_chunk(filename: str, file_state: Dict[str, Any], file_temp_dir: str, chunk_number: int,
+                                    total_chunks: int, chunk_data: Union[bytes, BinaryIO], file_size: int,
+                                    chunk_size: int, offset: Optional[int] = None) -> Tuple[bool, Dict[str, Any]]:
+        """以直写模式处理分块：按偏移写入预分配的目标文件，全部写完后重命名
+
+        Args:
+            filename: 文件名
+            file_state: 文件上传状态
+            file_temp_dir: 临时目录
+            chunk_number: 块编号
+            total_chunks: 总块数
+            chunk_data: 块数据或块数据流
+            file_size: 文件总大小
+            chunk_size: 分块大小（按偏移上传时为块粒度）
+            offset: 写入偏移（可选，提供时按偏移写入可变长度的数据）
+
+        Returns:
+            tuple: (是否成功, 上传信息)
+        """
+        writer = get_direct_writer(file_temp_dir, filename, file_size, chunk_size)
+        if writer.total_blocks != total_chunks:
+            raise ChunkUploadError(message=f"总块数与文件大小不一致: {total_chunks}, 预期 {writer.total_blocks}")
+
+        # 已上传块集合中记录的是块编号，按偏移上传时一次请求可能覆盖多个块
+        if offset is None:
+            writer.write_block_stream(chunk_number, as_stream(chunk_data))
+            blocks = range(chunk_number, chunk_number + 1)
+        else:
+            blocks = writer.write_range_stream(offset, as_stream(chunk_data))
+
+        with get_upload_lock(filename):
+            file_state['direct_write'] = True
+            file_state['total_chunks'] = total_chunks
+
+            # 从位图恢复已写入的块（例如服务重启后续传）
+            if len(file_state['uploaded_chunks']) < writer.written_count:
+                restored = writer.written_blocks()
+                file_state['uploaded_chunks'].update(restored)
+                upload_states.save(filename, chunks=restored)
+
+            # 更新上传状态
+            file_state['last_chunk'] = max(file_state['last_chunk'], blocks[-1])
+            file_state['timestamp'] = datetime.now()
+            file_state['uploaded_chunks'].update(blocks)
+            file_state['failed_chunks'].difference_update(blocks)
+            upload_states.save(filename, chunks=blocks)
+
+            # 所有块已写入时，由第一个发现的请求负责提交
+            if not writer.is_complete() or file_state['status'] == UPLOAD_STATUS['MERGING']:
+                return True, {
+                    'status': 'chunk_uploaded',
+                    'chunk': chunk_number,
+                    'total': total_chunks,
+                    'progress': len(file_state['uploaded_chunks']) / total_chunks
+                }
+            file_state['status'] = UPLOAD_STATUS['MERGING']
+            upload_states.save(filename)
+
+        # 所有块已写入，fsync 和重命名在后台合并队列中进行，请求立即返回
+        logger.info(f"所有块已直写完成，提交文件: {filename}")
+        submit_merge(filename, TransferManager._finalize_direct_write_job, filename, file_state, writer, file_temp_dir)
+        return True, {'status': UPLOAD_STATUS['MERGING']}
@@ -15,11 +15,13 @@ from app.services.file.file_service import (
     remove_partial_file, merge_chunks_async, calculate_chunk_hash, get_chunk_filename
 )
 from app.services.cache.cache_service import invalidate_files_cache
+from app.core.file_transfer.chunk_index import get_chunk_index, drop_chunk_index
+from app.core.file_transfer.session_store import upload_states
 
 # 创建日志对象
 logger = logging.getLogger(__name__)
 
-# 使用字典存储上传状态信息
+# 上传状态保存在会话存储中（与文件传输管理器共用），修改后调用 upload_states.save() 写入日志
 # {filename: {
 #     'status': UPLOAD_STATUS['UPLOADING'],  # 当前状态
 #     'last_chunk': 12,                      # 最后上传的块索引
@@ -29,7 +31,6 @@ logger = logging.getLogger(__name__)
 #     'uploaded_chunks': set(),              # 已上传的块集合
 #     'failed_chunks': set()                 # 上传失败的块集合
 # }}
-upload_states = {}
 
 class UploadManager:
     """上传管理核心类，处理文件上传相关操作"""
@@ -121,6 +122,7 @@ class UploadManager:
                 file_state['status'] = UPLOAD_STATUS['PAUSED']
                 file_state['last_chunk'] = max(file_state.get('last_chunk', 0), chunk_index)
                 file_state['timestamp'] = datetime.now()
+                upload_states.save(filename)
 
             logger.info(f"暂停上传文件: {filename}, 当前块: {chunk_index}")
             return True
@@ -153,29 +155,35 @@ class UploadManager:
 
             # 如果当前状态是失败，检查并清理失败的块
             cleaned_count = 0
+            cleaned_chunks = []
             if current_status == UPLOAD_STATUS['FAILED'] and has_temp_dir:
                 failed_chunks = list(file_state.get('failed_chunks', set()))
                 if failed_chunks:
                     # 删除失败的块文件，以便重新上传
+                    index = get_chunk_index(filename, file_temp_dir)
                     for chunk_index in failed_chunks:
-                        # 删除对应块索引的所有文件
-                        for filename_in_dir in os.listdir(file_temp_dir):
-                            if filename_in_dir.startswith(f"chunk_{chunk_index}_"):
-                                try:
-                                    os.remove(os.path.join(file_temp_dir, filename_in_dir))
-                                    cleaned_count += 1
-                                    logger.info(f"删除失败的块文件: {filename_in_dir}")
-                                except Exception as del_err:
-                                    logger.error(f"删除失败块时出错: {str(del_err)}")
-
-                    # 清空失败块集合
+                        # 从块索引中删除对应的块文件
+                        record = index.remove(chunk_index)
+                        if record is None:
+                            continue
+                        try:
+                            os.remove(record.path)
+                            cleaned_count += 1
+                            logger.info(f"删除失败的块文件: {os.path.basename(record.path)}")
+                        except Exception as del_err:
+                            logger.error(f"删除失败块时出错: {str(del_err)}")
+
+                    # 清空失败块集合，已删除的块需要重新上传
                     file_state['failed_chunks'] = set()
+                    file_state['uploaded_chunks'].difference_update(failed_chunks)
+                    cleaned_chunks = failed_chunks
                     logger.info(f"已清理 {cleaned_count} 个失败块，准备重新上传")
 
             # 更新状态为上传中
             file_state['status'] = UPLOAD_STATUS['UPLOADING']
             file_state['timestamp'] = datetime.now()
             file_state['error'] = None  # 清除错误信息
+            upload_states.save(filename, removed=cleaned_chunks)
 
             logger.info(f"恢复上传文件: {filename}, 从块 {last_chunk} 开始, 是否有临时目录: {has_temp_dir}")
             return True, {
@@ -202,6 +210,7 @@ class UploadManager:
             # 清理临时目录下该文件的分块
             file_temp_dir = os.path.join(TEMP_CHUNKS_DIR, filename)
             cleaned_count = 0
+            drop_chunk_index(filename)
 
             if os.path.exists(file_temp_dir):
                 try:
@@ -282,35 +291,29 @@ class UploadManager:
             chunk_filename = get_chunk_filename(chunk_number, chunk_hash)
             chunk_path = os.path.join(file_temp_dir, chunk_filename)
 
-            # 检查该块是否已经上传
-            chunk_exists = False
-            for existing_file in os.listdir(file_temp_dir):
-                if existing_file.startswith(f"chunk_{chunk_number}_"):
-                    # 已存在相同块索引的文件
-                    existing_path = os.path.join(file_temp_dir, existing_file)
-                    existing_hash = existing_file.split('_')[-1] if len(existing_file.split('_')) > 2 else None
-
-                    if existing_hash == chunk_hash:
-                        # 相同的哈希值，块已存在
-                        chunk_exists = True
-                        chunk_path = existing_path
-                        logger.info(f"块 {chunk_number} 已存在，哈希值匹配: {chunk_hash}")
-                        break
-                    else:
-                        # 不同的哈希值，删除旧块
-                        try:
-                            os.remove(existing_path)
-                            logger.info(f"删除旧块: {existing_file}, 将替换为新块: {chunk_filename}")
-                        except Exception as del_err:
-                            logger.error(f"删除旧块时出错: {str(del_err)}")
-
-            # 如果块不存在，则保存
-            if not chunk_exists:
+            # 通过块索引检查该块是否已经上传
+            index = get_chunk_index(filename, file_temp_dir)
+            existing = index.get(chunk_number)
+            chunk_exists = existing is not None and existing.hash == chunk_hash
+            if chunk_exists:
+                # 相同的哈希值，块已存在
+                chunk_path = existing.path
+                logger.info(f"块 {chunk_number} 已存在，哈希值匹配: {chunk_hash}")
+            else:
                 # 将块数据写入文件
                 with open(chunk_path, 'wb') as f:
                     f.write(chunk_data)
                 logger.info(f"保存块 {chunk_number}/{total_chunks-1}, 哈希值: {chunk_hash}")
 
+                # 更新块索引，不同的哈希值时删除旧块
+                old = index.add(chunk_number, chunk_hash, len(chunk_data), chunk_path)
+                if old is not None and old.path != chunk_path:
+                    try:
+                        os.remove(old.path)
+                        logger.info(f"删除旧块: {os.path.basename(old.path)}, 已替换为新块: {chunk_filename}")
+                    except Exception as del_err:
+                        logger.error(f"删除旧块时出错: {str(del_err)}")
+
             # 更新上传状态
             file_state['last_chunk'] = max(file_state.get('last_chunk', 0), chunk_number + 1)
             file_state['timestamp'] = datetime.now()
@@ -319,6 +322,7 @@ class UploadManager:
             # 如果该块之前在失败列表中，则移除
             if chunk_number in file_state['failed_chunks']:
                 file_state['failed_chunks'].remove(chunk_number)
+            upload_states.save(filename, chunks=(chunk_number,))
 
             # 如果这是最后一个块或所有块都已上传，合并所有块
             all_chunks_uploaded = len(file_state['uploaded_chunks']) == total_chunks
@@ -327,6 +331,7 @@ class UploadManager:
             if is_last_chunk or all_chunks_uploaded:
                 # 更新状态为合并中
                 file_state['status'] = UPLOAD_STATUS['MERGING']
+                upload_states.save(filename)
 
                 # 使用异步IO合并块
                 final_path = os.path.join(UPLOAD_FOLDER, filename)
@@ -340,16 +345,9 @@ class UploadManager:
                     file_state['error'] = 'Failed to merge chunks'
 
                     # 检查是否有缺失的块
-                    missing_chunks = []
-                    for i in range(total_chunks):
-                        found = False
-                        for existing_file in os.listdir(file_temp_dir):
-                            if existing_file.startswith(f"chunk_{i}_"):
-                                found = True
-                                break
-                        if not found:
-                            missing_chunks.append(i)
-                            file_state['failed_chunks'].add(i)
+                    missing_chunks = index.missing(total_chunks)
+                    file_state['failed_chunks'].update(missing_chunks)
+                    upload_states.save(filename)
 
                     if missing_chunks:
                         logger.warning(f"发现缺失的块: {missing_chunks}")
@@ -361,7 +359,8 @@ class UploadManager:
                         'missing_chunks': missing_chunks
                     }
 
-                # 合并成功，清理临时文件
+                # 合并成功，清理块索引和临时文件
+                drop_chunk_index(filename)
                 try:
                     shutil.rmtree(file_temp_dir)
                     file_temp_dir = None  # 标记为已清理
@@ -370,6 +369,7 @@ class UploadManager:
 
                 # 更新状态为完成并从上传状态中移除
                 file_state['status'] = UPLOAD_STATUS['COMPLETED']
+                upload_states.save(filename)
                 # 延迟删除状态，给前端时间查询完成状态
                 # 定时清理任务会清理过期的状态
 
@@ -395,5 +395,6 @@ class UploadManager:
                 upload_states[filename]['timestamp'] = datetime.now()
                 if 'failed_chunks' in upload_states[filename] and chunk_number is not None:
                     upload_states[filename]['failed_chunks'].add(chunk_number)
+                upload_states.save(filename)
 
             return False, {'error': str(e)}
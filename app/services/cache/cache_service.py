@@ -3,90 +3,182 @@
 
 import time
 import logging
-from datetime import datetime
-import os
 import gc
+import threading
 
-from app.core.config import FILES_CACHE_TTL, UPLOAD_FOLDER
-from app.services.common import get_file_icon, format_file_size, file_icon_cache, file_size_cache
+from app.core.config import FILES_CACHE_TTL, FILES_PAGE_SIZE, FILES_WATCHER, UPLOAD_FOLDER
+from app.services.common import file_icon_cache, file_size_cache
+from app.services.cache.file_index import FileIndex, SORT_FIELDS, decode_cursor, encode_cursor
+from app.services.cache.file_watcher import create_watcher
 
 # 创建日志对象
 logger = logging.getLogger(__name__)
 
-# 文件信息缓存
-files_info_cache = {}
+# 分页查询每页数量的上限
+MAX_FILES_PAGE_SIZE = 1000
+
+# 文件信息缓存（未启用监视器时按有效期重新扫描文件索引）
 files_info_cache_time = 0
 files_info_cache_hits = 0  # 缓存命中次数
 files_info_cache_misses = 0  # 缓存未命中次数
 files_info_cache_invalidations = 0  # 缓存手动失效次数
 
+# 上传目录的文件索引，由目录监视器维护；未启用监视器时按有效期重新扫描
+file_index = FileIndex(UPLOAD_FOLDER)
+_file_watcher = None
+_file_watcher_lock = threading.Lock()
+
+# 启动文件监视器
+def start_file_watcher():
+    """启动上传目录的监视器，之后文件列表从内存索引读取
+
+    FILES_WATCHER 为 off 时不启动，文件列表按 FILES_CACHE_TTL 定期重新读取目录
+
+    Returns:
+        监视器实例，未启用时返回None
+    """
+    global _file_watcher
+    with _file_watcher_lock:
+        if _file_watcher is None and FILES_WATCHER != 'off':
+            _file_watcher = create_watcher(file_index, FILES_WATCHER, FILES_CACHE_TTL)
+            _file_watcher.start()
+            logger.info(f"文件监视器已启动, 方式: {_file_watcher.name}, 目录: {UPLOAD_FOLDER}")
+        return _file_watcher
+
+# 停止文件监视器
+def stop_file_watcher():
+    """停止上传目录的监视器"""
+    global _file_watcher
+    with _file_watcher_lock:
+        watcher, _file_watcher = _file_watcher, None
+    if watcher is not None:
+        watcher.stop()
+        file_index.clear()
+        logger.info("文件监视器已停止")
+
 # 使缓存失效
 def invalidate_files_cache():
-    """手动使文件列表缓存失效"""
-    global files_info_cache, files_info_cache_time, files_info_cache_invalidations
-    files_info_cache = {}
-    files_info_cache_time = 0
+    """手动使文件列表缓存失效
+
+    监视器运行时只标记索引需要同步，下一次读取时处理本进程产生的变化
+    """
+    global files_info_cache_time, files_info_cache_invalidations
     files_info_cache_invalidations += 1
+    watcher = _file_watcher
+    if watcher is not None:
+        watcher.mark_dirty()
+        return
+    files_info_cache_time = 0
     logger.debug(f"文件列表缓存已手动失效, 总失效次数: {files_info_cache_invalidations}")
 
-# 获取所有文件信息
-def get_files_info(force_refresh=False):
-    """获取所有文件信息，支持缓存
+# 设置文件列表变化的通知函数
+def set_files_notifier(callback):
+    """设置文件列表变化的通知函数
+
+    文件索引每次变化时以增量调用：revision（变化后的版本号）、base_revision（变化前的版本号）、
+    added（新增的文件信息）、removed（删除的文件名）、modified（修改后的文件信息）
 
     Args:
-        force_refresh (bool): 是否强制刷新缓存
+        callback: 回调函数，为None时取消通知
+    """
+    file_index.set_listener(callback)
 
-    Returns:
-        list: 文件信息列表
+# 同步文件索引
+def sync_files_index(force_refresh=False):
+    """读取文件索引前确保其为最新，发生变化时通知 set_files_notifier 设置的回调
+
+    监视器运行时只处理已排队的变化，不会重新读取目录；未启用监视器时按有效期重新扫描
+
+    Args:
+        force_refresh (bool): 是否强制重新扫描（仅在未启用监视器时有效）
     """
-    global files_info_cache, files_info_cache_time, files_info_cache_hits, files_info_cache_misses
+    global files_info_cache_time, files_info_cache_hits, files_info_cache_misses
+
+    watcher = _file_watcher
+    if watcher is not None:
+        watcher.sync()
+        files_info_cache_hits += 1
+        return
 
     # 检查缓存是否有效
     current_time = time.time()
     cache_age = current_time - files_info_cache_time
 
-    # 如果缓存有效且不需要强制刷新，直接返回缓存的数据
-    if not force_refresh and files_info_cache and cache_age < FILES_CACHE_TTL:
+    # 如果缓存有效且不需要强制刷新，直接使用索引
+    if not force_refresh and files_info_cache_time and cache_age < FILES_CACHE_TTL:
         files_info_cache_hits += 1
         logger.debug(f"文件列表缓存命中，年龄: {cache_age:.2f}秒, 总命中次数: {files_info_cache_hits}")
-        return files_info_cache
+        return
 
-    # 缓存未命中或需要强制刷新，重新获取文件列表
+    # 缓存未命中或需要强制刷新，重新扫描目录
     files_info_cache_misses += 1
     if force_refresh:
         logger.debug(f"强制刷新文件列表缓存, 总未命中次数: {files_info_cache_misses}")
     else:
         logger.debug(f"文件列表缓存过期 (年龄: {cache_age:.2f}秒), 总未命中次数: {files_info_cache_misses}")
 
-    files = []
-    upload_dir = UPLOAD_FOLDER
-    if os.path.exists(upload_dir):
-        for filename in os.listdir(upload_dir):
-            file_path = os.path.join(upload_dir, filename)
-            if os.path.isfile(file_path):
-                size = os.path.getsize(file_path)
-                modified_time = os.path.getmtime(file_path)
-                modified_time_str = datetime.fromtimestamp(modified_time).strftime('%Y-%m-%d %H:%M:%S')
-
-                files.append({
-                    'name': filename,
-                    'size': size,
-                    'size_formatted': format_file_size(size),
-                    'icon': get_file_icon(filename),
-                    'modified_time': modified_time_str
-                })
-
-    # 更新缓存
-    files_info_cache = sorted(files, key=lambda x: x['name'])
+    file_index.rescan()
     files_info_cache_time = current_time
-    logger.debug(f"文件列表缓存已更新, 包含 {len(files)} 个文件")
 
-    return files_info_cache
+# 获取所有文件信息
+def get_files_info(force_refresh=False):
+    """获取所有文件信息（按名称排序），支持缓存
+
+    Args:
+        force_refresh (bool): 是否强制刷新缓存
+
+    Returns:
+        list: 文件信息列表
+    """
+    sync_files_index(force_refresh)
+    return file_index.files()
+
+# 获取文件列表快照
+def get_files_snapshot(force_refresh=False):
+    """获取所有文件信息及其版本号，客户端以此为基础应用之后的增量
+
+    Args:
+        force_refresh (bool): 是否强制刷新缓存
+
+    Returns:
+        tuple: (文件信息列表, 版本号)
+    """
+    sync_files_index(force_refresh)
+    return file_index.snapshot()
+
+# 分页查询文件信息
+def query_files_info(sort='name', descending=False, limit=FILES_PAGE_SIZE, cursor=None,
+                     prefix=None, extensions=None, force_refresh=False):
+    """按游标分页查询文件信息，使用文件索引中的有序索引，不需要排序
+
+    Args:
+        sort (str): 排序字段：name、size 或 mtime
+        descending (bool): 是否降序
+        limit (int): 每页数量
+        cursor (str): 上一页返回的游标，为None时从第一页开始
+        prefix (str): 文件名前缀过滤（区分大小写）
+        extensions (list): 扩展名过滤
+        force_refresh (bool): 是否强制刷新缓存
+
+    Returns:
+        tuple: (本页文件信息列表, 下一页的游标（没有更多时为None）, 符合条件的文件总数)
+
+    Raises:
+        ValueError: 当排序字段或游标无效时
+    """
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"无效的排序字段，必须是以下之一: {', '.join(SORT_FIELDS)}")
+    after = decode_cursor(cursor, sort, descending) if cursor else None
+
+    sync_files_index(force_refresh)
+    files, next_key, total = file_index.query(sort, descending, limit, after, prefix, extensions)
+    next_cursor = encode_cursor(sort, descending, next_key) if next_key is not None else None
+    return files, next_cursor, total
 
 # 清理内存缓存
 def clean_caches():
     """清理所有内存缓存"""
-    global file_icon_cache, file_size_cache, files_info_cache, files_info_cache_time
+    global file_icon_cache, file_size_cache, files_info_cache_time
     logger.info("清理内存缓存...")
 
     # 清理所有缓存
@@ -98,7 +190,7 @@ def clean_caches():
     # 重置所有缓存
     file_icon_cache.clear()
     file_size_cache.clear()
-    files_info_cache = {}
+    # 文件索引由监视器维护，不能清空；未启用监视器时下一次读取会重新扫描
     files_info_cache_time = 0
 
     # 记录清理的缓存大小
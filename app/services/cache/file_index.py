@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+文件索引模块
+在内存中保存上传目录的文件信息，并按名称、大小和修改时间分别维护有序索引。
+文件变化时只在有序索引中删除和插入对应的项，分页查询按游标二分定位，不需要排序
+"""
+
+import os
+import json
+import stat
+import base64
+import logging
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.services.common import get_file_icon, format_file_size
+from app.utils.fs import scan_files
+
+# 创建日志对象
+logger = logging.getLogger(__name__)
+
+# 支持的排序字段
+SORT_FIELDS = ('name', 'size', 'mtime')
+
+# 名称前缀范围的上界（大于任何以该前缀开头的名称）
+_PREFIX_END = '\U0010ffff'
+
+
+def make_file_info(name: str, size: int, mtime: float) -> Dict[str, object]:
+    """生成文件列表中的文件信息
+
+    Args:
+        name: 文件名
+        size: 文件大小
+        mtime: 修改时间
+
+    Returns:
+        文件信息字典
+    """
+    return {
+        'name': name,
+        'size': size,
+        'size_formatted': format_file_size(size),
+        'icon': get_file_icon(name),
+        'modified_time': datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def _sort_key(field: str, name: str, size: int, mtime: float) -> tuple:
+    """有序索引中的键，以文件名结尾保证唯一"""
+    if field == 'size':
+        return (size, name)
+    if field == 'mtime':
+        return (mtime, name)
+    return (name,)
+
+
+def encode_cursor(field: str, descending: bool, key: tuple) -> str:
+    """将分页位置编码为游标
+
+    Args:
+        field: 排序字段
+        descending: 是否降序
+        key: 上一页最后一项在有序索引中的键
+
+    Returns:
+        游标字符串
+    """
+    data = json.dumps([field, int(descending), list(key)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, field: str, descending: bool) -> tuple:
+    """解码游标
+
+    Args:
+        cursor: 游标字符串
+        field: 当前请求的排序字段
+        descending: 当前请求是否降序
+
+    Returns:
+        有序索引中的键
+
+    Raises:
+        ValueError: 当游标无效或与排序方式不一致时
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_field, cursor_descending, key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError(f"无效的游标: {str(e)}")
+    if cursor_field != field or bool(cursor_descending) != descending:
+        raise ValueError("游标与当前的排序方式不一致")
+    expected = 1 if field == 'name' else 2
+    if not isinstance(key, list) or len(key) != expected or not isinstance(key[-1], str):
+        raise ValueError("无效的游标")
+    if field != 'name' and (isinstance(key[0], bool) or not isinstance(key[0], (int, float))):
+        raise ValueError("无效的游标")
+    return tuple(key)
+
+
+def normalize_extensions(extensions: Optional[Iterable[str]]) -> Optional[frozenset]:
+    """规范化扩展名过滤条件（小写，带点）
+
+    Args:
+        extensions: 扩展名，可以带或不带点
+
+    Returns:
+        扩展名集合，未指定时返回None
+    """
+    if not extensions:
+        return None
+    result = frozenset('.' + ext.strip().lower().lstrip('.') for ext in extensions if ext.strip())
+    return result or None
+
+
+class FileIndex:
+    """上传目录的内存文件索引
+
+    按文件名保存文件信息，同时为每个排序字段维护一个有序的键列表；
+    文件变化时只更新对应的项，读取和分页查询不需要访问磁盘，也不需要排序。
+    每批变化使版本号加一，并以增量（added、removed、modified）通知监听函数
+    """
+
+    def __init__(self, directory: str):
+        """初始化文件索引
+
+        Args:
+            directory: 被索引的目录
+        """
+        self.directory = directory
+        self._entries: Dict[str, Dict[str, object]] = {}
+        self._stats: Dict[str, Tuple[int, float]] = {}
+        self._orders: Dict[str, List[tuple]] = {field: [] for field in SORT_FIELDS}
+        self._files: Optional[List[Dict[str, object]]] = None
+        self._lock = threading.Lock()
+        # 串行化写操作，保证增量按版本号顺序通知
+        self._write_lock = threading.Lock()
+        self._listener: Optional[Callable[[Dict[str, object]], None]] = None
+        self.revision = 0
+
+    def set_listener(self, listener: Optional[Callable[[Dict[str, object]], None]]) -> None:
+        """设置文件变化的监听函数
+
+        Args:
+            listener: 回调函数，参数为增量：revision、base_revision、added、removed、modified
+        """
+        self._listener = listener
+
+    def _record(self, added: List[Dict[str, object]], removed: List[str],
+                modified: List[Dict[str, object]]) -> Optional[Dict[str, object]]:
+        """记录一批变化并生成增量（需持有锁）
+
+        Returns:
+            增量，没有变化时返回None
+        """
+        if not (added or removed or modified):
+            return None
+        self.revision += 1
+        return {
+            'revision': self.revision,
+            'base_revision': self.revision - 1,
+            'added': added,
+            'removed': removed,
+            'modified': modified
+        }
+
+    def _notify(self, delta: Optional[Dict[str, object]]) -> None:
+        """通知监听函数（需持有写锁，不持有数据锁）"""
+        listener = self._listener
+        if delta is None or listener is None:
+            return
+        try:
+            listener(delta)
+        except Exception as e:
+            logger.error(f"通知文件列表变化时出错: {str(e)}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rescan(self) -> None:
+        """重新扫描整个目录并重建有序索引"""
+        entries = {}
+        stats = {}
+        try:
+            for entry in scan_files(self.directory):
+                entries[entry.name] = make_file_info(entry.name, entry.size, entry.mtime)
+                stats[entry.name] = (entry.size, entry.mtime)
+        except OSError as e:
+            logger.warning(f"扫描目录失败: {self.directory}, {str(e)}")
+
+        orders = {
+            field: sorted(_sort_key(field, name, size, mtime) for name, (size, mtime) in stats.items())
+            for field in SORT_FIELDS
+        }
+        with self._write_lock:
+            with self._lock:
+                # 与重建前的索引比较，生成增量
+                old_stats = self._stats
+                added = [entries[name] for name in sorted(stats) if name not in old_stats]
+                removed = sorted(name for name in old_stats if name not in stats)
+                modified = [entries[name] for name in sorted(stats)
+                            if name in old_stats and old_stats[name] != stats[name]]
+                self._entries = entries
+                self._stats = stats
+                self._orders = orders
+                self._files = None
+                delta = self._record(added, removed, modified)
+            logger.debug(f"文件索引已重建, 包含 {len(entries)} 个文件")
+            self._notify(delta)
+
+    def _remove(self, name: str) -> None:
+        """从索引中移除文件（需持有锁）"""
+        old = self._stats.pop(name, None)
+        if old is None:
+            return
+        del self._entries[name]
+        for field, order in self._orders.items():
+            key = _sort_key(field, name, *old)
+            position = bisect_left(order, key)
+            if position < len(order) and order[position] == key:
+                del order[position]
+
+    def update(self, names: Iterable[str]) -> None:
+        """更新发生变化的文件
+
+        Args:
+            names: 文件名
+        """
+        changes = {}
+        for name in names:
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                changes[name] = None
+                continue
+            # 只索引普通文件
+            changes[name] = (st.st_size, st.st_mtime) if stat.S_ISREG(st.st_mode) else None
+
+        if not changes:
+            return
+        with self._write_lock:
+            with self._lock:
+                added, removed, modified = [], [], []
+                for name in sorted(changes):
+                    new = changes[name]
+                    old = self._stats.get(name)
+                    if old == new:
+                        continue
+                    self._remove(name)
+                    if new is None:
+                        removed.append(name)
+                        continue
+                    info = self._entries[name] = make_file_info(name, *new)
+                    self._stats[name] = new
+                    for field, order in self._orders.items():
+                        insort(order, _sort_key(field, name, *new))
+                    (added if old is None else modified).append(info)
+                self._files = None
+                delta = self._record(added, removed, modified)
+            self._notify(delta)
+
+    def files(self) -> List[Dict[str, object]]:
+        """按名称排序的文件信息列表
+
+        Returns:
+            文件信息列表（调用方不应修改）
+        """
+        with self._lock:
+            if self._files is None:
+                self._files = [self._entries[key[0]] for key in self._orders['name']]
+            return self._files
+
+    def snapshot(self) -> Tuple[List[Dict[str, object]], int]:
+        """文件列表及其对应的版本号
+
+        Returns:
+            tuple: (按名称排序的文件信息列表, 版本号)
+        """
+        with self._lock:
+            return self.files(), self.revision
+
+    def query(self, field: str = 'name', descending: bool = False, limit: int = 100,
+              after: Optional[tuple] = None, prefix: Optional[str] = None,
+              extensions: Optional[Sequence[str]] = None) -> Tuple[List[Dict[str, object]], Optional[tuple], int]:
+        """按游标分页查询文件
+
+        Args:
+            field: 排序字段（name、size 或 mtime）
+            descending: 是否降序
+            limit: 每页数量
+            after: 上一页最后一项的键（由游标解码得到），为None时从头开始
+            prefix: 文件名前缀过滤（区分大小写）
+            extensions: 扩展名过滤
+
+        Returns:
+            tuple: (本页文件信息, 下一页的起始键（没有更多时为None）, 符合条件的文件总数)
+        """
+        extensions = normalize_extensions(extensions)
+
+        def matches(name: str) -> bool:
+            if prefix and not name.startswith(prefix):
+                return False
+            return extensions is None or os.path.splitext(name.lower())[1] in extensions
+
+        with self._lock:
+            order = self._orders[field]
+
+            # 按名称排序时前缀过滤对应一段连续的区间
+            low, high = 0, len(order)
+            if prefix and field == 'name':
+                low = bisect_left(order, (prefix,))
+                high = bisect_left(order, (prefix + _PREFIX_END,))
+
+            if prefix or extensions:
+                if field == 'name' and not extensions:
+                    total = high - low
+                else:
+                    total = sum(1 for key in order[low:high] if matches(key[-1]))
+            else:
+                total = len(order)
+
+            if descending:
+                if after is not None:
+                    high = min(high, bisect_left(order, after))
+                positions = range(high - 1, low - 1, -1)
+            else:
+                if after is not None:
+                    low = max(low, bisect_right(order, after))
+                positions = range(low, high)
+
+            keys = []
+            for position in positions:
+                key = order[position]
+                if matches(key[-1]):
+                    keys.append(key)
+                    if len(keys) > limit:
+                        break
+
+            has_more = len(keys) > limit
+            keys = keys[:limit]
+            items = [self._entries[key[-1]] for key in keys]
+
+        return items, (keys[-1] if has_more and keys else None), total
+
+    def clear(self) -> None:
+        """清空索引（不通知监听函数，版本号保持不变）"""
+        with self._lock:
+            self._entries = {}
+            self._stats = {}
+            self._orders = {field: [] for field in SORT_FIELDS}
+            self._files = None
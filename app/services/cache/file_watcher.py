@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+文件列表监视模块
+在内存中维护上传目录的文件索引：Linux 上通过 inotify 接收目录变化事件，只更新发生变化的文件；
+其他平台或 inotify 不可用时定期扫描目录。读取文件列表不需要访问磁盘
+"""
+
+import os
+import sys
+import errno
+import struct
+import ctypes
+import ctypes.util
+import select
+import logging
+import threading
+from typing import Optional, Set, Tuple
+
+from app.services.cache.file_index import FileIndex
+
+# 创建日志对象
+logger = logging.getLogger(__name__)
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# 监视的事件：不包含 IN_MODIFY，正在写入的文件在关闭时更新一次，避免每次写入都触发事件
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+# 需要重新扫描整个目录的事件（事件队列溢出、目录本身被删除或移动）
+RESCAN_MASK = IN_Q_OVERFLOW | IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+
+# struct inotify_event 的固定部分：wd, mask, cookie, len
+_EVENT_HEADER = struct.Struct('iIII')
+
+# 单次读取事件的缓冲区大小
+_READ_SIZE = 64 * 1024
+
+
+class _LibcInotify:
+    """通过 ctypes 调用 libc 的 inotify 接口"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._libc.inotify_init1.argtypes = [ctypes.c_int]
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+    def init(self) -> int:
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return fd
+
+    def add_watch(self, fd: int, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return wd
+
+
+class InotifyWatcher:
+    """基于 inotify 的目录监视器
+
+    后台线程等待事件并更新索引；sync() 在调用线程中立即处理已排队的事件，
+    本进程修改文件后调用即可读到最新的列表（事件在文件操作返回前已进入队列）
+    """
+
+    name = 'inotify'
+
+    def __init__(self, index: FileIndex):
+        """初始化监视器
+
+        Args:
+            index: 要更新的文件索引
+
+        Raises:
+            OSError: 当 inotify 不可用时
+        """
+        self.index = index
+        self._inotify = _LibcInotify()
+        self._fd = self._inotify.init()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        try:
+            self._watch()
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def _watch(self) -> None:
+        """监视目录并重建索引"""
+        os.makedirs(self.index.directory, exist_ok=True)
+        self._inotify.add_watch(self._fd, self.index.directory, WATCH_MASK)
+        self.index.rescan()
+
+    def _read_events(self) -> Tuple[Set[str], bool]:
+        """读取所有已排队的事件
+
+        Returns:
+            tuple: (发生变化的文件名, 是否需要重新扫描目录)
+        """
+        names: Set[str] = set()
+        rescan = False
+        while True:
+            try:
+                data = os.read(self._fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            if not data:
+                break
+
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & RESCAN_MASK:
+                    rescan = True
+                elif name:
+                    names.add(os.fsdecode(name))
+        return names, rescan
+
+    def mark_dirty(self) -> None:
+        """本进程修改目录后调用；修改产生的事件已在队列中，下一次 sync() 会处理"""
+
+    def sync(self) -> None:
+        """处理已排队的事件"""
+        with self._lock:
+            if self._fd < 0:
+                return
+            names, rescan = self._read_events()
+            if rescan:
+                logger.info("文件监视事件溢出或目录已变化，重新扫描上传目录")
+                try:
+                    self._watch()
+                except OSError as e:
+                    logger.error(f"重新监视上传目录失败: {str(e)}")
+                    self.index.rescan()
+            elif names:
+                self.index.update(names)
+
+    def _run(self) -> None:
+        """后台线程：等待事件并更新索引"""
+        while not self._stop.is_set():
+            try:
+                readable, _, _ = select.select([self._fd], [], [], 1.0)
+                if readable:
+                    self.sync()
+            except (OSError, ValueError) as e:
+                if self._stop.is_set():
+                    break
+                logger.error(f"处理文件监视事件时出错: {str(e)}")
+                self._stop.wait(1.0)
+
+    def start(self) -> None:
+        """启动后台线程"""
+        self._thread = threading.Thread(target=self._run, name='file-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程并关闭 inotify"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        with self._lock:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+
+class PollingWatcher:
+    """定期扫描目录的监视器，用于不支持 inotify 的平台"""
+
+    name = 'polling'
+
+    def __init__(self, index: FileIndex, interval: float):
+        """初始化监视器
+
+        Args:
+            index: 要更新的文件索引
+            interval: 扫描间隔（秒）
+        """
+        self.index = index
+        self.interval = interval
+        self._stop = threading.Event()
+        self._dirty = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(self.index.directory, exist_ok=True)
+        self.index.rescan()
+
+    def mark_dirty(self) -> None:
+        """标记目录已被本进程修改，下一次 sync() 时重新扫描"""
+        self._dirty.set()
+
+    def sync(self) -> None:
+        """目录被标记为已修改时重新扫描"""
+        if self._dirty.is_set():
+            self._dirty.clear()
+            self.index.rescan()
+
+    def _run(self) -> None:
+        """后台线程：定期扫描目录"""
+        while not self._stop.wait(self.interval):
+            self.index.rescan()
+
+    def start(self) -> None:
+        """启动后台线程"""
+        self._thread = threading.Thread(target=self._run, name='file-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+
+def create_watcher(index: FileIndex, mode: str, interval: float):
+    """创建目录监视器
+
+    Args:
+        index: 要更新的文件索引
+        mode: 监视方式：auto（优先 inotify）、inotify 或 polling
+        interval: 轮询方式的扫描间隔（秒）
+
+    Returns:
+        InotifyWatcher 或 PollingWatcher
+    """
+    if mode in ('auto', 'inotify') and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(index)
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify 不可用，改为定期扫描上传目录: {str(e)}")
+    elif mode == 'inotify':
+        logger.warning("当前平台不支持 inotify，改为定期扫描上传目录")
+    return PollingWatcher(index, interval)
@@ -9,9 +9,11 @@
 from app.services.file.storage import StorageService
 from app.services.file.metadata import MetadataService
 from app.services.file.manager import FileManager
+from app.services.file.download import DownloadService
 
 __all__ = [
     'StorageService',
     'MetadataService',
-    'FileManager'
+    'FileManager',
+    'DownloadService'
 ]
\ No newline at end of file
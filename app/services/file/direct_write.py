@@ -0,0 +1,416 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分块直写服务
+将分块直接写入预分配的目标文件，省去合并步骤
+"""
+
+import os
+import errno
+import shutil
+import struct
+import logging
+import threading
+from typing import BinaryIO, Dict, Optional, Set
+
+from app.core.config import DIRECT_WRITE_PREALLOCATE, STREAM_BUFFER_SIZE
+from app.core.exceptions import ChunkUploadError, FileMergeError
+
+# 创建日志对象
+logger = logging.getLogger(__name__)
+
+# 部分写入文件的后缀
+PART_SUFFIX = '.part'
+
+# 块位图文件名
+BITMAP_FILENAME = 'blocks.bitmap'
+
+# 位图文件头：魔数、块大小、文件大小
+BITMAP_MAGIC = b'TFBM'
+BITMAP_HEADER = struct.Struct('<4sIQ')
+
+
+def _pwrite_all(fd: int, data: bytes, offset: int) -> int:
+    """在指定偏移处写入全部数据
+
+    Args:
+        fd: 文件描述符（仅供当前调用方使用）
+        data: 要写入的数据
+        offset: 写入偏移
+
+    Returns:
+        写入的字节数
+    """
+    view = memoryview(data)
+    written = 0
+    if hasattr(os, 'pwrite'):
+        while written < len(view):
+            written += os.pwrite(fd, view[written:], offset + written)
+    else:
+        # Windows 没有 pwrite，文件描述符不共享，直接定位后写入即可
+        os.lseek(fd, offset, os.SEEK_SET)
+        while written < len(view):
+            written += os.write(fd, view[written:])
+    return written
+
+
+def _preallocate(fd: int, size: int) -> None:
+    """为目标文件分配空间
+
+    启用预分配时优先使用 posix_fallocate，不支持时退化为稀疏文件
+
+    Args:
+        fd: 文件描述符
+        size: 文件大小
+    """
+    if DIRECT_WRITE_PREALLOCATE and hasattr(os, 'posix_fallocate') and size > 0:
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError as e:
+            logger.debug(f"posix_fallocate 不可用，改用稀疏文件: {str(e)}")
+    os.ftruncate(fd, size)
+
+
+class DirectWriteFile:
+    """直写模式的目标文件
+
+    目标文件以 <文件名>.part 的形式放在该文件的临时分块目录中，
+    每个块按 块编号 * 块大小 的偏移直接写入，已写入的块记录在位图文件中。
+    所有块写完后只需 fsync 并重命名到上传目录即可完成上传。
+    """
+
+    def __init__(self, file_temp_dir: str, filename: str, file_size: int, block_size: int):
+        """初始化直写文件
+
+        Args:
+            file_temp_dir: 该文件的临时分块目录
+            filename: 文件名
+            file_size: 文件总大小
+            block_size: 块大小
+        """
+        self.file_temp_dir = file_temp_dir
+        self.filename = filename
+        self.file_size = file_size
+        self.block_size = block_size
+        self.total_blocks = max(1, -(-file_size // block_size))
+        self.part_path = os.path.join(file_temp_dir, filename + PART_SUFFIX)
+        self.bitmap_path = os.path.join(file_temp_dir, BITMAP_FILENAME)
+
+        self._lock = threading.Lock()
+        self._bitmap = bytearray((self.total_blocks + 7) // 8)
+        self._written_count = 0
+
+        self._open()
+
+    def _open(self) -> None:
+        """打开或创建目标文件和位图，已有的匹配位图会被加载以支持续传"""
+        os.makedirs(self.file_temp_dir, exist_ok=True)
+
+        if self._load_bitmap():
+            logger.info(f"加载直写位图: {self.filename}, 已写入 {self._written_count}/{self.total_blocks} 块")
+            return
+
+        # 新建目标文件并分配空间
+        fd = os.open(self.part_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            _preallocate(fd, self.file_size)
+        finally:
+            os.close(fd)
+
+        # 新建位图
+        with open(self.bitmap_path, 'wb') as f:
+            f.write(BITMAP_HEADER.pack(BITMAP_MAGIC, self.block_size, self.file_size))
+            f.write(self._bitmap)
+
+        logger.info(f"创建直写目标文件: {self.part_path}, 大小: {self.file_size}, 块数: {self.total_blocks}")
+
+    def _load_bitmap(self) -> bool:
+        """从磁盘加载位图
+
+        Returns:
+            位图是否存在且与当前文件参数一致
+        """
+        if not (os.path.exists(self.bitmap_path) and os.path.exists(self.part_path)):
+            return False
+
+        try:
+            with open(self.bitmap_path, 'rb') as f:
+                header = f.read(BITMAP_HEADER.size)
+                bitmap = f.read()
+            magic, block_size, file_size = BITMAP_HEADER.unpack(header)
+        except (OSError, struct.error) as e:
+            logger.warning(f"读取直写位图失败，将重新开始: {str(e)}")
+            return False
+
+        if magic != BITMAP_MAGIC or block_size != self.block_size or file_size != self.file_size \
+                or len(bitmap) != len(self._bitmap):
+            logger.warning(f"直写位图与当前上传参数不一致，将重新开始: {self.filename}")
+            return False
+
+        self._bitmap[:] = bitmap
+        self._written_count = sum(1 for i in range(self.total_blocks) if self.has_block(i))
+        return True
+
+    def has_block(self, block_index: int) -> bool:
+        """检查块是否已写入
+
+        Args:
+            block_index: 块编号
+
+        Returns:
+            是否已写入
+        """
+        return bool(self._bitmap[block_index >> 3] & (1 << (block_index & 7)))
+
+    def written_blocks(self) -> Set[int]:
+        """获取所有已写入的块编号
+
+        Returns:
+            已写入块编号集合
+        """
+        return {i for i in range(self.total_blocks) if self.has_block(i)}
+
+    @property
+    def written_count(self) -> int:
+        """已写入的块数"""
+        return self._written_count
+
+    def is_complete(self) -> bool:
+        """检查是否所有块都已写入"""
+        return self._written_count == self.total_blocks
+
+    def expected_block_length(self, block_index: int) -> int:
+        """获取指定块应有的长度，最后一块可能不足一个块大小
+
+        Args:
+            block_index: 块编号
+
+        Returns:
+            块长度
+        """
+        return min(self.block_size, self.file_size - block_index * self.block_size)
+
+    def write_block(self, block_index: int, data: bytes) -> bool:
+        """将块写入目标文件的对应位置
+
+        Args:
+            block_index: 块编号
+            data: 块数据
+
+        Returns:
+            该块是否为首次写入
+
+        Raises:
+            ChunkUploadError: 当块编号或块长度无效时
+        """
+        if block_index < 0 or block_index >= self.total_blocks:
+            raise ChunkUploadError(message=f"无效的块编号: {block_index}, 总块数: {self.total_blocks}")
+
+        expected = self.expected_block_length(block_index)
+        if len(data) != expected:
+            raise ChunkUploadError(message=f"块 {block_index} 长度不正确: 预期 {expected}, 实际 {len(data)}")
+
+        # 每次写入单独打开文件描述符，避免并发写入时共享文件偏移
+        fd = os.open(self.part_path, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            _pwrite_all(fd, data, block_index * self.block_size)
+        finally:
+            os.close(fd)
+
+        return self._mark_block(block_index)
+
+    def write_block_stream(self, block_index: int, stream: BinaryIO, buffer_size: int = STREAM_BUFFER_SIZE) -> bool:
+        """从流中按固定大小的缓冲区读取块数据，并直接写入目标文件的对应位置
+
+        Args:
+            block_index: 块编号
+            stream: 块数据流
+            buffer_size: 缓冲区大小
+
+        Returns:
+            该块是否为首次写入
+
+        Raises:
+            ChunkUploadError: 当块编号或块长度无效时
+        """
+        if block_index < 0 or block_index >= self.total_blocks:
+            raise ChunkUploadError(message=f"无效的块编号: {block_index}, 总块数: {self.total_blocks}")
+
+        expected = self.expected_block_length(block_index)
+        offset = block_index * self.block_size
+        received = 0
+
+        fd = os.open(self.part_path, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            while received < expected:
+                data = stream.read(min(buffer_size, expected - received))
+                if not data:
+                    break
+                _pwrite_all(fd, data, offset + received)
+                received += len(data)
+        finally:
+            os.close(fd)
+
+        # 数据不足或超出块长度都视为无效块，位图不标记，客户端可重传
+        if received != expected:
+            raise ChunkUploadError(message=f"块 {block_index} 长度不正确: 预期 {expected}, 实际 {received}")
+        if stream.read(1):
+            raise ChunkUploadError(message=f"块 {block_index} 长度不正确: 数据超过预期的 {expected} 字节")
+
+        return self._mark_block(block_index)
+
+    def write_range_stream(self, offset: int, stream: BinaryIO, buffer_size: int = STREAM_BUFFER_SIZE) -> range:
+        """从流中读取任意长度的数据并写入目标文件的指定偏移处，用于可变大小的分块
+
+        偏移必须按块大小对齐，数据长度必须是块大小的整数倍（到达文件末尾的最后一段除外），
+        写入完成后标记覆盖到的所有块。
+
+        Args:
+            offset: 写入偏移（字节）
+            stream: 数据流
+            buffer_size: 缓冲区大小
+
+        Returns:
+            写入的块编号范围
+
+        Raises:
+            ChunkUploadError: 当偏移或数据长度无效时
+        """
+        if offset < 0 or offset >= self.file_size or offset % self.block_size:
+            raise ChunkUploadError(message=f"无效的写入偏移: {offset}, 块大小: {self.block_size}, 文件大小: {self.file_size}")
+
+        limit = self.file_size - offset
+        received = 0
+
+        fd = os.open(self.part_path, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            while received < limit:
+                data = stream.read(min(buffer_size, limit - received))
+                if not data:
+                    break
+                _pwrite_all(fd, data, offset + received)
+                received += len(data)
+        finally:
+            os.close(fd)
+
+        end = offset + received
+        if received == 0:
+            raise ChunkUploadError(message=f"偏移 {offset} 处的数据为空")
+        if end < self.file_size and received % self.block_size:
+            raise ChunkUploadError(message=f"数据长度必须是块大小的整数倍: {received}, 块大小: {self.block_size}")
+        if end == self.file_size and stream.read(1):
+            raise ChunkUploadError(message=f"数据超出文件大小: {self.file_size}")
+
+        blocks = range(offset // self.block_size, -(-end // self.block_size))
+        self._mark_blocks(blocks)
+        return blocks
+
+    def _mark_block(self, block_index: int) -> bool:
+        """在位图中标记块已写入
+
+        Args:
+            block_index: 块编号
+
+        Returns:
+            该块是否为首次标记
+        """
+        return self._mark_blocks(range(block_index, block_index + 1)) > 0
+
+    def _mark_blocks(self, blocks: range) -> int:
+        """在位图中标记一段连续的块已写入，并一次性持久化涉及的位图字节
+
+        Args:
+            blocks: 块编号范围
+
+        Returns:
+            首次标记的块数
+        """
+        with self._lock:
+            marked = 0
+            for block_index in blocks:
+                if not self.has_block(block_index):
+                    self._bitmap[block_index >> 3] |= 1 << (block_index & 7)
+                    marked += 1
+
+            if marked:
+                self._written_count += marked
+                first_byte, last_byte = blocks.start >> 3, (blocks.stop - 1) >> 3
+                fd = os.open(self.bitmap_path, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+                try:
+                    _pwrite_all(fd, bytes(self._bitmap[first_byte:last_byte + 1]), BITMAP_HEADER.size + first_byte)
+                finally:
+                    os.close(fd)
+            return marked
+
+    def finalize(self, final_path: str) -> None:
+        """完成直写：fsync 目标文件并重命名到最终位置
+
+        Args:
+            final_path: 最终文件路径
+
+        Raises:
+            FileMergeError: 当仍有块未写入或重命名失败时
+        """
+        if not self.is_complete():
+            missing = [i for i in range(self.total_blocks) if not self.has_block(i)]
+            raise FileMergeError(message="块数量不足", filename=self.filename, missing_chunks=missing)
+
+        fd = os.open(self.part_path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        try:
+            os.replace(self.part_path, final_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise FileMergeError(message=str(e), filename=self.filename)
+            # 临时目录与上传目录不在同一文件系统时退化为移动
+            shutil.move(self.part_path, final_path)
+
+        if os.path.exists(self.bitmap_path):
+            os.remove(self.bitmap_path)
+
+        logger.info(f"直写文件完成: {final_path}")
+
+
+# 正在进行的直写文件 {filename: DirectWriteFile}
+_direct_writers: Dict[str, DirectWriteFile] = {}
+_direct_writers_lock = threading.Lock()
+
+
+def get_direct_writer(file_temp_dir: str, filename: str, file_size: int, block_size: int) -> DirectWriteFile:
+    """获取文件的直写对象，不存在或参数不一致时创建新的
+
+    Args:
+        file_temp_dir: 该文件的临时分块目录
+        filename: 文件名
+        file_size: 文件总大小
+        block_size: 块大小
+
+    Returns:
+        直写文件对象
+    """
+    with _direct_writers_lock:
+        writer = _direct_writers.get(filename)
+        if (writer is None or writer.file_size != file_size or writer.block_size != block_size
+                or not os.path.exists(writer.part_path)):
+            writer = DirectWriteFile(file_temp_dir, filename, file_size, block_size)
+            _direct_writers[filename] = writer
+        return writer
+
+
+def release_direct_writer(filename: str) -> Optional[DirectWriteFile]:
+    """释放文件的直写对象
+
+    Args:
+        filename: 文件名
+
+    Returns:
+        被释放的直写对象，不存在时返回None
+    """
+    with _direct_writers_lock:
+        return _direct_writers.pop(filename, None)
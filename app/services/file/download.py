@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+文件下载服务
+支持单范围和多范围（multipart/byteranges）请求、强 ETag、条件请求（If-None-Match、
+If-Modified-Since、If-Range）；WSGI 服务器提供 wsgi.file_wrapper 时（如 gunicorn）
+由服务器通过 sendfile 零拷贝发送文件内容
+"""
+
+import os
+import uuid
+import logging
+import mimetypes
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from flask import Request, Response
+from werkzeug.http import http_date, parse_date, parse_etags, parse_if_range_header, parse_range_header
+
+from app.core.config import DOWNLOAD_MAX_RANGES
+
+# 创建日志对象
+logger = logging.getLogger(__name__)
+
+# 不使用 wsgi.file_wrapper 时每次读取的缓冲区大小
+BUFFER_SIZE = 1024 * 1024
+
+# 字节范围，end 不包含在内
+ByteRange = Tuple[int, int]
+
+
+class DownloadService:
+    """文件下载服务类，根据请求头生成完整、部分或未修改的响应"""
+
+    @staticmethod
+    def make_etag(stat: os.stat_result) -> str:
+        """根据文件大小、修改时间和 inode 生成强 ETag（不含引号）
+
+        文件被替换或修改后三者至少有一个变化，因此不需要读取文件内容计算哈希
+
+        Args:
+            stat: 文件的 stat 结果
+
+        Returns:
+            ETag 值
+        """
+        return f"{stat.st_size:x}-{stat.st_mtime_ns:x}-{stat.st_ino:x}"
+
+    @staticmethod
+    def is_not_modified(req: Request, etag: str, mtime: float) -> bool:
+        """判断条件请求是否可以返回 304
+
+        同时提供 If-None-Match 和 If-Modified-Since 时只使用 If-None-Match
+
+        Args:
+            req: 请求对象
+            etag: 当前 ETag
+            mtime: 文件修改时间
+
+        Returns:
+            客户端缓存是否仍然有效
+        """
+        if_none_match = req.headers.get('If-None-Match')
+        if if_none_match:
+            return parse_etags(if_none_match).contains_weak(etag)
+
+        since = parse_date(req.headers.get('If-Modified-Since'))
+        return since is not None and int(mtime) <= since.timestamp()
+
+    @staticmethod
+    def resolve_ranges(req: Request, size: int, etag: str, mtime: float) -> Optional[List[ByteRange]]:
+        """解析 Range 请求头
+
+        Args:
+            req: 请求对象
+            size: 文件大小
+            etag: 当前 ETag
+            mtime: 文件修改时间
+
+        Returns:
+            可满足的字节范围列表；应返回完整文件时为 None；没有可满足的范围时为空列表
+        """
+        range_header = req.headers.get('Range')
+        if not range_header:
+            return None
+
+        # If-Range 不匹配时说明客户端已有的部分来自旧文件，返回完整文件
+        if_range_header = req.headers.get('If-Range')
+        if if_range_header:
+            # If-Range 只能使用强比较，弱 ETag 永远不匹配
+            if if_range_header.lstrip().startswith('W/'):
+                return None
+            if_range = parse_if_range_header(if_range_header)
+            if if_range.etag is not None:
+                if if_range.etag != etag:
+                    return None
+            elif if_range.date is None or int(mtime) != int(if_range.date.timestamp()):
+                return None
+
+        # 语法无效或顺序不符合要求的 Range 按规范忽略
+        parsed = parse_range_header(range_header)
+        if parsed is None or parsed.units != 'bytes':
+            return None
+        # 范围过多时返回完整文件，避免被用于放大请求
+        if len(parsed.ranges) > DOWNLOAD_MAX_RANGES:
+            logger.warning(f"Range 请求的范围数 {len(parsed.ranges)} 超过上限 {DOWNLOAD_MAX_RANGES}，返回完整文件")
+            return None
+
+        ranges = []
+        for start, stop in parsed.ranges:
+            if start < 0:
+                # 后缀范围：最后 -start 个字节
+                start, stop = max(size + start, 0), size
+            else:
+                stop = size if stop is None else min(stop, size)
+            if start < stop:
+                ranges.append((start, stop))
+        return ranges
+
+    @staticmethod
+    def _iter_file(file_path: str, ranges: List[ByteRange], parts: Optional[List[bytes]] = None,
+                   closing: bytes = b'') -> Iterator[bytes]:
+        """按范围读取文件内容
+
+        Args:
+            file_path: 文件路径
+            ranges: 字节范围列表
+            parts: 每个范围之前输出的分段头（多范围响应）
+            closing: 最后输出的结束分隔符（多范围响应）
+
+        Yields:
+            响应体数据块
+        """
+        with open(file_path, 'rb') as f:
+            for number, (start, stop) in enumerate(ranges):
+                if parts:
+                    yield parts[number]
+                f.seek(start)
+                remaining = stop - start
+                while remaining > 0:
+                    data = f.read(min(BUFFER_SIZE, remaining))
+                    if not data:
+                        return
+                    remaining -= len(data)
+                    yield data
+        if closing:
+            yield closing
+
+    @staticmethod
+    def send_file(req: Request, file_path: str, filename: str) -> Response:
+        """生成下载响应
+
+        Args:
+            req: 请求对象
+            file_path: 文件路径
+            filename: 下载时使用的文件名
+
+        Returns:
+            响应对象（200、206、304 或 416）
+        """
+        stat = os.stat(file_path)
+        size = stat.st_size
+        etag = DownloadService.make_etag(stat)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        headers = {
+            'Accept-Ranges': 'bytes',
+            'ETag': f'"{etag}"',
+            'Last-Modified': http_date(stat.st_mtime),
+            # 同名文件可能被重新上传，要求客户端每次验证缓存
+            'Cache-Control': 'no-cache',
+        }
+
+        if DownloadService.is_not_modified(req, etag, stat.st_mtime):
+            return Response(status=304, headers=headers)
+
+        headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+        ranges = DownloadService.resolve_ranges(req, size, etag, stat.st_mtime)
+
+        if ranges is not None and not ranges:
+            headers['Content-Range'] = f'bytes */{size}'
+            return Response(status=416, headers=headers)
+
+        if ranges is None or len(ranges) == 1:
+            start, stop = ranges[0] if ranges else (0, size)
+            if ranges:
+                headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+            headers['Content-Length'] = str(stop - start)
+
+            file_wrapper = req.environ.get('wsgi.file_wrapper')
+            if file_wrapper is not None:
+                # 服务器提供的 file_wrapper 可以使用 sendfile 零拷贝发送，
+                # 从当前位置开始，按 PEP 3333 不会发送超过 Content-Length 的数据
+                f = open(file_path, 'rb')
+                f.seek(start)
+                body = file_wrapper(f, BUFFER_SIZE)
+            else:
+                body = DownloadService._iter_file(file_path, [(start, stop)])
+
+            return Response(body, status=206 if ranges else 200, headers=headers,
+                            mimetype=mimetype, direct_passthrough=True)
+
+        # 多个范围：multipart/byteranges
+        boundary = uuid.uuid4().hex
+        parts = [
+            (f'\r\n--{boundary}\r\nContent-Type: {mimetype}\r\n'
+             f'Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n').encode('latin-1')
+            for start, stop in ranges
+        ]
+        closing = f'\r\n--{boundary}--\r\n'.encode('latin-1')
+        headers['Content-Length'] = str(sum(len(part) for part in parts) + len(closing)
+                                        + sum(stop - start for start, stop in ranges))
+
+        body = DownloadService._iter_file(file_path, ranges, parts, closing)
+        return Response(body, status=206, headers=headers,
+                        content_type=f'multipart/byteranges; boundary={boundary}', direct_passthrough=True)
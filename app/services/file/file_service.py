@@ -13,7 +13,6 @@ import hashlib
 import mmap
 import asyncio
 import aiofiles
-import gc
 import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Tuple, Optional, Union, Set
@@ -23,6 +22,9 @@ from app.config import (
 )
 from app.services.common import format_file_size, get_file_icon
 from app.services.cache.cache_service import invalidate_files_cache
+from app.core.async_runtime import run_blocking
+from app.utils.fs import scan_files
+from app.services.file.concat import concat_files
 from app.core.exceptions import FileNotFoundError, FileDeleteError
 
 # 创建日志对象
@@ -84,16 +86,15 @@ class FileService:
             tuple: (是否成功, 删除的文件数量)
         """
         try:
-            # 记录删除前的文件数量
-            files_before = len([f for f in os.listdir(UPLOAD_FOLDER) if os.path.isfile(os.path.join(UPLOAD_FOLDER, f))])
+            # 扫描一次目录，记录删除前的文件数量
+            entries = scan_files(UPLOAD_FOLDER)
+            files_before = len(entries)
 
             # 删除所有文件
             deleted_count = 0
-            for filename in os.listdir(UPLOAD_FOLDER):
-                file_path = os.path.join(UPLOAD_FOLDER, filename)
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
-                    deleted_count += 1
+            for entry in entries:
+                os.remove(entry.path)
+                deleted_count += 1
 
             # 使缓存失效
             invalidate_files_cache()
@@ -113,11 +114,7 @@ class FileService:
         Returns:
             文件名列表
         """
-        if not os.path.exists(UPLOAD_FOLDER):
-            return []
-
-        return [f for f in os.listdir(UPLOAD_FOLDER)
-                if os.path.isfile(os.path.join(UPLOAD_FOLDER, f))]
+        return [entry.name for entry in scan_files(UPLOAD_FOLDER)]
 
     @staticmethod
     def get_file_info(filename: str) -> Dict[str, Union[str, int]]:
@@ -130,12 +127,13 @@ class FileService:
             文件信息字典
         """
         file_path = FileService.get_file_path(filename)
-        if not os.path.exists(file_path):
+        try:
+            st = os.stat(file_path)
+        except OSError:
             raise FileNotFoundError(filename)
 
-        size = os.path.getsize(file_path)
-        modified_time = os.path.getmtime(file_path)
-        modified_time_str = datetime.fromtimestamp(modified_time).strftime('%Y-%m-%d %H:%M:%S')
+        size = st.st_size
+        modified_time_str = datetime.fromtimestamp(st.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
 
         return {
             'name': filename,
@@ -352,37 +350,8 @@ async def merge_chunks_async(file_temp_dir: str, final_path: str, total_chunks:
         return False
 
     try:
-        # 创建最终文件
-        async with aiofiles.open(final_path, 'wb') as outfile:
-            total_bytes_written = 0
-
-            # 按顺序处理每个块
-            for i in range(total_chunks):
-                chunk_file_path = chunk_files[i]
-
-                # 直接流式读取并写入块数据
-                async with aiofiles.open(chunk_file_path, 'rb') as chunk_file:
-                    # 使用缓冲区读取并写入，避免将整个块加载到内存
-                    buffer_size = 1024 * 1024  # 1MB缓冲区
-                    bytes_written = 0
-
-                    while True:
-                        buffer = await chunk_file.read(buffer_size)
-                        if not buffer:
-                            break
-
-                        await outfile.write(buffer)
-                        bytes_written += len(buffer)
-                        total_bytes_written += len(buffer)
-
-                # 每处理10个块或处理完最后一个块时报告进度
-                if (i + 1) % 10 == 0 or i == total_chunks - 1:
-                    progress = ((i + 1) / total_chunks) * 100
-                    logger.info(f"合并进度: {progress:.1f}%, 已写入: {format_file_size(total_bytes_written)}")
-
-                # 定期强制垃圾回收
-                if (i + 1) % 50 == 0:
-                    gc.collect()
+        # 在IO线程池中按顺序拼接块文件，优先使用内核复制，不再逐块读入内存
+        await run_blocking(concat_files, [chunk_files[i] for i in range(total_chunks)], final_path)
 
         # 验证最终文件大小
         final_size = os.path.getsize(final_path)
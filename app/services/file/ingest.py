@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分块流式写入服务
+按固定大小的缓冲区读取请求体，边计算哈希边写入磁盘，不在内存中缓存整个分块
+"""
+
+import io
+import os
+import hashlib
+import logging
+import tempfile
+from typing import BinaryIO, Union
+
+from app.core.config import STREAM_BUFFER_SIZE
+from app.core.file_transfer.chunk_index import ChunkIndex, ChunkRecord
+from app.core.exceptions import ChunkUploadError
+
+# 创建日志对象
+logger = logging.getLogger(__name__)
+
+
+def as_stream(chunk_data: Union[bytes, bytearray, BinaryIO]) -> BinaryIO:
+    """将块数据统一为可读取的流
+
+    Args:
+        chunk_data: 块数据或块数据流
+
+    Returns:
+        块数据流
+    """
+    if isinstance(chunk_data, (bytes, bytearray, memoryview)):
+        return io.BytesIO(chunk_data)
+    return chunk_data
+
+
+def ingest_chunk_file(chunk_index: ChunkIndex, chunk_number: int, stream: BinaryIO,
+                      buffer_size: int = STREAM_BUFFER_SIZE) -> ChunkRecord:
+    """将块数据流写入临时块文件
+
+    数据先写入唯一的 .tmp 文件并增量计算哈希，写完后重命名为 chunk_<块编号>_<哈希值>；
+    与块索引中已有块的哈希值相同时丢弃临时文件，不同时替换旧块文件。
+
+    Args:
+        chunk_index: 该文件的块索引
+        chunk_number: 块编号
+        stream: 块数据流
+        buffer_size: 缓冲区大小
+
+    Returns:
+        块记录
+
+    Raises:
+        ChunkUploadError: 当块数据为空时
+    """
+    file_temp_dir = chunk_index.file_temp_dir
+    hasher = hashlib.md5()
+    size = 0
+
+    # 临时文件以 . 开头，不会被块索引识别为块文件
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.chunk_{chunk_number}_', suffix='.tmp', dir=file_temp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                data = stream.read(buffer_size)
+                if not data:
+                    break
+                hasher.update(data)
+                f.write(data)
+                size += len(data)
+
+        if size == 0:
+            raise ChunkUploadError(message=f"块 {chunk_number} 数据为空", chunk_number=chunk_number)
+
+        chunk_hash = hasher.hexdigest()
+
+        # 检查该块是否已经上传
+        existing = chunk_index.get(chunk_number)
+        if existing is not None and existing.hash == chunk_hash:
+            os.remove(tmp_path)
+            logger.debug(f"块 {chunk_number} 已存在，哈希值匹配: {chunk_hash}")
+            return existing
+
+        chunk_path = os.path.join(file_temp_dir, f"chunk_{chunk_number}_{chunk_hash}")
+        os.replace(tmp_path, chunk_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # 更新块索引，删除被替换的旧块
+    old = chunk_index.add(chunk_number, chunk_hash, size, chunk_path)
+    if old is not None and old.path != chunk_path:
+        try:
+            os.remove(old.path)
+            logger.info(f"删除旧块: {os.path.basename(old.path)}, 已替换为新块: {os.path.basename(chunk_path)}")
+        except OSError as del_err:
+            logger.error(f"删除旧块时出错: {str(del_err)}")
+
+    return chunk_index.get(chunk_number)
@@ -33,13 +33,8 @@ class FileManager:
         Raises:
             FileNotFoundError: 文件不存在
         """
-        # 验证文件是否存在
-        file_path = StorageService.get_file_path(filename)
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(filename)
-        
-        # 获取文件元数据
-        return MetadataService.get_file_metadata(file_path, filename)
+        # 一次 stat 同时验证文件是否存在并获取元数据
+        return MetadataService.get_file_info(filename)
     
     @classmethod
     def list_files(cls) -> List[Dict[str, Any]]:
@@ -48,20 +43,8 @@ class FileManager:
         Returns:
             List[Dict[str, Any]]: 文件信息列表
         """
-        # 获取文件列表
-        files = StorageService.list_files()
-        
-        # 获取每个文件的元数据
-        file_info_list = []
-        for filename in files:
-            try:
-                file_path = StorageService.get_file_path(filename)
-                file_info = MetadataService.get_file_metadata(file_path, filename)
-                file_info_list.append(file_info)
-            except Exception as e:
-                logger.error(f"获取文件 {filename} 的元数据时出错: {str(e)}")
-        
-        return file_info_list
+        # 扫描一次目录获取所有文件的元数据
+        return MetadataService.get_files_info()
     
     @classmethod
     def delete_file(cls, filename: str) -> bool:
@@ -14,6 +14,7 @@ from typing import List, Dict, Any, Optional, Union
 from app.core.config import UPLOAD_FOLDER, ICON_MAPPING
 from app.services.file.storage import StorageService
 from app.utils.formatter import format_file_size
+from app.utils.fs import scan_files
 from app.core.exceptions import FileNotFoundError
 
 # 创建日志对象
@@ -52,19 +53,31 @@ class MetadataService:
             FileNotFoundError: 当文件不存在时
         """
         file_path = StorageService.get_file_path(filename)
-        if not os.path.exists(file_path):
+        try:
+            st = os.stat(file_path)
+        except OSError:
             raise FileNotFoundError(filename)
 
-        size = os.path.getsize(file_path)
-        modified_time = os.path.getmtime(file_path)
-        modified_time_str = datetime.fromtimestamp(modified_time).strftime('%Y-%m-%d %H:%M:%S')
+        return MetadataService.build_file_info(filename, st.st_size, st.st_mtime)
 
+    @staticmethod
+    def build_file_info(filename: str, size: int, mtime: float) -> Dict[str, Union[str, int]]:
+        """根据已获取的大小和修改时间生成文件信息
+
+        Args:
+            filename: 文件名
+            size: 文件大小
+            mtime: 修改时间
+
+        Returns:
+            文件信息字典
+        """
         return {
             'name': filename,
             'size': size,
             'size_formatted': format_file_size(size),
             'icon': MetadataService.get_file_icon(filename),
-            'modified_time': modified_time_str
+            'modified_time': datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
         }
 
     @staticmethod
@@ -77,17 +90,9 @@ class MetadataService:
         Returns:
             文件信息列表
         """
-        # 获取文件列表
-        files_list = StorageService.get_files_list()
-
-        # 获取每个文件的详细信息
-        files_info = []
-        for filename in files_list:
-            try:
-                file_info = MetadataService.get_file_info(filename)
-                files_info.append(file_info)
-            except Exception as e:
-                logger.error(f"获取文件信息时出错: {filename}, {str(e)}")
+        # 扫描一次目录，直接使用扫描得到的大小和修改时间
+        files_info = [MetadataService.build_file_info(entry.name, entry.size, entry.mtime)
+                      for entry in scan_files(UPLOAD_FOLDER)]
 
         # 按修改时间排序，最新的文件在前面
         files_info.sort(key=lambda x: x.get('modified_time', ''), reverse=True)
@@ -16,12 +16,17 @@ import aiofiles
 import gc
 import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple, Optional, Union, Set, BinaryIO
+from typing import Callable, List, Dict, Tuple, Optional, Union, Set, BinaryIO
 
 from app.core.config import (
     UPLOAD_FOLDER, TEMP_CHUNKS_DIR, TEMP_FILES_MAX_AGE
 )
 from app.services.cache.cache_service import invalidate_files_cache
+from app.services.file.direct_write import release_direct_writer
+from app.core.file_transfer.chunk_index import ChunkIndex, get_chunk_index, drop_chunk_index
+from app.core.async_runtime import run_blocking
+from app.utils.fs import scan_files
+from app.services.file.concat import concat_files
 from app.core.exceptions import FileNotFoundError, FileDeleteError, FileMergeError
 
 # 创建日志对象
@@ -83,16 +88,15 @@ class StorageService:
             tuple: (是否成功, 删除的文件数量)
         """
         try:
-            # 记录删除前的文件数量
-            files_before = len([f for f in os.listdir(UPLOAD_FOLDER) if os.path.isfile(os.path.join(UPLOAD_FOLDER, f))])
+            # 扫描一次目录，记录删除前的文件数量
+            entries = scan_files(UPLOAD_FOLDER)
+            files_before = len(entries)
 
             # 删除所有文件
             deleted_count = 0
-            for filename in os.listdir(UPLOAD_FOLDER):
-                file_path = os.path.join(UPLOAD_FOLDER, filename)
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
-                    deleted_count += 1
+            for entry in entries:
+                os.remove(entry.path)
+                deleted_count += 1
 
             # 使缓存失效
             invalidate_files_cache()
@@ -112,11 +116,7 @@ class StorageService:
         Returns:
             文件名列表
         """
-        if not os.path.exists(UPLOAD_FOLDER):
-            return []
-
-        return [f for f in os.listdir(UPLOAD_FOLDER)
-                if os.path.isfile(os.path.join(UPLOAD_FOLDER, f))]
+        return [entry.name for entry in scan_files(UPLOAD_FOLDER)]
 
     @staticmethod
     def clean_temp_files() -> None:
@@ -137,13 +137,16 @@ class StorageService:
                         # 如果目录超过最大保存时间，删除它
                         if age_hours > TEMP_FILES_MAX_AGE:
                             try:
+                                # 释放该文件的直写对象和块索引
+                                release_direct_writer(dirname)
+                                drop_chunk_index(dirname)
                                 shutil.rmtree(dir_path)
                                 logger.info(f"已清理过期的临时分块目录: {dirname}, 年龄: {age_hours:.2f}小时")
                             except Exception as e:
                                 logger.error(f"清理临时分块目录时出错: {str(e)}")
 
             # 清理上传状态中的过期记录
-            from app.core.file_transfer.transfer_manager import upload_states
+            from app.core.file_transfer.session_store import upload_states
             expired_files = []
 
             for filename, state in upload_states.items():
@@ -157,8 +160,7 @@ class StorageService:
 
             # 删除过期的状态记录
             for filename in expired_files:
-                if filename in upload_states:
-                    del upload_states[filename]
+                if upload_states.pop(filename, None) is not None:
                     logger.info(f"已清理过期的上传状态记录: {filename}")
 
             logger.info(f"临时文件清理完成，清理了 {len(expired_files)} 个过期状态记录")
@@ -229,18 +231,19 @@ def clean_corrupted_chunks(filename: str, corrupted_chunk_indices: Optional[List
     try:
         # 如果提供了损坏块索引，只清理这些块
         if corrupted_chunk_indices:
-            for chunk_index in corrupted_chunk_indices:
-                # 查找匹配的块文件
-                for chunk_file in os.listdir(file_temp_dir):
-                    if chunk_file.startswith(f"chunk_{chunk_index}_"):
-                        chunk_path = os.path.join(file_temp_dir, chunk_file)
-                        try:
-                            os.remove(chunk_path)
-                            cleaned_count += 1
-                            corrupted_chunks.append(chunk_index)
-                            logger.info(f"已清理损坏的块: {chunk_file}")
-                        except Exception as e:
-                            logger.error(f"清理损坏块时出错: {str(e)}")
+            index = get_chunk_index(filename, file_temp_dir)
+            for chunk_number in corrupted_chunk_indices:
+                # 从块索引中查找匹配的块文件
+                record = index.remove(chunk_number)
+                if record is None:
+                    continue
+                try:
+                    os.remove(record.path)
+                    cleaned_count += 1
+                    corrupted_chunks.append(chunk_number)
+                    logger.info(f"已清理损坏的块: {os.path.basename(record.path)}")
+                except Exception as e:
+                    logger.error(f"清理损坏块时出错: {str(e)}")
         else:
             # 如果没有提供损坏块索引，检查所有块的完整性
             # 这里可以实现更复杂的块验证逻辑
@@ -273,42 +276,40 @@ async def process_chunk_streaming(chunk_file_path: str, chunk_index: int, outfil
     Args:
         chunk_file_path: 块文件路径
         chunk_index: 块索引
-        outfile: 输出文件对象
+        outfile: 输出文件对象（aiofiles 异步文件）
 
     Returns:
         写入的字节数
     """
     try:
-        # 读取块文件并直接写入输出文件
+        # 读取块文件并直接写入输出文件，读写都在运行时的线程池中执行，不阻塞事件循环
         bytes_written = 0
         async with aiofiles.open(chunk_file_path, 'rb') as f:
-            # 使用较小的缓冲区读取和写入，避免一次性加载整个块到内存
-            buffer_size = 64 * 1024  # 64KB缓冲区
+            # 使用固定大小的缓冲区读取和写入，避免一次性加载整个块到内存
+            buffer_size = 1024 * 1024  # 1MB缓冲区
             while True:
                 chunk = await f.read(buffer_size)
                 if not chunk:
                     break
-                outfile.write(chunk)
+                await outfile.write(chunk)
                 bytes_written += len(chunk)
-                # 强制刷新写入
-                outfile.flush()
-
-                # 主动触发垃圾回收，减少内存压力
-                if bytes_written % (1024 * 1024) == 0:  # 每写入1MB
-                    gc.collect()
 
         return bytes_written
     except Exception as e:
         logger.error(f"流式处理块文件时出错: {str(e)}")
         return 0
 
-async def merge_chunks_async(file_temp_dir: str, final_path: str, total_chunks: int) -> bool:
-    """使用流式处理合并文件块，避免高内存消耗
+async def merge_chunks_async(file_temp_dir: str, final_path: str, total_chunks: int,
+                             chunk_index: Optional[ChunkIndex] = None,
+                             progress_callback: Optional[Callable[[int, int], None]] = None) -> bool:
+    """合并文件块，块数据尽量在内核中复制，不经过用户态缓冲区
 
     Args:
         file_temp_dir: 临时块目录
         final_path: 最终文件路径
         total_chunks: 总块数
+        chunk_index: 块索引（可选，未提供时扫描一次临时目录生成）
+        progress_callback: 进度回调（可选），每合并一个块后以 (已合并块数, 总块数) 调用
 
     Returns:
         是否成功合并
@@ -319,48 +320,18 @@ async def merge_chunks_async(file_temp_dir: str, final_path: str, total_chunks:
             logger.error(f"临时目录不存在: {file_temp_dir}")
             raise FileMergeError(message="临时目录不存在")
 
-        # 检查是否有足够的块
-        chunk_files = os.listdir(file_temp_dir)
-        if len(chunk_files) < total_chunks:
-            logger.error(f"块数量不足: 预期 {total_chunks}, 实际 {len(chunk_files)}")
-
-            # 找出缺失的块
-            missing_chunks = []
-            for i in range(total_chunks):
-                found = False
-                for chunk_file in chunk_files:
-                    if chunk_file.startswith(f"chunk_{i}_"):
-                        found = True
-                        break
-                if not found:
-                    missing_chunks.append(i)
+        if chunk_index is None:
+            chunk_index = ChunkIndex(file_temp_dir)
 
+        # 检查是否有缺失的块
+        missing_chunks = chunk_index.missing(total_chunks)
+        if missing_chunks:
+            logger.error(f"块数量不足: 预期 {total_chunks}, 缺失 {len(missing_chunks)}")
             raise FileMergeError(message="块数量不足", filename=os.path.basename(final_path), missing_chunks=missing_chunks)
 
-        # 创建输出文件
-        with open(final_path, 'wb') as outfile:
-            # 按顺序处理每个块
-            for chunk_index in range(total_chunks):
-                # 查找匹配的块文件
-                chunk_file_path = None
-                for chunk_file in chunk_files:
-                    if chunk_file.startswith(f"chunk_{chunk_index}_"):
-                        chunk_file_path = os.path.join(file_temp_dir, chunk_file)
-                        break
-
-                if not chunk_file_path:
-                    logger.error(f"找不到块 {chunk_index}")
-                    raise FileMergeError(message=f"找不到块 {chunk_index}", filename=os.path.basename(final_path))
-
-                # 流式处理块并写入输出文件
-                bytes_written = await process_chunk_streaming(chunk_file_path, chunk_index, outfile)
-
-                if bytes_written == 0:
-                    logger.error(f"处理块 {chunk_index} 时出错")
-                    raise FileMergeError(message=f"处理块 {chunk_index} 时出错", filename=os.path.basename(final_path))
-
-                # 主动触发垃圾回收，减少内存压力
-                gc.collect()
+        # 在IO线程池中按顺序拼接块文件，优先使用内核复制（reflink、copy_file_range、sendfile）
+        await run_blocking(concat_files, chunk_index.ordered_paths(total_chunks), final_path,
+                           progress_callback=progress_callback)
 
         logger.info(f"文件合并成功: {final_path}")
         return True
@@ -8,7 +8,6 @@ import hashlib
 import mmap
 import asyncio
 import aiofiles
-import gc
 import time
 from datetime import datetime, timedelta
 
@@ -16,6 +15,8 @@ from app.config import (
     UPLOAD_FOLDER, TEMP_CHUNKS_DIR, TEMP_FILES_MAX_AGE, UPLOAD_STATUS
 )
 from app.services.common import get_file_icon, format_file_size
+from app.core.async_runtime import run_blocking
+from app.services.file.concat import concat_files
 
 # 创建日志对象
 logger = logging.getLogger(__name__)
@@ -238,37 +239,8 @@ async def merge_chunks_async(file_temp_dir, final_path, total_chunks):
         return False
 
     try:
-        # 创建最终文件
-        async with aiofiles.open(final_path, 'wb') as outfile:
-            total_bytes_written = 0
-
-            # 按顺序处理每个块
-            for i in range(total_chunks):
-                chunk_file_path = chunk_files[i]
-
-                # 直接流式读取并写入块数据
-                async with aiofiles.open(chunk_file_path, 'rb') as chunk_file:
-                    # 使用缓冲区读取并写入，避免将整个块加载到内存
-                    buffer_size = 1024 * 1024  # 1MB缓冲区
-                    bytes_written = 0
-
-                    while True:
-                        buffer = await chunk_file.read(buffer_size)
-                        if not buffer:
-                            break
-
-                        await outfile.write(buffer)
-                        bytes_written += len(buffer)
-                        total_bytes_written += len(buffer)
-
-                # 每处理10个块或处理完最后一个块时报告进度
-                if (i + 1) % 10 == 0 or i == total_chunks - 1:
-                    progress = ((i + 1) / total_chunks) * 100
-                    logger.info(f"合并进度: {progress:.1f}%, 已写入: {format_file_size(total_bytes_written)}")
-
-                # 定期强制垃圾回收
-                if (i + 1) % 50 == 0:
-                    gc.collect()
+        # 在IO线程池中按顺序拼接块文件，优先使用内核复制，不再逐块读入内存
+        await run_blocking(concat_files, [chunk_files[i] for i in range(total_chunks)], final_path)
 
         # 验证最终文件大小
         final_size = os.path.getsize(final_path)
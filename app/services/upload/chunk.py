@@ -79,14 +79,19 @@ class ChunkUploadService:
             raise FileUploadError(error_msg)
 
     @staticmethod
-    async def process_upload_chunk(filename: str, chunk_number: int, total_chunks: int, chunk_data: bytes) -> Tuple[bool, Dict[str, Any]]:
+    async def process_upload_chunk(filename: str, chunk_number: int, total_chunks: int,
+                                   chunk_data: Union[bytes, BinaryIO], file_size: Optional[int] = None,
+                                   chunk_size: Optional[int] = None, offset: Optional[int] = None) -> Tuple[bool, Dict[str, Any]]:
         """处理上传的文件块
 
         Args:
             filename: 文件名
             chunk_number: 块编号
             total_chunks: 总块数
-            chunk_data: 块数据
+            chunk_data: 块数据或块数据流
+            file_size: 文件总大小（可选，直写模式需要）
+            chunk_size: 分块大小（可选，直写模式需要；按偏移上传时为块粒度）
+            offset: 写入偏移（可选，按偏移上传可变长度分块时使用）
 
         Returns:
             tuple: (是否成功, 状态信息)
@@ -95,7 +100,9 @@ class ChunkUploadService:
             ChunkUploadError: 当块上传失败时
         """
         try:
-            return await TransferManager.process_chunk_upload(filename, chunk_number, total_chunks, chunk_data)
+            return await TransferManager.process_chunk_upload(
+                filename, chunk_number, total_chunks, chunk_data, file_size=file_size, chunk_size=chunk_size,
+                offset=offset)
         except Exception as e:
             error_msg = f"处理文件块上传时出错: {str(e)}"
             logger.error(error_msg)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分块大小协商服务
+根据文件大小、当前负载和实测吞吐量为客户端推荐分块参数
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+from app.core.config import (
+    CHUNK_SIZE, UPLOAD_STATUS, DIRECT_WRITE_ENABLED, UPLOAD_MAX_PARALLEL_CHUNKS,
+    ADAPTIVE_CHUNK_ENABLED, ADAPTIVE_CHUNK_MIN_SIZE, ADAPTIVE_CHUNK_MAX_SIZE, ADAPTIVE_CHUNK_TARGET_SECONDS
+)
+
+# 创建日志对象
+logger = logging.getLogger(__name__)
+
+# 按文件大小推荐分块时的目标请求数，大文件的分块会增大到请求数不超过该值（受最大分块大小限制）
+TARGET_CHUNK_COUNT = 256
+
+# 吞吐量样本的有效期（秒），超过后不再作为推荐依据
+THROUGHPUT_MAX_AGE = 300
+
+
+class ThroughputMeter:
+    """分块请求吞吐量统计
+
+    记录每个分块请求的字节数和耗时，以指数加权移动平均计算单个请求的吞吐量（字节/秒）
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        """初始化吞吐量统计
+
+        Args:
+            alpha: 新样本的权重
+        """
+        self.alpha = alpha
+        self._rate: Optional[float] = None
+        self._updated_at = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, nbytes: int, seconds: float) -> None:
+        """记录一个分块请求
+
+        Args:
+            nbytes: 请求体字节数
+            seconds: 请求耗时（秒）
+        """
+        if nbytes <= 0 or seconds <= 0:
+            return
+        rate = nbytes / seconds
+        with self._lock:
+            self._rate = rate if self._rate is None else self._rate + self.alpha * (rate - self._rate)
+            self._updated_at = time.monotonic()
+
+    @property
+    def rate(self) -> Optional[float]:
+        """当前的吞吐量（字节/秒），没有有效样本时为None"""
+        with self._lock:
+            if self._rate is None or time.monotonic() - self._updated_at > THROUGHPUT_MAX_AGE:
+                return None
+            return self._rate
+
+    def reset(self) -> None:
+        """清除统计"""
+        with self._lock:
+            self._rate = None
+            self._updated_at = 0.0
+
+
+# 全局分块请求吞吐量统计
+throughput_meter = ThroughputMeter()
+
+
+class ChunkSizingService:
+    """分块大小协商服务类"""
+
+    @staticmethod
+    def get_active_upload_count() -> int:
+        """获取正在进行的上传数
+
+        Returns:
+            状态为上传中的文件数
+        """
+        from app.core.file_transfer.transfer_manager import upload_states
+        return sum(1 for state in list(upload_states.values())
+                   if state.get('status') == UPLOAD_STATUS['UPLOADING'])
+
+    @staticmethod
+    def align(size: int, block_size: int) -> int:
+        """将大小向下对齐到块大小的整数倍（至少一个块）
+
+        Args:
+            size: 大小
+            block_size: 块大小
+
+        Returns:
+            对齐后的大小
+        """
+        return max(block_size, size // block_size * block_size)
+
+    @staticmethod
+    def recommend(file_size: int, client_throughput: Optional[float] = None) -> Dict[str, Any]:
+        """为上传推荐分块参数
+
+        自适应模式下，分块大小取以下两者中较小的一个：
+        - 按文件大小：使请求数不超过 TARGET_CHUNK_COUNT
+        - 按吞吐量：使单个请求耗时约为 ADAPTIVE_CHUNK_TARGET_SECONDS（没有吞吐量数据时使用 CHUNK_SIZE）
+        并发请求数按当前正在进行的上传数平分。
+
+        Args:
+            file_size: 文件大小
+            client_throughput: 客户端实测的单个分块请求吞吐量（字节/秒，可选）
+
+        Returns:
+            分块参数
+        """
+        active_uploads = ChunkSizingService.get_active_upload_count()
+        max_parallel = max(1, UPLOAD_MAX_PARALLEL_CHUNKS // max(1, active_uploads))
+
+        # 未启用直写时服务器只能按固定块号合并，使用固定分块
+        if not (ADAPTIVE_CHUNK_ENABLED and DIRECT_WRITE_ENABLED):
+            return {
+                'adaptive': False,
+                'chunk_size': CHUNK_SIZE,
+                'block_size': CHUNK_SIZE,
+                'min_chunk_size': CHUNK_SIZE,
+                'max_chunk_size': CHUNK_SIZE,
+                'max_parallel_chunks': max_parallel,
+                'target_chunk_seconds': ADAPTIVE_CHUNK_TARGET_SECONDS
+            }
+
+        block_size = ADAPTIVE_CHUNK_MIN_SIZE
+        size_based = -(-file_size // TARGET_CHUNK_COUNT)
+
+        throughput = client_throughput or throughput_meter.rate
+        throughput_based = int(throughput * ADAPTIVE_CHUNK_TARGET_SECONDS) if throughput else CHUNK_SIZE
+
+        chunk_size = min(size_based, throughput_based, ADAPTIVE_CHUNK_MAX_SIZE)
+        chunk_size = ChunkSizingService.align(chunk_size, block_size)
+
+        logger.debug(f"推荐分块参数: 文件大小 {file_size}, 吞吐量 {throughput}, 进行中的上传 {active_uploads}, "
+                     f"分块大小 {chunk_size}, 并发数 {max_parallel}")
+
+        return {
+            'adaptive': True,
+            'chunk_size': chunk_size,
+            'block_size': block_size,
+            'min_chunk_size': block_size,
+            'max_chunk_size': ChunkSizingService.align(ADAPTIVE_CHUNK_MAX_SIZE, block_size),
+            'max_parallel_chunks': max_parallel,
+            'target_chunk_seconds': ADAPTIVE_CHUNK_TARGET_SECONDS
+        }
+
+    @staticmethod
+    def record_throughput(nbytes: Optional[int], seconds: float) -> None:
+        """记录一个分块请求的吞吐量样本
+
+        Args:
+            nbytes: 请求体字节数（未知时忽略）
+            seconds: 请求处理耗时（秒）
+        """
+        if nbytes:
+            throughput_meter.record(nbytes, seconds)
@@ -10,6 +10,7 @@ import os
 import logging
 from typing import Tuple, Dict, Any, Optional, List
 
+from app.core.config import MAX_CONTENT_LENGTH
 from app.core.security.file_validator import FileValidator
 from app.core.exceptions import FileUploadError
 
@@ -69,3 +70,34 @@ class UploadValidatorService:
             raise FileUploadError(error_message)
         
         return True, ""
+    
+    @staticmethod
+    def validate_direct_write_request(file_size: Optional[int], chunk_size: Optional[int], total_chunks: int) -> Tuple[bool, str]:
+        """验证直写模式的分块参数
+        
+        直写模式会按文件大小预分配目标文件，因此需要检查文件大小上限以及块数是否与大小一致
+        
+        Args:
+            file_size: 文件总大小
+            chunk_size: 分块大小
+            total_chunks: 总块数
+            
+        Returns:
+            tuple: (是否有效, 错误信息)
+            
+        Raises:
+            FileUploadError: 当参数无效时
+        """
+        error_message = ""
+        if not file_size or not chunk_size or file_size <= 0 or chunk_size <= 0:
+            error_message = f"无效的文件大小或分块大小: {file_size}, {chunk_size}"
+        elif file_size > MAX_CONTENT_LENGTH:
+            error_message = f"文件大小超过限制: {file_size}, 最大: {MAX_CONTENT_LENGTH}"
+        elif -(-file_size // chunk_size) != total_chunks:
+            error_message = f"总块数与文件大小不一致: {total_chunks}"
+        
+        if error_message:
+            logger.warning(f"直写参数验证失败: {error_message}")
+            raise FileUploadError(error_message)
+        
+        return True, ""
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+文件系统工具模块
+提供基于 os.scandir 的目录扫描：文件类型来自目录项本身，大小和修改时间只需一次 stat
+（Windows 上直接使用目录枚举返回的属性，无需额外的系统调用）
+"""
+
+import os
+from typing import List, NamedTuple
+
+
+class FileEntry(NamedTuple):
+    """目录中的一个普通文件"""
+    name: str
+    path: str
+    size: int
+    mtime: float
+
+
+def scan_files(directory: str) -> List[FileEntry]:
+    """扫描目录中的普通文件（不递归，不包含目录和指向目录的链接）
+
+    扫描过程中被删除的文件会被跳过；目录不存在时返回空列表
+
+    Args:
+        directory: 目录路径
+
+    Returns:
+        文件列表（按目录枚举顺序）
+    """
+    entries = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append(FileEntry(entry.name, entry.path, st.st_size, st.st_mtime))
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    return entries
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分块处理运行时基准测试
+对比每个请求调用 asyncio.run 与提交到共享异步IO运行时的分块吞吐量（chunks/sec）
+
+用法:
+    python benchmarks/bench_chunk_runtime.py --chunks 400 --chunk-size 262144 --threads 8
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# 使用测试环境配置，上传目录位于系统临时目录
+os.environ.setdefault('FLASK_ENV', 'test')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.file_transfer.transfer_manager import TransferManager
+from app.core.async_runtime import AsyncRuntime
+
+
+def run_benchmark(label, runner, chunks, chunk_size, threads):
+    """以多个线程模拟并发请求，统计分块吞吐量
+
+    Args:
+        label: 测试名称
+        runner: 执行协程的函数
+        chunks: 每个文件的块数
+        chunk_size: 块大小
+        threads: 并发请求线程数
+
+    Returns:
+        float: 每秒处理的块数
+    """
+    data = os.urandom(chunk_size)
+
+    def upload_file(file_index):
+        filename = f"bench_{label}_{file_index}.dat"
+        for chunk_number in range(chunks):
+            runner(TransferManager.process_chunk_upload(filename, chunk_number, chunks + 1, data))
+        TransferManager.cancel_upload(filename)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(upload_file, range(threads)))
+    elapsed = time.perf_counter() - start
+
+    total = chunks * threads
+    rate = total / elapsed
+    print(f"{label:<16} {total} 块, 耗时 {elapsed:.2f}s, {rate:.1f} chunks/sec")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分块处理运行时基准测试')
+    parser.add_argument('--chunks', type=int, default=200, help='每个文件上传的块数')
+    parser.add_argument('--chunk-size', type=int, default=256 * 1024, help='块大小（字节）')
+    parser.add_argument('--threads', type=int, default=8, help='并发请求线程数')
+    args = parser.parse_args()
+
+    before = run_benchmark('asyncio.run', asyncio.run, args.chunks, args.chunk_size, args.threads)
+
+    runtime = AsyncRuntime()
+    runtime.start()
+    try:
+        after = run_benchmark('shared runtime', runtime.run, args.chunks, args.chunk_size, args.threads)
+    finally:
+        runtime.stop()
+
+    print(f"提升: {after / before:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
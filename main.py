@@ -18,6 +18,8 @@ logger = logging.getLogger(__name__)
 
 # 导入应用
 from app import create_app, exit_event, start_scheduler
+from app.core.async_runtime import stop_async_runtime
+from app.services.cache.cache_service import stop_file_watcher
 from app.utils.ip import get_local_ip
 from app.utils.resource import resource_path
 
@@ -106,6 +108,8 @@ class ApplicationManager:
             logger.info('\n正在停止服务器...')
             self.server_running = False
             exit_event.set()
+            stop_async_runtime()
+            stop_file_watcher()
 
     def run(self) -> None:
         """运行应用程序"""
@@ -18,8 +18,27 @@ document.addEventListener('DOMContentLoaded', function() {
     const pauseResumeBtn = document.getElementById('pauseResumeBtn');
     const cancelBtn = document.getElementById('cancelBtn');
 
+    // 上传参数，由服务器在页面中提供
+    const uploadConfig = window.UPLOAD_CONFIG || {};
+    // 分块大小（服务器不支持自适应分块时使用）
+    const CHUNK_SIZE = uploadConfig.chunkSize || 5 * 1024 * 1024;
+    // 启用分块上传的文件大小阈值
+    const CHUNKED_UPLOAD_THRESHOLD = uploadConfig.chunkedUploadThreshold || 50 * 1024 * 1024;
+    // 同时上传的分块请求数
+    const MAX_PARALLEL_CHUNKS = uploadConfig.maxParallelChunks || 4;
+    // 单个分块的最大重试次数
+    const MAX_CHUNK_RETRIES = 3;
+    // 等待服务器后台合并时轮询上传状态的间隔（防止错过完成事件）
+    const MERGE_POLL_INTERVAL = 3000;
+
     // 保存当前活动的XHR请求，用于取消上传
     let activeXHR = null;
+    // 中止当前文件所有分块请求的函数，分块上传进行中时有效
+    let abortChunkUploads = null;
+    // 最近实测的单个分块请求吞吐量（字节/秒），用于向服务器请求分块参数
+    let measuredThroughput = 0;
+    // 等待服务器后台合并的文件 {文件名: 收到合并结果时的回调}
+    const mergeWaiters = new Map();
     let isCancelled = false;
     let isPaused = false;
     let isUploading = false;
@@ -31,6 +50,7 @@ document.addEventListener('DOMContentLoaded', function() {
         file: null,
         fileIndex: 0,
         chunkIndex: 0,
+        uploadedChunks: [],
         uploadedSize: 0,
         chunkUploadedSize: 0
     };
@@ -234,11 +254,8 @@ document.addEventListener('DOMContentLoaded', function() {
             // 设置当前上传的文件名为进度条容器的数据属性
             progressContainer.setAttribute('data-filename', file.name);
 
-            // 为大文件使用分块上传
-            const CHUNK_SIZE = 5 * 1024 * 1024; // 5MB 分块
-
-            // 如果文件小于 50MB，使用普通上传
-            if (file.size < 50 * 1024 * 1024) {
+            // 如果文件小于分块上传阈值，使用普通上传，否则使用分块上传
+            if (file.size < CHUNKED_UPLOAD_THRESHOLD) {
                 uploadWholeFile(file);
             } else {
                 uploadLargeFile(file);
@@ -363,19 +380,62 @@ document.addEventListener('DOMContentLoaded', function() {
 
         // 分块上传大文件
         function uploadLargeFile(file) {
-            const CHUNK_SIZE = 5 * 1024 * 1024; // 5MB 分块
-            const totalChunks = Math.ceil(file.size / CHUNK_SIZE);
+            // 先向服务器获取推荐的分块参数，获取失败时使用页面提供的固定分块大小
+            const query = new URLSearchParams({ file_size: file.size });
+            if (measuredThroughput) {
+                query.set('throughput', Math.round(measuredThroughput));
+            }
+
+            fetch(`/api/v1/upload/params?${query.toString()}`)
+                .then(response => response.json())
+                .then(data => {
+                    startChunkedUpload(file, data.success ? data : null);
+                })
+                .catch(error => {
+                    console.error("获取分块参数时出错:", error);
+                    startChunkedUpload(file, null);
+                });
+        }
+
+        // 按块上传大文件，sizing 为服务器推荐的分块参数
+        function startChunkedUpload(file, sizing) {
+            // 自适应模式下按字节偏移上传可变长度的分块，块粒度为 blockSize；否则每次上传一个固定大小的块
+            const adaptive = !!(sizing && sizing.adaptive);
+            const blockSize = sizing ? sizing.block_size : CHUNK_SIZE;
+            const minChunkSize = sizing ? sizing.min_chunk_size : CHUNK_SIZE;
+            const maxChunkSize = sizing ? sizing.max_chunk_size : CHUNK_SIZE;
+            const maxParallel = sizing ? sizing.max_parallel_chunks : MAX_PARALLEL_CHUNKS;
+            const targetChunkMs = (sizing ? sizing.target_chunk_seconds : 2) * 1000;
+            let chunkSize = sizing ? sizing.chunk_size : CHUNK_SIZE;
+            const totalBlocks = Math.ceil(file.size / blockSize);
 
             // 从暂停位置恢复
-            const isResuming = pauseInfo.file && pauseInfo.file.name === file.name;
-            let chunkIndex = isResuming ? pauseInfo.chunkIndex : 0;
-            let chunkUploadedSize = isResuming ? pauseInfo.chunkUploadedSize : 0;
+            const isResuming = pauseInfo.file && pauseInfo.file.name === file.name && pauseInfo.blockSize === blockSize;
+            // 已确认上传成功的块，恢复上传时跳过这些块
+            const uploadedBlocks = new Set();
+            let uploadedBlockBytes = 0;
+            // 已分配给正在进行或等待重试的请求的块
+            const assignedBlocks = new Set();
+            // 正在上传的请求 {请求编号: {xhr, loaded}}
+            const inFlight = new Map();
+            // 每个范围的重试次数（按起始块编号）
+            const retryCounts = new Map();
+            let nextRequestId = 0;
+            // 查找未上传块的起始位置
+            let scanFrom = 0;
+            // 等待重试的请求数
+            let retryingCount = 0;
+            let finished = false;
+
+            (isResuming ? pauseInfo.uploadedChunks : []).forEach(markBlockUploaded);
 
             console.log("大文件上传", isResuming ? "恢复上传" : "开始上传",
                        "文件:", file.name,
-                       "当前块:", chunkIndex,
-                       "总块数:", totalChunks,
-                       "已上传块大小:", formatFileSize(chunkUploadedSize));
+                       "已上传块数:", uploadedBlocks.size,
+                       "总块数:", totalBlocks,
+                       "自适应分块:", adaptive,
+                       "分块大小:", formatFileSize(chunkSize),
+                       "并发数:", maxParallel);
 
             // 首先检查服务器端的上传状态，确保不是暂停状态
             fetch(`/upload_state/${encodeURIComponent(file.name)}`)
@@ -409,203 +469,414 @@ document.addEventListener('DOMContentLoaded', function() {
                             showToast(`上传错误: ${data.error}`, "warning");
                         }
 
-                        // 如果服务器有更新的块索引信息，使用服务器的信息
-                        if (data.last_chunk > chunkIndex) {
-                            console.log(`使用服务器保存的块索引: ${data.last_chunk}`);
-                            chunkIndex = data.last_chunk;
-                            // 更新暂停信息
-                            pauseInfo.chunkIndex = chunkIndex;
-                        }
-
-                        // 如果服务器有总块数信息，验证是否与客户端计算的一致
-                        if (data.total_chunks > 0 && data.total_chunks !== totalChunks) {
-                            console.warn(`服务器端总块数(${data.total_chunks})与客户端计算的(${totalChunks})不一致`);
+                        // 服务器已保存的块无需重新上传（仅在服务器总块数与客户端一致时使用）
+                        if (data.total_chunks === totalBlocks && Array.isArray(data.uploaded_chunks)) {
+                            data.uploaded_chunks.forEach(markBlockUploaded);
+                            console.log(`服务器已保存 ${data.uploaded_chunks.length} 个块，将跳过这些块`);
+                        } else if (data.total_chunks > 0 && data.total_chunks !== totalBlocks) {
+                            // 如果服务器有总块数信息，验证是否与客户端计算的一致
+                            console.warn(`服务器端总块数(${data.total_chunks})与客户端计算的(${totalBlocks})不一致`);
                         }
-
-                        // 继续上传
-                        uploadNextChunk();
                     } else {
                         console.error("获取上传状态失败:", data.error);
-                        uploadNextChunk(); // 仍然尝试上传
                     }
+                    // 继续上传
+                    fillWindow();
                 })
                 .catch(error => {
                     console.error("检查上传状态时出错:", error);
-                    uploadNextChunk(); // 出错时仍然尝试上传
+                    fillWindow(); // 出错时仍然尝试上传
+                });
+
+            // 块的字节长度，最后一块可能不足一个块大小
+            function blockLength(index) {
+                return Math.min(file.size, (index + 1) * blockSize) - index * blockSize;
+            }
+
+            function markBlockUploaded(index) {
+                if (index >= 0 && index < totalBlocks && !uploadedBlocks.has(index)) {
+                    uploadedBlocks.add(index);
+                    uploadedBlockBytes += blockLength(index);
+                }
+            }
+
+            function unmarkBlockUploaded(index) {
+                if (uploadedBlocks.delete(index)) {
+                    uploadedBlockBytes -= blockLength(index);
+                    scanFrom = Math.min(scanFrom, index);
+                }
+            }
+
+            // 计算当前文件已上传的字节数（已完成的块加上正在上传的请求）
+            function getChunkUploadedSize() {
+                let size = uploadedBlockBytes;
+                inFlight.forEach(entry => {
+                    size += entry.loaded;
+                });
+                return size;
+            }
+
+            // 保存进度信息，以便暂停后恢复
+            function savePauseInfo() {
+                pauseInfo.file = file;
+                pauseInfo.fileIndex = currentFileIndex;
+                pauseInfo.uploadedSize = uploadedSize;
+                pauseInfo.blockSize = blockSize;
+                pauseInfo.uploadedChunks = Array.from(uploadedBlocks);
+                pauseInfo.chunkUploadedSize = getChunkUploadedSize();
+                // 第一个未上传的块，用于通知服务器暂停位置
+                let firstMissing = 0;
+                while (uploadedBlocks.has(firstMissing)) {
+                    firstMissing++;
+                }
+                pauseInfo.chunkIndex = firstMissing;
+            }
+
+            // 更新进度条
+            function updateProgress() {
+                const fileProgress = getChunkUploadedSize();
+                const overallProgress = uploadedSize + fileProgress;
+                const percentage = Math.round((overallProgress / totalSize) * 100);
+
+                // 更新进度条
+                progressFill.style.width = `${percentage}%`;
+                progressPercent.textContent = `${percentage}%`;
+                progressSize.textContent = `${formatFileSize(overallProgress)} / ${formatFileSize(totalSize)}`;
+
+                // 通过 Socket.IO 发送进度信息
+                socket.emit('upload_progress', {
+                    filename: file.name,
+                    progress: percentage,
+                    loaded: formatFileSize(overallProgress),
+                    total: formatFileSize(totalSize)
                 });
+            }
+
+            // 根据请求耗时（包含往返时间）和吞吐量调整后续分块大小
+            function adjustChunkSize(bytes, elapsedMs) {
+                if (elapsedMs <= 0) {
+                    return;
+                }
+                const throughput = bytes / (elapsedMs / 1000);
+                measuredThroughput = measuredThroughput ? measuredThroughput * 0.7 + throughput * 0.3 : throughput;
+
+                // 只根据完整大小的请求调整，文件末尾的短请求耗时不具代表性
+                if (!adaptive || bytes < chunkSize / 2) {
+                    return;
+                }
+
+                // 请求明显快于目标耗时则加倍，明显慢于目标耗时则减半
+                let next = chunkSize;
+                if (elapsedMs < targetChunkMs / 2) {
+                    next = chunkSize * 2;
+                } else if (elapsedMs > targetChunkMs * 2) {
+                    next = chunkSize / 2;
+                }
+                next = Math.min(maxChunkSize, Math.max(minChunkSize, Math.floor(next / blockSize) * blockSize));
+
+                if (next !== chunkSize) {
+                    console.log(`调整分块大小: ${formatFileSize(chunkSize)} -> ${formatFileSize(next)}, 耗时 ${Math.round(elapsedMs)}ms, 吞吐量 ${formatFileSize(throughput)}/s`);
+                    chunkSize = next;
+                }
+            }
+
+            // 停止当前文件的上传并中止所有正在进行的分块请求
+            function stopUpload() {
+                finished = true;
+                inFlight.forEach(entry => entry.xhr.abort());
+                inFlight.clear();
+                if (abortChunkUploads === stopUpload) {
+                    abortChunkUploads = null;
+                }
+            }
+
+            // 暂停或取消时通过该函数中止当前文件的所有分块请求
+            abortChunkUploads = stopUpload;
+
+            // 上传失败时的统一处理
+            function failUpload(message) {
+                if (finished) {
+                    return;
+                }
+                stopUpload();
+                showToast(message, 'error');
+                resetUploadUI();
+                isUploading = false;
+            }
+
+            // 标记为暂停，以便用户可以恢复
+            function markPaused() {
+                isPaused = true;
+                if (currentPauseResumeBtn) {
+                    currentPauseResumeBtn.innerHTML = '<i class="fas fa-play"></i>';
+                    currentPauseResumeBtn.setAttribute('data-status', 'resume');
+                }
+                savePauseInfo();
+            }
+
+            // 取出下一段连续的未上传块，长度不超过当前分块大小
+            function takeNextRange() {
+                let start = scanFrom;
+                while (start < totalBlocks && (uploadedBlocks.has(start) || assignedBlocks.has(start))) {
+                    start++;
+                }
+                scanFrom = start;
+                if (start >= totalBlocks) {
+                    return null;
+                }
+
+                const maxBlocks = adaptive ? Math.max(1, Math.floor(chunkSize / blockSize)) : 1;
+                let end = start + 1;
+                while (end < totalBlocks && end - start < maxBlocks && !uploadedBlocks.has(end) && !assignedBlocks.has(end)) {
+                    end++;
+                }
+                for (let index = start; index < end; index++) {
+                    assignedBlocks.add(index);
+                }
+                return { start: start, end: end };
+            }
+
+            // 释放范围内的块，使其可以被重新上传
+            function releaseRange(range) {
+                for (let index = range.start; index < range.end; index++) {
+                    assignedBlocks.delete(index);
+                }
+                scanFrom = Math.min(scanFrom, range.start);
+            }
 
-            function uploadNextChunk() {
-                if (chunkIndex >= totalChunks || isCancelled) {
-                    // 所有块上传完成或上传被取消
-                    activeXHR = null;
+            // 保持最多 maxParallel 个分块请求同时进行
+            function fillWindow() {
+                if (finished || isCancelled) {
                     return;
                 }
 
                 if (isPaused) {
                     // 保存当前状态以供恢复
-                    console.log("分块上传暂停，当前块索引:", chunkIndex, "已上传块大小:", formatFileSize(chunkUploadedSize));
-                    pauseInfo.chunkIndex = chunkIndex;
-                    pauseInfo.chunkUploadedSize = chunkUploadedSize;
-                    pauseInfo.file = file;
-                    pauseInfo.fileIndex = currentFileIndex;
+                    savePauseInfo();
+                    console.log("分块上传暂停，已上传块数:", uploadedBlocks.size, "已上传块大小:", formatFileSize(pauseInfo.chunkUploadedSize));
+                    return;
+                }
+
+                while (inFlight.size < maxParallel) {
+                    const range = takeNextRange();
+                    if (!range) {
+                        break;
+                    }
+                    uploadRange(range);
+                }
+
+                // 所有块都已确认（例如恢复上传时服务器已有全部块），查询服务器的合并结果
+                if (inFlight.size === 0 && retryingCount === 0 && uploadedBlocks.size === totalBlocks) {
+                    waitForMerge();
+                }
+            }
+
+            // 等待服务器后台合并的结果，完成事件通过 upload_state_updated 推送，同时轮询上传状态作为兜底
+            function waitForMerge() {
+                stopUpload();
+                console.log(`文件 ${file.name} 所有块已上传，等待服务器合并`);
+                progressPercent.textContent = '合并中...';
+
+                let pollTimer = null;
+                const stopWaiting = function() {
+                    mergeWaiters.delete(file.name);
+                    clearInterval(pollTimer);
+                    if (abortChunkUploads === stopWaiting) {
+                        abortChunkUploads = null;
+                    }
+                };
+
+                const onMergeResult = function(state) {
+                    stopWaiting();
+                    if (isCancelled) {
+                        return;
+                    }
+
+                    if (state.status === 'completed') {
+                        console.log(`文件 ${file.name} 上传完成`);
+                        // 更新已上传总大小
+                        uploadedSize += file.size;
+
+                        // 上传下一个文件
+                        currentFileIndex++;
+                        uploadNextFile();
+                        return;
+                    }
+
+                    // 合并失败，缺失的块在恢复后重新上传
+                    console.log("文件合并失败，将在下次上传时重试");
+                    showToast(`文件合并失败: ${state.error || '未知错误'}`, 'warning');
+                    (state.missing_chunks || state.failed_chunks || []).forEach(unmarkBlockUploaded);
+                    markPaused();
+                };
+
+                const pollState = function() {
+                    fetch(`/upload_state/${encodeURIComponent(file.name)}`)
+                        .then(response => response.json())
+                        .then(state => {
+                            if (!mergeWaiters.has(file.name)) {
+                                return;
+                            }
+                            if (state.status === 'completed' || state.status === 'failed') {
+                                onMergeResult(state);
+                            } else if (state.status !== 'merging' && !isPaused) {
+                                // 服务器没有在合并（例如服务重启中断了合并），重新上传最后一块以再次触发
+                                console.warn(`服务器未在合并文件 ${file.name}，重新上传最后一块`);
+                                stopWaiting();
+                                finished = false;
+                                abortChunkUploads = stopUpload;
+                                unmarkBlockUploaded(totalBlocks - 1);
+                                fillWindow();
+                            }
+                        })
+                        .catch(error => {
+                            console.error("查询合并状态时出错:", error);
+                        });
+                };
+
+                mergeWaiters.set(file.name, onMergeResult);
+                // 暂停或取消时停止等待，服务器上的合并不受影响
+                abortChunkUploads = stopWaiting;
+                pollTimer = setInterval(pollState, MERGE_POLL_INTERVAL);
+                pollState();
+            }
+
+            // 请求失败后按指数退避重试，超过最大次数后放弃整个文件
+            function retryRange(range, reason) {
+                const retries = (retryCounts.get(range.start) || 0) + 1;
+                retryCounts.set(range.start, retries);
+
+                if (retries > MAX_CHUNK_RETRIES) {
+                    failUpload(`上传失败: ${reason}`);
                     return;
                 }
 
-                const start = chunkIndex * CHUNK_SIZE;
-                const end = Math.min(file.size, start + CHUNK_SIZE);
+                const delay = 500 * Math.pow(2, retries - 1);
+                console.warn(`块 ${range.start+1}-${range.end}/${totalBlocks} ${reason}，${delay}ms 后第 ${retries} 次重试`);
+                retryingCount++;
+                setTimeout(function() {
+                    retryingCount--;
+                    if (finished || isCancelled) {
+                        return;
+                    }
+                    // 释放后重新上传
+                    releaseRange(range);
+                    fillWindow();
+                }, delay);
+            }
+
+            function uploadRange(range) {
+                const start = range.start * blockSize;
+                const end = Math.min(file.size, range.end * blockSize);
                 const chunk = file.slice(start, end);
 
-                console.log(`上传第 ${chunkIndex+1}/${totalChunks} 块, 大小: ${formatFileSize(chunk.size)}`);
+                console.log(`上传第 ${range.start+1}-${range.end}/${totalBlocks} 块, 大小: ${formatFileSize(chunk.size)}`);
 
-                // 创建 FormData 对象
-                const formData = new FormData();
-                formData.append('file', chunk);
-                formData.append('filename', file.name);
-                formData.append('chunk_number', chunkIndex);
-                formData.append('total_chunks', totalChunks);
+                // 分块参数放在查询字符串中，请求体直接发送分块数据，服务器无需解析 multipart
+                const params = new URLSearchParams({
+                    filename: file.name,
+                    // 提供文件大小和块大小，服务器可将分块直接写入目标文件
+                    file_size: file.size,
+                    chunk_size: blockSize
+                });
+                if (adaptive) {
+                    // 自适应模式按字节偏移上传，一次请求可以覆盖多个块
+                    params.set('offset', start);
+                } else {
+                    params.set('chunk_number', range.start);
+                    params.set('total_chunks', totalBlocks);
+                }
 
                 // 创建 XMLHttpRequest
                 const xhr = new XMLHttpRequest();
-                activeXHR = xhr; // 保存当前活动的XHR请求
+                const requestId = nextRequestId++;
+                const entry = { xhr: xhr, loaded: 0 };
+                const startedAt = performance.now();
+                inFlight.set(requestId, entry);
 
                 // 上传进度事件
                 xhr.upload.addEventListener('progress', function(e) {
                     if (e.lengthComputable && !isPaused && !isCancelled) {
-                        // 当前块的上传进度
-                        const currentChunkProgress = e.loaded;
-
-                        // 更新整体进度
-                        const fileProgress = chunkUploadedSize + currentChunkProgress;
-                        const overallProgress = uploadedSize + fileProgress;
-                        const percentage = Math.round((overallProgress / totalSize) * 100);
-
-                        // 保存当前进度信息用于恢复
-                        pauseInfo.uploadedSize = uploadedSize;
-
-                        // 更新进度条
-                        progressFill.style.width = `${percentage}%`;
-                        progressPercent.textContent = `${percentage}%`;
-                        progressSize.textContent = `${formatFileSize(overallProgress)} / ${formatFileSize(totalSize)}`;
-
-                        // 通过 Socket.IO 发送进度信息
-                        socket.emit('upload_progress', {
-                            filename: file.name,
-                            progress: percentage,
-                            loaded: formatFileSize(overallProgress),
-                            total: formatFileSize(totalSize)
-                        });
+                        // 当前请求的上传进度
+                        entry.loaded = e.loaded;
+                        updateProgress();
                     }
                 });
 
                 // 完成事件
                 xhr.addEventListener('load', function() {
-                    if (isCancelled) {
-                        activeXHR = null;
+                    inFlight.delete(requestId);
+                    if (isCancelled || finished) {
                         return;
                     }
 
-                    if (xhr.status === 200) {
-                        try {
-                            const response = JSON.parse(xhr.responseText);
-
-                            if (response.success) {
-                                // 更新已上传的块大小
-                                chunkUploadedSize += chunk.size;
-
-                                // 保存进度信息，以便恢复时使用
-                                pauseInfo.chunkIndex = chunkIndex + 1; // 下一个块的索引
-                                pauseInfo.chunkUploadedSize = chunkUploadedSize;
-                                pauseInfo.file = file;
-                                pauseInfo.fileIndex = currentFileIndex;
-                                pauseInfo.uploadedSize = uploadedSize;
-
-                                // 如果是最后一个块或全部块已上传
-                                if (response.status === 'completed') {
-                                    console.log(`文件 ${file.name} 上传完成`);
-                                    // 更新已上传总大小
-                                    uploadedSize += file.size;
-
-                                    // 上传下一个文件
-                                    currentFileIndex++;
-                                    activeXHR = null;
-                                    uploadNextFile();
-                                } else {
-                                    // 上传下一个块
-                                    console.log(`块 ${chunkIndex+1}/${totalChunks} 上传完成，进度: ${Math.round((chunkUploadedSize / file.size) * 100)}%`);
-                                    chunkIndex++;
-                                    uploadNextChunk();
-                                }
-                            } else {
-                                // 检查是否是因为暂停而被拒绝
-                                if (response.paused) {
-                                    console.log("服务器拒绝上传，原因: 已暂停");
-                                    isPaused = true;
-                                    if (currentPauseResumeBtn) {
-                                        currentPauseResumeBtn.innerHTML = '<i class="fas fa-play"></i>';
-                                        currentPauseResumeBtn.setAttribute('data-status', 'resume');
-                                    }
-                                    showToast("上传已暂停，点击恢复按钮继续", "success");
-                                } else if (response.merge_failed) {
-                                    // 合并失败的情况
-                                    console.log("文件块合并失败，将在下次上传时重试");
-                                    showToast(`文件合并失败: ${response.error || '未知错误'}`, 'warning');
-
-                                    // 标记为暂停，以便用户可以重试
-                                    isPaused = true;
-                                    if (currentPauseResumeBtn) {
-                                        currentPauseResumeBtn.innerHTML = '<i class="fas fa-play"></i>';
-                                        currentPauseResumeBtn.setAttribute('data-status', 'resume');
-                                    }
-                                } else {
-                                    showToast(`上传失败: ${response.error}`, 'error');
-                                    resetUploadUI();
-                                    isUploading = false;
-                                }
-                                activeXHR = null;
-                            }
-                        } catch (e) {
-                            showToast('上传失败: 无效的服务器响应', 'error');
-                            resetUploadUI();
-                            isUploading = false;
-                            activeXHR = null;
+                    if (xhr.status !== 200) {
+                        retryRange(range, xhr.statusText || `HTTP ${xhr.status}`);
+                        return;
+                    }
+
+                    let response;
+                    try {
+                        response = JSON.parse(xhr.responseText);
+                    } catch (e) {
+                        failUpload('上传失败: 无效的服务器响应');
+                        return;
+                    }
+
+                    if (response.success) {
+                        for (let index = range.start; index < range.end; index++) {
+                            assignedBlocks.delete(index);
+                            markBlockUploaded(index);
+                        }
+                        adjustChunkSize(chunk.size, performance.now() - startedAt);
+                        savePauseInfo();
+
+                        // 所有块已上传，服务器在后台合并或提交文件
+                        if (response.status === 'merging') {
+                            waitForMerge();
+                            return;
                         }
+
+                        console.log(`块 ${range.start+1}-${range.end}/${totalBlocks} 上传完成，进度: ${Math.round((getChunkUploadedSize() / file.size) * 100)}%`);
+                        updateProgress();
+                        fillWindow();
+                    } else if (response.paused) {
+                        // 检查是否是因为暂停而被拒绝，未确认的块在恢复后重新上传
+                        console.log("服务器拒绝上传，原因: 已暂停");
+                        stopUpload();
+                        markPaused();
+                        showToast("上传已暂停，点击恢复按钮继续", "success");
                     } else {
-                        showToast(`上传失败: ${xhr.statusText}`, 'error');
-                        resetUploadUI();
-                        isUploading = false;
-                        activeXHR = null;
+                        failUpload(`上传失败: ${response.error}`);
                     }
                 });
 
                 // 错误事件
                 xhr.addEventListener('error', function() {
-                    activeXHR = null;
-                    if (!isCancelled) {
-                        showToast('网络错误，上传失败', 'error');
-                        resetUploadUI();
-                        isUploading = false;
+                    inFlight.delete(requestId);
+                    if (!isCancelled && !finished) {
+                        retryRange(range, '网络错误');
                     }
                 });
 
-                // 取消事件
+                // 取消事件：被中止的块未确认上传，恢复后会重新上传
                 xhr.addEventListener('abort', function() {
-                    activeXHR = null;
+                    inFlight.delete(requestId);
                 });
 
-                // 设置超时
-                xhr.timeout = 60000; // 60秒超时
+                // 设置超时，较大的分块允许更长的时间
+                xhr.timeout = Math.max(60000, targetChunkMs * 30);
                 xhr.ontimeout = function() {
-                    activeXHR = null;
-                    if (!isCancelled && !isPaused) {
-                        showToast('分块上传超时，请检查网络连接', 'error');
-                        resetUploadUI();
-                        isUploading = false;
+                    inFlight.delete(requestId);
+                    if (!isCancelled && !isPaused && !finished) {
+                        retryRange(range, '分块上传超时');
                     }
                 };
 
                 // 发送请求
-                xhr.open('POST', '/upload/chunk');
-                xhr.send(formData);
+                xhr.open('POST', '/upload/chunk?' + params.toString());
+                xhr.setRequestHeader('Content-Type', 'application/octet-stream');
+                xhr.send(chunk);
             }
         }
 
@@ -616,7 +887,7 @@ document.addEventListener('DOMContentLoaded', function() {
     // 暂停上传
     function pauseUpload() {
         if (isUploading) {
-            console.log("执行暂停上传操作，当前XHR状态:", !!activeXHR);
+            console.log("执行暂停上传操作，当前XHR状态:", !!activeXHR, "分块上传中:", !!abortChunkUploads);
             // 先设置状态标志再中止请求
             isPaused = true;
 
@@ -649,6 +920,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 activeXHR.abort();
                 activeXHR = null;
             }
+            if (abortChunkUploads) {
+                abortChunkUploads();
+            }
 
             // 向服务器发送暂停请求，保存暂停状态
             if (pauseInfo.file) {
@@ -747,6 +1021,7 @@ document.addEventListener('DOMContentLoaded', function() {
                             showToast('服务器没有临时文件，将重新开始上传', 'warning');
                             // 重置分块索引，从头开始上传
                             pauseInfo.chunkIndex = 0;
+                            pauseInfo.uploadedChunks = [];
                             pauseInfo.chunkUploadedSize = 0;
                         }
 
@@ -772,12 +1047,15 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // 取消上传
     function cancelUpload() {
-        if (activeXHR || isPaused) {
+        if (activeXHR || abortChunkUploads || isPaused) {
             isCancelled = true;
 
             if (activeXHR) {
                 activeXHR.abort(); // 取消当前活动的XHR请求
             }
+            if (abortChunkUploads) {
+                abortChunkUploads(); // 取消所有正在上传的分块请求
+            }
 
             // 通知服务器清理临时文件
             const uploadingFileName = document.querySelector('#progressContainer').getAttribute('data-filename');
@@ -799,6 +1077,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 file: null,
                 fileIndex: 0,
                 chunkIndex: 0,
+                uploadedChunks: [],
                 uploadedSize: 0,
                 chunkUploadedSize: 0
             };
@@ -888,18 +1167,27 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
-    // 监听文件列表更新
+    // 监听文件列表快照（连接时和请求重新同步时由服务器发送）
     socket.on('files_updated', function(data) {
-        updateFileList(data.files);
+        updateFileList(data.files, data.revision);
+    });
+
+    // 监听文件列表增量
+    socket.on('files_delta', function(delta) {
+        applyFilesDelta(delta);
     });
 
-    // 定期刷新文件列表
+    // 获取文件列表
     function refreshFileList(forceRefresh = false) {
         fetch(`/files?force_refresh=${forceRefresh ? 'true' : 'false'}`)
             .then(response => response.json())
             .then(data => {
                 if (data.success) {
-                    updateFileList(data.files);
+                    // 不使用比已应用的增量更旧的列表
+                    if (data.revision < filesRevision) {
+                        return;
+                    }
+                    updateFileList(data.files, data.revision);
                     console.log(
                         `文件列表已刷新, 包含 ${data.files.length} 个文件, ` +
                         `缓存时间: ${new Date(data.cache_time * 1000).toLocaleTimeString()}, ` +
@@ -915,12 +1203,9 @@ document.addEventListener('DOMContentLoaded', function() {
             });
     }
 
-    // 页面加载时刷新文件列表
+    // 页面加载时获取文件列表，之后通过 files_delta 增量更新
     refreshFileList(true);
 
-    // 每10秒自动刷新文件列表（使用缓存）
-    setInterval(() => refreshFileList(false), 10000);
-
     // 监听上传进度更新
     socket.on('upload_progress_update', function(data) {
         console.log('收到进度更新:', data);
@@ -933,6 +1218,17 @@ document.addEventListener('DOMContentLoaded', function() {
         const status = data.status;
         const isPausedUpdate = data.paused; // Renamed to avoid conflict with global isPaused
 
+        // 后台合并的进度和结果
+        if (mergeWaiters.has(filename)) {
+            if (status === 'completed' || status === 'failed') {
+                mergeWaiters.get(filename)(data);
+                return;
+            }
+            if (status === 'merging' && typeof data.progress === 'number') {
+                progressPercent.textContent = `合并中 ${Math.round(data.progress * 100)}%`;
+            }
+        }
+
         // 如果当前正在上传的文件状态变更，也更新全局状态和进度条上的按钮
         if (isUploading && pauseInfo.file && pauseInfo.file.name === filename) {
             isPaused = isPausedUpdate; // Update the global isPaused state
@@ -953,45 +1249,124 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
-    // 更新文件列表
-    function updateFileList(files) {
-        fileList.innerHTML = '';
-
-        if (files && files.length > 0) {
-            clearAllBtn.disabled = false;
+    // 当前文件列表的版本号、按名称排序的文件名和对应的列表项
+    let filesRevision = -1;
+    let fileNames = [];
+    const fileItems = new Map();
+
+    // 创建文件列表项
+    function createFileItem(file) {
+        const li = document.createElement('li');
+        li.className = 'file-item';
+
+        li.innerHTML = `
+            <div class="file-info">
+                <i class="fas ${file.icon} file-icon"></i>
+                <div>
+                    ${file.name}<br>
+                    <small>${file.size_formatted}</small>
+                </div>
+            </div>
+            <div class="file-actions">
+                <a href="/download/${file.name}" class="action-btn download-btn">
+                    <i class="fas fa-download"></i>&nbsp; 下载
+                </a>
+                <button class="action-btn delete-btn" data-filename="${file.name}">
+                    <i class="fas fa-trash"></i>&nbsp; 删除
+                </button>
+            </div>
+        `;
+
+        return li;
+    }
 
-            files.forEach(file => {
-                const li = document.createElement('li');
-                li.className = 'file-item';
-
-                li.innerHTML = `
-                    <div class="file-info">
-                        <i class="fas ${file.icon} file-icon"></i>
-                        <div>
-                            ${file.name}<br>
-                            <small>${file.size_formatted}</small>
-                        </div>
-                    </div>
-                    <div class="file-actions">
-                        <a href="/download/${file.name}" class="action-btn download-btn">
-                            <i class="fas fa-download"></i>&nbsp; 下载
-                        </a>
-                        <button class="action-btn delete-btn" data-filename="${file.name}">
-                            <i class="fas fa-trash"></i>&nbsp; 删除
-                        </button>
-                    </div>
-                `;
+    // 文件名在有序列表中的插入位置（与服务器一样按名称排序）
+    function bisectFileName(name) {
+        let low = 0;
+        let high = fileNames.length;
+        while (low < high) {
+            const mid = (low + high) >> 1;
+            if (fileNames[mid] < name) {
+                low = mid + 1;
+            } else {
+                high = mid;
+            }
+        }
+        return low;
+    }
 
-                fileList.appendChild(li);
-            });
+    // 根据是否有文件切换占位项和清空按钮
+    function updateFileListPlaceholder() {
+        const placeholder = fileList.querySelector('.no-files');
+        if (fileNames.length > 0) {
+            clearAllBtn.disabled = false;
+            if (placeholder) {
+                placeholder.remove();
+            }
         } else {
             clearAllBtn.disabled = true;
+            if (!placeholder) {
+                const li = document.createElement('li');
+                li.className = 'no-files';
+                li.textContent = '暂无分享文件';
+                fileList.appendChild(li);
+            }
+        }
+    }
 
-            const li = document.createElement('li');
-            li.className = 'no-files';
-            li.textContent = '暂无分享文件';
+    // 使用完整的文件列表重建列表
+    function updateFileList(files, revision) {
+        fileList.innerHTML = '';
+        fileItems.clear();
+        fileNames = [];
+        filesRevision = typeof revision === 'number' ? revision : -1;
+
+        (files || []).forEach(file => {
+            const li = createFileItem(file);
+            fileItems.set(file.name, li);
+            fileNames.push(file.name);
             fileList.appendChild(li);
+        });
+        updateFileListPlaceholder();
+    }
+
+    // 在当前列表上应用增量，只修改变化的列表项
+    function applyFilesDelta(delta) {
+        // 已包含在当前列表中的增量
+        if (delta.revision <= filesRevision) {
+            return;
+        }
+        // 错过了中间的增量（或服务器已重启），请求完整的列表
+        if (delta.base_revision !== filesRevision) {
+            socket.emit('files_resync');
+            return;
         }
+
+        delta.removed.forEach(name => {
+            const li = fileItems.get(name);
+            if (li) {
+                li.remove();
+                fileItems.delete(name);
+                fileNames.splice(bisectFileName(name), 1);
+            }
+        });
+
+        delta.added.concat(delta.modified).forEach(file => {
+            const li = createFileItem(file);
+            const existing = fileItems.get(file.name);
+            if (existing) {
+                existing.replaceWith(li);
+            } else {
+                const position = bisectFileName(file.name);
+                const next = position < fileNames.length ? fileItems.get(fileNames[position]) : null;
+                fileList.insertBefore(li, next);
+                fileNames.splice(position, 0, file.name);
+            }
+            fileItems.set(file.name, li);
+        });
+
+        filesRevision = delta.revision;
+        updateFileListPlaceholder();
     }
 
     // 显示提示消息
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+异步IO运行时单元测试
+"""
+
+import os
+import sys
+import asyncio
+import threading
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.core.async_runtime import AsyncRuntime, run_blocking
+
+
+@pytest.fixture
+def runtime():
+    """创建并启动测试用的异步IO运行时"""
+    runtime = AsyncRuntime(max_workers=2)
+    runtime.start()
+    yield runtime
+    runtime.stop()
+
+
+class TestAsyncRuntime:
+    """异步IO运行时测试类"""
+
+    def test_run_uses_single_loop(self, runtime):
+        """测试多次提交的协程在同一个事件循环线程中执行"""
+        async def current_thread():
+            await asyncio.sleep(0)
+            return threading.current_thread().name
+
+        names = {runtime.run(current_thread()) for _ in range(5)}
+        assert names == {'async-runtime'}
+
+    def test_run_blocking_uses_bounded_executor(self, runtime):
+        """测试阻塞函数在运行时的线程池中执行"""
+        async def blocking_thread():
+            return await run_blocking(lambda: threading.current_thread().name)
+
+        assert runtime.run(blocking_thread()).startswith('async-io')
+
+    def test_exception_propagates(self, runtime):
+        """测试协程异常会传递给调用方"""
+        async def fail():
+            raise ValueError('boom')
+
+        with pytest.raises(ValueError):
+            runtime.run(fail())
+
+    def test_stop_and_restart(self, runtime):
+        """测试停止后再次提交会重新启动"""
+        runtime.stop()
+        assert not runtime.is_running
+
+        async def answer():
+            return 42
+
+        assert runtime.run(answer()) == 42
+        assert runtime.is_running
+
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分块索引单元测试
+"""
+
+import os
+import sys
+import asyncio
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.core.file_transfer.chunk_index import ChunkIndex, parse_chunk_filename
+from app.core.file_transfer.transfer_manager import TransferManager
+from app.services.file.storage import merge_chunks_async
+from app.core.exceptions import FileMergeError
+
+
+class TestChunkIndex:
+    """分块索引测试类"""
+
+    def test_parse_chunk_filename(self):
+        """测试解析块文件名"""
+        assert parse_chunk_filename('chunk_12_abc') == (12, 'abc')
+        assert parse_chunk_filename('chunk_x_abc') is None
+        assert parse_chunk_filename('blocks.bitmap') is None
+
+    def test_load_from_disk(self, tmp_path):
+        """测试从磁盘加载已有的块"""
+        (tmp_path / 'chunk_0_aa').write_bytes(b'12')
+        (tmp_path / 'chunk_2_cc').write_bytes(b'123')
+        (tmp_path / 'other.tmp').write_bytes(b'x')
+
+        index = ChunkIndex(str(tmp_path))
+        assert len(index) == 2
+        assert index.get(2).hash == 'cc'
+        assert index.get(2).size == 3
+        assert index.missing(4) == [1, 3]
+
+    def test_save_chunk_dedupe_and_replace(self, tmp_path):
+        """测试保存块时按哈希去重并替换旧块"""
+        index = ChunkIndex(str(tmp_path))
+        first = TransferManager._save_chunk_file(index, 0, b'hello')
+        assert TransferManager._save_chunk_file(index, 0, b'hello') == first
+
+        second = TransferManager._save_chunk_file(index, 0, b'world')
+        assert second != first
+        assert not os.path.exists(first)
+        assert os.listdir(str(tmp_path)) == [os.path.basename(second)]
+
+    def test_merge_with_index(self, tmp_path):
+        """测试按块索引顺序合并"""
+        temp_dir = tmp_path / 'chunks'
+        temp_dir.mkdir()
+        index = ChunkIndex(str(temp_dir))
+        for number, data in [(2, b'c'), (0, b'a'), (1, b'b')]:
+            TransferManager._save_chunk_file(index, number, data)
+
+        final_path = str(tmp_path / 'out.dat')
+        assert asyncio.run(merge_chunks_async(str(temp_dir), final_path, 3, index))
+        with open(final_path, 'rb') as f:
+            assert f.read() == b'abc'
+
+        with pytest.raises(FileMergeError):
+            asyncio.run(merge_chunks_async(str(temp_dir), final_path, 4, index))
+
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分块大小协商单元测试
+"""
+
+import io
+import os
+import sys
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.core.config import ADAPTIVE_CHUNK_MIN_SIZE, ADAPTIVE_CHUNK_MAX_SIZE, CHUNK_SIZE
+from app.core.config.constants import MB, GB
+from app.core.exceptions import ChunkUploadError
+from app.services.file.direct_write import DirectWriteFile
+from app.core.file_transfer.merge_queue import wait_for_merge
+from app.services.upload.chunk_sizing import ChunkSizingService, ThroughputMeter, throughput_meter
+
+
+@pytest.fixture(autouse=True)
+def reset_meter():
+    """每个测试前清除吞吐量统计"""
+    throughput_meter.reset()
+    yield
+    throughput_meter.reset()
+
+
+class TestChunkSizing:
+    """分块大小推荐测试类"""
+
+    def test_recommend_by_file_size(self):
+        """测试按文件大小推荐分块"""
+        small = ChunkSizingService.recommend(60 * MB)
+        assert small['adaptive'] is True
+        assert small['chunk_size'] == ADAPTIVE_CHUNK_MIN_SIZE
+        assert small['block_size'] == ADAPTIVE_CHUNK_MIN_SIZE
+
+        # 没有吞吐量数据时不超过默认分块大小
+        large = ChunkSizingService.recommend(20 * GB)
+        assert large['chunk_size'] == CHUNK_SIZE
+
+    def test_recommend_by_throughput(self):
+        """测试按吞吐量推荐分块"""
+        fast = ChunkSizingService.recommend(20 * GB, client_throughput=100 * MB)
+        assert fast['chunk_size'] == ADAPTIVE_CHUNK_MAX_SIZE
+
+        slow = ChunkSizingService.recommend(20 * GB, client_throughput=1.5 * MB)
+        assert slow['chunk_size'] == 3 * MB
+        assert slow['chunk_size'] % slow['block_size'] == 0
+
+    def test_throughput_meter(self):
+        """测试吞吐量的指数加权平均"""
+        meter = ThroughputMeter(alpha=0.5)
+        assert meter.rate is None
+        meter.record(100, 1.0)
+        meter.record(300, 1.0)
+        assert meter.rate == 200
+
+
+class TestRangeWrite:
+    """按偏移写入可变长度分块测试类"""
+
+    def test_write_variable_ranges(self, tmp_path):
+        """测试不同长度的分块覆盖多个块"""
+        content = os.urandom(10 * 1024 + 5)
+        writer = DirectWriteFile(str(tmp_path / 'tmp'), 'a.dat', len(content), 1024)
+
+        assert writer.write_range_stream(0, io.BytesIO(content[:3072])) == range(0, 3)
+        assert writer.write_range_stream(7168, io.BytesIO(content[7168:])) == range(7, 11)
+        assert writer.write_range_stream(3072, io.BytesIO(content[3072:7168])) == range(3, 7)
+        assert writer.is_complete()
+
+        writer.finalize(str(tmp_path / 'a.dat'))
+        with open(str(tmp_path / 'a.dat'), 'rb') as f:
+            assert f.read() == content
+
+    def test_invalid_ranges(self, tmp_path):
+        """测试未对齐的偏移和长度"""
+        writer = DirectWriteFile(str(tmp_path / 'tmp'), 'a.dat', 4096, 1024)
+        with pytest.raises(ChunkUploadError):
+            writer.write_range_stream(100, io.BytesIO(b'x' * 1024))
+        with pytest.raises(ChunkUploadError):
+            writer.write_range_stream(0, io.BytesIO(b'x' * 1500))
+        assert writer.written_count == 0
+
+
+class TestUploadParamsAPI:
+    """分块参数API测试类"""
+
+    def test_get_params(self, client):
+        """测试获取推荐的分块参数"""
+        response = client.get('/api/v1/upload/params', query_string={'file_size': 100 * MB})
+        assert response.json['success'] is True
+        assert response.json['chunk_size'] >= response.json['min_chunk_size']
+
+        response = client.get('/api/v1/upload/params')
+        assert response.json['success'] is False
+
+    def test_offset_upload(self, client, tmp_path, monkeypatch):
+        """测试按偏移上传可变长度的分块"""
+        from app.core.file_transfer import transfer_manager
+        monkeypatch.setattr(transfer_manager, 'UPLOAD_FOLDER', str(tmp_path))
+        monkeypatch.setattr(transfer_manager, 'TEMP_CHUNKS_DIR', str(tmp_path / 'chunks'))
+
+        block_size = 1024
+        content = os.urandom(block_size * 6 + 10)
+        for start, end in [(0, 2048), (5120, len(content)), (2048, 5120)]:
+            response = client.post(
+                '/api/v1/upload/chunk',
+                query_string={'filename': 'offset.dat', 'offset': start,
+                              'file_size': len(content), 'chunk_size': block_size},
+                data=content[start:end],
+                content_type='application/octet-stream'
+            )
+            assert response.json['success'] is True
+
+        assert response.json['status'] == 'merging'
+        wait_for_merge('offset.dat', timeout=10)
+        with open(str(tmp_path / 'offset.dat'), 'rb') as f:
+            assert f.read() == content
+
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])
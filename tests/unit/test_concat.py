@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+文件拼接单元测试
+"""
+
+import os
+import sys
+import errno
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.services.file.concat import FileConcatenator, available_strategies, concat_files
+from app.core.exceptions import FileMergeError
+
+
+@pytest.fixture
+def chunk_files(tmp_path):
+    """创建大小不一的块文件"""
+    paths = []
+    data = b''
+    for number, size in enumerate((4096, 100000, 1, 65536 + 7)):
+        content = os.urandom(size)
+        path = tmp_path / f'chunk_{number}'
+        path.write_bytes(content)
+        paths.append(str(path))
+        data += content
+    return paths, data
+
+
+class TestConcatFiles:
+    """文件拼接测试类"""
+
+    @pytest.mark.parametrize('strategy', available_strategies())
+    def test_each_strategy(self, tmp_path, chunk_files, strategy):
+        """测试每种复制方式单独使用时的拼接结果"""
+        paths, data = chunk_files
+        dst = tmp_path / 'merged.dat'
+        progress = []
+
+        summary = concat_files(paths, str(dst), strategies=[strategy],
+                               progress_callback=lambda done, total: progress.append((done, total)))
+
+        assert dst.read_bytes() == data
+        assert progress[-1] == (len(paths), len(paths))
+        assert sum(stat['bytes'] for stat in summary.values()) == len(data)
+        assert all('mb_per_sec' in stat for stat in summary.values())
+
+    def test_fallback_on_unsupported(self, tmp_path, chunk_files, monkeypatch):
+        """测试复制方式不支持时退回到下一种方式"""
+        paths, data = chunk_files
+
+        def unsupported(self, src, length):
+            raise OSError(errno.EOPNOTSUPP, 'not supported')
+
+        monkeypatch.setattr(FileConcatenator, '_copy_reflink', unsupported)
+        summary = concat_files(paths, str(tmp_path / 'merged.dat'), strategies=['reflink', 'buffered'])
+
+        assert (tmp_path / 'merged.dat').read_bytes() == data
+        assert list(summary) == ['buffered']
+        assert summary['buffered']['files'] == len(paths)
+
+    def test_empty_chunk(self, tmp_path, chunk_files):
+        """测试空块文件导致合并失败"""
+        paths, _ = chunk_files
+        empty = tmp_path / 'chunk_empty'
+        empty.write_bytes(b'')
+
+        with pytest.raises(FileMergeError):
+            concat_files(paths + [str(empty)], str(tmp_path / 'merged.dat'))
+
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分块直写单元测试
+"""
+
+import os
+import sys
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.services.file.direct_write import DirectWriteFile
+from app.core.exceptions import ChunkUploadError, FileMergeError
+
+
+@pytest.fixture
+def content():
+    """生成测试用的文件内容（最后一块不足一个块大小）"""
+    return os.urandom(10 * 1024 + 123)
+
+
+class TestDirectWriteFile:
+    """直写文件测试类"""
+
+    def test_write_out_of_order_and_finalize(self, tmp_path, content):
+        """测试乱序写入后提交"""
+        block_size = 1024
+        writer = DirectWriteFile(str(tmp_path / 'tmp'), 'a.bin', len(content), block_size)
+        assert writer.total_blocks == 11
+        assert os.path.getsize(writer.part_path) == len(content)
+
+        for index in reversed(range(writer.total_blocks)):
+            assert writer.write_block(index, content[index * block_size:(index + 1) * block_size])
+
+        assert writer.is_complete()
+        final_path = str(tmp_path / 'a.bin')
+        writer.finalize(final_path)
+
+        with open(final_path, 'rb') as f:
+            assert f.read() == content
+        assert not os.path.exists(writer.part_path)
+        assert not os.path.exists(writer.bitmap_path)
+
+    def test_resume_from_bitmap(self, tmp_path, content):
+        """测试从位图恢复已写入的块"""
+        block_size = 1024
+        temp_dir = str(tmp_path / 'tmp')
+        writer = DirectWriteFile(temp_dir, 'a.bin', len(content), block_size)
+        writer.write_block(0, content[:block_size])
+        writer.write_block(9, content[9 * block_size:10 * block_size])
+
+        resumed = DirectWriteFile(temp_dir, 'a.bin', len(content), block_size)
+        assert resumed.written_blocks() == {0, 9}
+        assert not resumed.write_block(0, content[:block_size])
+
+    def test_invalid_block(self, tmp_path, content):
+        """测试无效的块编号和块长度"""
+        writer = DirectWriteFile(str(tmp_path / 'tmp'), 'a.bin', len(content), 1024)
+        with pytest.raises(ChunkUploadError):
+            writer.write_block(11, b'x')
+        with pytest.raises(ChunkUploadError):
+            writer.write_block(0, b'short')
+
+    def test_finalize_incomplete(self, tmp_path, content):
+        """测试块不完整时拒绝提交"""
+        writer = DirectWriteFile(str(tmp_path / 'tmp'), 'a.bin', len(content), 1024)
+        writer.write_block(0, content[:1024])
+        with pytest.raises(FileMergeError):
+            writer.finalize(str(tmp_path / 'a.bin'))
+
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])
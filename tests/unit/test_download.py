@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+文件下载（Range、ETag、条件请求）单元测试
+"""
+
+import os
+import sys
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.core.config import UPLOAD_FOLDER
+
+FILENAME = 'range_test.bin'
+CONTENT = bytes(range(256)) * 64
+
+
+@pytest.fixture
+def download_file():
+    """在上传目录中创建测试文件"""
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    path = os.path.join(UPLOAD_FOLDER, FILENAME)
+    with open(path, 'wb') as f:
+        f.write(CONTENT)
+    yield f'/api/v1/files/{FILENAME}'
+    os.remove(path)
+
+
+class TestDownload:
+    """文件下载测试类"""
+
+    def test_full_download(self, client, download_file):
+        """测试完整下载带有 ETag 和 Accept-Ranges"""
+        response = client.get(download_file)
+        assert response.status_code == 200
+        assert response.data == CONTENT
+        assert response.headers['Accept-Ranges'] == 'bytes'
+        assert response.headers['ETag'].startswith('"')
+        assert 'attachment' in response.headers['Content-Disposition']
+
+    def test_single_range(self, client, download_file):
+        """测试单范围和后缀范围"""
+        response = client.get(download_file, headers={'Range': 'bytes=100-199'})
+        assert response.status_code == 206
+        assert response.data == CONTENT[100:200]
+        assert response.headers['Content-Range'] == f'bytes 100-199/{len(CONTENT)}'
+
+        response = client.get(download_file, headers={'Range': 'bytes=-10'})
+        assert response.status_code == 206
+        assert response.data == CONTENT[-10:]
+
+    def test_multiple_ranges(self, client, download_file):
+        """测试多范围返回 multipart/byteranges"""
+        response = client.get(download_file, headers={'Range': 'bytes=0-9,1000-1009'})
+        assert response.status_code == 206
+        assert response.mimetype == 'multipart/byteranges'
+        assert int(response.headers['Content-Length']) == len(response.data)
+        assert CONTENT[0:10] in response.data and CONTENT[1000:1010] in response.data
+        assert f'Content-Range: bytes 1000-1009/{len(CONTENT)}'.encode() in response.data
+
+    def test_unsatisfiable_range(self, client, download_file):
+        """测试无法满足的范围返回 416"""
+        response = client.get(download_file, headers={'Range': f'bytes={len(CONTENT)}-'})
+        assert response.status_code == 416
+        assert response.headers['Content-Range'] == f'bytes */{len(CONTENT)}'
+
+    def test_conditional_requests(self, client, download_file):
+        """测试 If-None-Match 和 If-Range"""
+        etag = client.get(download_file).headers['ETag']
+
+        response = client.get(download_file, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+
+        response = client.get(download_file, headers={'Range': 'bytes=0-9', 'If-Range': etag})
+        assert response.status_code == 206
+
+        response = client.get(download_file, headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+        assert response.status_code == 200
+        assert response.data == CONTENT
+
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+文件索引（有序索引、游标分页和增量）单元测试
+"""
+
+import os
+import sys
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.services.cache.file_index import FileIndex, decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def index(tmp_path):
+    """包含大小和修改时间各不相同的文件的索引"""
+    for number, name in enumerate(['c.txt', 'a.pdf', 'b.txt', 'ab.zip', 'd.PDF']):
+        path = tmp_path / name
+        path.write_bytes(b'x' * (number + 1) * 10)
+        os.utime(path, (1000 + number, 1000 + number))
+    index = FileIndex(str(tmp_path))
+    index.rescan()
+    return index
+
+
+def page_names(items):
+    """文件名列表"""
+    return [item['name'] for item in items]
+
+
+def collect(index, **kwargs):
+    """按页读取全部结果"""
+    names, after = [], None
+    while True:
+        items, after, total = index.query(after=after, **kwargs)
+        names.extend(page_names(items))
+        if after is None:
+            return names, total
+
+
+class TestFileIndex:
+    """文件索引测试类"""
+
+    def test_sorted_pages(self, index):
+        """测试按各字段排序分页"""
+        assert collect(index, field='name', limit=2) == (['a.pdf', 'ab.zip', 'b.txt', 'c.txt', 'd.PDF'], 5)
+        assert collect(index, field='size', descending=True, limit=2)[0] == ['d.PDF', 'ab.zip', 'b.txt', 'a.pdf', 'c.txt']
+        assert collect(index, field='mtime', limit=3)[0] == ['c.txt', 'a.pdf', 'b.txt', 'ab.zip', 'd.PDF']
+
+    def test_filters(self, index):
+        """测试前缀和扩展名过滤"""
+        assert collect(index, field='name', prefix='a', limit=1) == (['a.pdf', 'ab.zip'], 2)
+        assert collect(index, field='name', descending=True, prefix='a', limit=1)[0] == ['ab.zip', 'a.pdf']
+        assert collect(index, field='size', extensions=['pdf'], limit=1) == (['a.pdf', 'd.PDF'], 2)
+
+    def test_incremental_update(self, index, tmp_path):
+        """测试文件变化后有序索引保持正确，游标不受影响"""
+        items, after, _ = index.query('name', limit=2)
+        assert page_names(items) == ['a.pdf', 'ab.zip']
+
+        (tmp_path / 'a.pdf').unlink()
+        (tmp_path / 'aa.bin').write_bytes(b'x' * 1000)
+        (tmp_path / 'bb.txt').write_bytes(b'x')
+        index.update(['a.pdf', 'aa.bin', 'bb.txt'])
+
+        items, _, total = index.query('name', limit=10, after=after)
+        assert page_names(items) == ['b.txt', 'bb.txt', 'c.txt', 'd.PDF']
+        assert total == 6
+        assert page_names(index.query('size', descending=True, limit=1)[0]) == ['aa.bin']
+        assert page_names(index.files())[:2] == ['aa.bin', 'ab.zip']
+
+    def test_deltas(self, index, tmp_path):
+        """测试每批变化生成一个增量，版本号连续递增"""
+        deltas = []
+        index.set_listener(deltas.append)
+        files, revision = index.snapshot()
+        assert len(files) == 5
+
+        (tmp_path / 'a.pdf').unlink()
+        (tmp_path / 'e.txt').write_bytes(b'new')
+        (tmp_path / 'c.txt').write_bytes(b'changed content')
+        index.update(['a.pdf', 'e.txt', 'c.txt', 'missing.txt'])
+        # 没有变化时不生成增量
+        index.update(['b.txt'])
+
+        assert len(deltas) == 1
+        delta = deltas[0]
+        assert (delta['base_revision'], delta['revision']) == (revision, revision + 1)
+        assert page_names(delta['added']) == ['e.txt']
+        assert delta['removed'] == ['a.pdf']
+        assert page_names(delta['modified']) == ['c.txt']
+        assert delta['modified'][0]['size'] == 15
+
+        # 重新扫描时与原索引比较
+        (tmp_path / 'e.txt').unlink()
+        index.rescan()
+        index.rescan()
+        assert [d['removed'] for d in deltas[1:]] == [['e.txt']]
+        assert index.snapshot()[1] == revision + 2
+
+    def test_cursor_round_trip(self):
+        """测试游标编码和校验"""
+        cursor = encode_cursor('mtime', True, (1000.5, 'a.txt'))
+        assert decode_cursor(cursor, 'mtime', True) == (1000.5, 'a.txt')
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, 'name', True)
+        with pytest.raises(ValueError):
+            decode_cursor('not a cursor', 'name', False)
+
+
+class TestFilesPageAPI:
+    """分页文件列表API测试类"""
+
+    def test_paginated_listing(self, client):
+        """测试分页参数和错误参数"""
+        response = client.get('/api/v1/files?limit=1&sort=size&order=desc')
+        data = response.get_json()
+        assert response.status_code == 200
+        assert 'next_cursor' in data and 'total' in data
+
+        assert client.get('/api/v1/files?limit=0').status_code == 400
+        assert client.get('/api/v1/files?sort=owner').status_code == 400
+        assert client.get('/api/v1/files?cursor=bogus').status_code == 400
+
+    def test_full_listing_revision(self, client):
+        """测试完整列表带有版本号"""
+        data = client.get('/api/v1/files').get_json()
+        assert isinstance(data['revision'], int)
+
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])
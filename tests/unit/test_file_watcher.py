@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+文件列表监视器单元测试
+"""
+
+import os
+import sys
+import time
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.services.cache.file_index import FileIndex
+from app.services.cache.file_watcher import InotifyWatcher, PollingWatcher, create_watcher
+
+
+def names(index):
+    """索引中的文件名"""
+    return [info['name'] for info in index.files()]
+
+
+def write(path, data=b'data'):
+    """写入测试文件"""
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+class TestFileWatcher:
+    """文件列表监视器测试类"""
+
+    @pytest.mark.skipif(not sys.platform.startswith('linux'), reason='inotify 仅在 Linux 上可用')
+    def test_inotify_updates(self, tmp_path):
+        """测试 inotify 监视器只更新变化的文件"""
+        write(tmp_path / 'b.txt')
+        index = FileIndex(str(tmp_path))
+        watcher = create_watcher(index, 'inotify', 60)
+        assert isinstance(watcher, InotifyWatcher)
+        try:
+            assert names(index) == ['b.txt']
+
+            write(tmp_path / 'a.txt', b'12345')
+            os.mkdir(tmp_path / 'subdir')
+            watcher.sync()
+            assert names(index) == ['a.txt', 'b.txt']
+            assert index.files()[0]['size'] == 5
+
+            os.rename(tmp_path / 'b.txt', tmp_path / 'c.txt')
+            os.remove(tmp_path / 'a.txt')
+            watcher.sync()
+            assert names(index) == ['c.txt']
+        finally:
+            watcher.stop()
+
+    @pytest.mark.skipif(not sys.platform.startswith('linux'), reason='inotify 仅在 Linux 上可用')
+    def test_inotify_background_thread(self, tmp_path):
+        """测试后台线程在没有读取时也会处理外部变化"""
+        index = FileIndex(str(tmp_path))
+        watcher = create_watcher(index, 'auto', 60)
+        watcher.start()
+        try:
+            write(tmp_path / 'external.bin')
+            deadline = time.monotonic() + 5
+            while names(index) != ['external.bin'] and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert names(index) == ['external.bin']
+        finally:
+            watcher.stop()
+
+    def test_polling_mark_dirty(self, tmp_path):
+        """测试轮询监视器在本进程修改后重新扫描"""
+        index = FileIndex(str(tmp_path))
+        watcher = create_watcher(index, 'polling', 60)
+        assert isinstance(watcher, PollingWatcher)
+
+        write(tmp_path / 'x.txt')
+        watcher.sync()
+        assert names(index) == []
+
+        watcher.mark_dirty()
+        watcher.sync()
+        assert names(index) == ['x.txt']
+
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])
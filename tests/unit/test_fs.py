@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+目录扫描工具单元测试
+"""
+
+import os
+import sys
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.utils.fs import scan_files
+
+
+class TestScanFiles:
+    """目录扫描测试类"""
+
+    def test_only_regular_files(self, tmp_path):
+        """测试只返回普通文件及其大小和修改时间"""
+        (tmp_path / 'a.txt').write_bytes(b'12345')
+        (tmp_path / 'subdir').mkdir()
+        (tmp_path / 'subdir' / 'nested.txt').write_bytes(b'x')
+
+        entries = scan_files(str(tmp_path))
+
+        assert [entry.name for entry in entries] == ['a.txt']
+        entry = entries[0]
+        assert entry.path == os.path.join(str(tmp_path), 'a.txt')
+        assert entry.size == 5
+        assert entry.mtime == os.path.getmtime(entry.path)
+
+    def test_missing_directory(self, tmp_path):
+        """测试目录不存在时返回空列表"""
+        assert scan_files(str(tmp_path / 'missing')) == []
+
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])
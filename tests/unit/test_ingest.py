@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分块流式写入单元测试
+"""
+
+import io
+import os
+import sys
+import hashlib
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.core.file_transfer.chunk_index import ChunkIndex
+from app.core.file_transfer.merge_queue import wait_for_merge
+from app.services.file.ingest import ingest_chunk_file
+from app.services.file.direct_write import DirectWriteFile
+from app.core.exceptions import ChunkUploadError
+
+
+class ShortReadStream(io.BytesIO):
+    """每次最多返回少量字节的流，模拟网络请求体"""
+
+    def read(self, size=-1):
+        return super().read(min(size, 1000) if size and size > 0 else 1000)
+
+
+class TestIngest:
+    """分块流式写入测试类"""
+
+    def test_ingest_chunk_file(self, tmp_path):
+        """测试按缓冲区写入块文件并增量计算哈希"""
+        data = os.urandom(10000)
+        index = ChunkIndex(str(tmp_path))
+
+        record = ingest_chunk_file(index, 3, ShortReadStream(data), buffer_size=4096)
+        assert record.hash == hashlib.md5(data).hexdigest()
+        assert record.size == len(data)
+        with open(record.path, 'rb') as f:
+            assert f.read() == data
+
+        # 重复上传相同的块不会产生新文件，也不会残留临时文件
+        assert ingest_chunk_file(index, 3, io.BytesIO(data)).path == record.path
+        assert os.listdir(str(tmp_path)) == [os.path.basename(record.path)]
+
+    def test_ingest_empty_chunk(self, tmp_path):
+        """测试空块被拒绝且不残留临时文件"""
+        index = ChunkIndex(str(tmp_path))
+        with pytest.raises(ChunkUploadError):
+            ingest_chunk_file(index, 0, io.BytesIO(b''))
+        assert os.listdir(str(tmp_path)) == []
+
+    def test_direct_write_stream(self, tmp_path):
+        """测试直写模式下从流写入块并校验长度"""
+        content = os.urandom(2500)
+        writer = DirectWriteFile(str(tmp_path / 'tmp'), 'a.dat', len(content), 1024)
+        for block in range(writer.total_blocks):
+            data = content[block * 1024:(block + 1) * 1024]
+            writer.write_block_stream(block, ShortReadStream(data), buffer_size=300)
+        writer.finalize(str(tmp_path / 'a.dat'))
+        with open(str(tmp_path / 'a.dat'), 'rb') as f:
+            assert f.read() == content
+
+        writer = DirectWriteFile(str(tmp_path / 'tmp2'), 'b.dat', len(content), 1024)
+        with pytest.raises(ChunkUploadError):
+            writer.write_block_stream(0, io.BytesIO(content[:1025]))
+        assert not writer.has_block(0)
+
+
+class TestRawChunkUpload:
+    """原始请求体分块上传测试类"""
+
+    def test_octet_stream_upload(self, client, tmp_path, monkeypatch):
+        """测试以 application/octet-stream 上传分块"""
+        from app.core.file_transfer import transfer_manager
+        monkeypatch.setattr(transfer_manager, 'UPLOAD_FOLDER', str(tmp_path))
+        monkeypatch.setattr(transfer_manager, 'TEMP_CHUNKS_DIR', str(tmp_path / 'chunks'))
+
+        content = os.urandom(3000)
+        for chunk_number in (1, 0):
+            response = client.post(
+                '/api/v1/upload/chunk',
+                query_string={'filename': 'raw.dat', 'chunk_number': chunk_number, 'total_chunks': 2},
+                data=content[chunk_number * 2000:(chunk_number + 1) * 2000],
+                content_type='application/octet-stream'
+            )
+            assert response.json['success'] is True
+
+        assert response.json['status'] == 'merging'
+        wait_for_merge('raw.dat', timeout=10)
+        with open(str(tmp_path / 'raw.dat'), 'rb') as f:
+            assert f.read() == content
+
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])
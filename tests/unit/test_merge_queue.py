@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+后台合并任务队列单元测试
+"""
+
+import os
+import sys
+import time
+import threading
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.core.file_transfer.merge_queue import MergeQueue, merge_queue
+
+
+class TestMergeQueue:
+    """合并任务队列测试类"""
+
+    def test_events_and_concurrency(self):
+        """测试合并事件和并发任务数限制"""
+        queue = MergeQueue(max_workers=2)
+        events = []
+        queue.set_notifier(events.append)
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def job(name):
+            with lock:
+                running.append(name)
+                peak.append(len(running))
+            time.sleep(0.05)
+            queue.report_progress(name, 1, 1)
+            with lock:
+                running.remove(name)
+            return {'status': 'completed'}
+
+        futures = [queue.submit(f'{i}.dat', job, f'{i}.dat') for i in range(5)]
+        assert [f.result(5) for f in futures] == [{'status': 'completed'}] * 5
+        queue.shutdown()
+
+        assert max(peak) == 2
+        a_events = [e for e in events if e['filename'] == '0.dat']
+        assert [e['status'] for e in a_events] == ['merging', 'merging', 'completed']
+        assert a_events[1]['progress'] == 1.0
+
+    def test_failed_job(self):
+        """测试任务抛出异常时发送失败事件"""
+        queue = MergeQueue(max_workers=1)
+        events = []
+        queue.set_notifier(events.append)
+
+        def job():
+            raise OSError('disk full')
+
+        assert queue.submit('b.dat', job).result(5)['status'] == 'failed'
+        queue.shutdown()
+        assert events[-1]['status'] == 'failed'
+        assert events[-1]['error'] == 'disk full'
+
+
+class TestBackgroundMerge:
+    """分块上传后台合并测试类"""
+
+    def test_last_chunk_returns_merging(self, client, tmp_path, monkeypatch):
+        """测试最后一块立即返回合并中，合并完成后发送完成事件"""
+        from app.core.file_transfer import transfer_manager
+        monkeypatch.setattr(transfer_manager, 'UPLOAD_FOLDER', str(tmp_path))
+        monkeypatch.setattr(transfer_manager, 'TEMP_CHUNKS_DIR', str(tmp_path / 'chunks'))
+        events = []
+        monkeypatch.setattr(merge_queue, '_notifier', events.append)
+
+        content = os.urandom(5000)
+        statuses = []
+        for chunk_number in range(3):
+            response = client.post(
+                '/api/v1/upload/chunk',
+                query_string={'filename': 'bg.dat', 'chunk_number': chunk_number, 'total_chunks': 3},
+                data=content[chunk_number * 2000:(chunk_number + 1) * 2000],
+                content_type='application/octet-stream'
+            )
+            statuses.append(response.json['status'])
+
+        assert statuses == ['chunk_uploaded', 'chunk_uploaded', 'merging']
+        merge_queue.wait('bg.dat', timeout=10)
+
+        assert events[-1] == {'filename': 'bg.dat', 'status': 'completed', 'paused': False}
+        assert client.get('/api/v1/upload/bg.dat/state').json['status'] == 'completed'
+        with open(str(tmp_path / 'bg.dat'), 'rb') as f:
+            assert f.read() == content
+
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+并发分块上传单元测试
+"""
+
+import os
+import sys
+import random
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.core.file_transfer.merge_queue import wait_for_merge
+
+
+class TestParallelChunkUpload:
+    """并发分块上传测试类"""
+
+    @pytest.mark.parametrize('direct_write', [True, False])
+    def test_out_of_order_concurrent_chunks(self, app, tmp_path, monkeypatch, direct_write):
+        """测试乱序并发上传分块时文件只被合并一次"""
+        from app.core.file_transfer import transfer_manager
+        monkeypatch.setattr(transfer_manager, 'UPLOAD_FOLDER', str(tmp_path))
+        monkeypatch.setattr(transfer_manager, 'TEMP_CHUNKS_DIR', str(tmp_path / 'chunks'))
+
+        chunk_size = 4096
+        content = os.urandom(chunk_size * 12 + 100)
+        total_chunks = -(-len(content) // chunk_size)
+        filename = f"parallel_{direct_write}.dat"
+
+        def send(chunk_number):
+            params = {'filename': filename, 'chunk_number': chunk_number, 'total_chunks': total_chunks}
+            if direct_write:
+                params.update(file_size=len(content), chunk_size=chunk_size)
+            with app.test_client() as client:
+                response = client.post(
+                    '/api/v1/upload/chunk',
+                    query_string=params,
+                    data=content[chunk_number * chunk_size:(chunk_number + 1) * chunk_size],
+                    content_type='application/octet-stream'
+                )
+            return response.json['status']
+
+        order = list(range(total_chunks))
+        random.shuffle(order)
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            statuses = list(pool.map(send, order))
+
+        # 只有一个请求提交合并任务，合并在后台完成
+        assert statuses.count('merging') == 1
+        wait_for_merge(filename, timeout=10)
+        with open(str(tmp_path / filename), 'rb') as f:
+            assert f.read() == content
+
+        state = transfer_manager.TransferManager.get_upload_state(filename)
+        assert state['status'] == 'completed'
+        assert len(state['uploaded_chunks']) == total_chunks
+
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+上传会话存储单元测试
+"""
+
+import os
+import sys
+import pytest
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.core.config import UPLOAD_STATUS
+from app.core.file_transfer.session_store import UploadSessionStore
+
+
+def new_state(status=UPLOAD_STATUS['UPLOADING']):
+    """创建上传状态"""
+    return {
+        'status': status,
+        'last_chunk': 0,
+        'total_chunks': 100,
+        'timestamp': datetime.now(),
+        'uploaded_chunks': set(),
+        'failed_chunks': set(),
+        'error': None
+    }
+
+
+class TestUploadSessionStore:
+    """上传会话存储测试类"""
+
+    def test_restore_after_restart(self, tmp_path):
+        """测试重新打开存储后恢复会话和已上传的块"""
+        db_path = str(tmp_path / 'sessions.sqlite3')
+        store = UploadSessionStore(db_path)
+        store['a.dat'] = new_state()
+        store['a.dat']['uploaded_chunks'].update([0, 1, 2])
+        store['a.dat']['failed_chunks'].add(5)
+        store.save('a.dat', chunks=[0, 1, 2])
+        store['a.dat']['uploaded_chunks'].discard(1)
+        store.save('a.dat', removed=[1])
+        store['b.dat'] = new_state(UPLOAD_STATUS['MERGING'])
+        store.close()
+
+        restored = UploadSessionStore(db_path)
+        assert set(restored) == {'a.dat', 'b.dat'}
+        assert restored['a.dat']['uploaded_chunks'] == {0, 2}
+        assert restored['a.dat']['failed_chunks'] == {5}
+        assert isinstance(restored['a.dat']['timestamp'], datetime)
+        # 重启时中断的合并恢复为上传中
+        assert restored['b.dat']['status'] == UPLOAD_STATUS['UPLOADING']
+
+        del restored['b.dat']
+        restored.close()
+        assert 'b.dat' not in UploadSessionStore(db_path)
+
+    def test_concurrent_updates(self, tmp_path):
+        """测试并发更新同一个会话"""
+        store = UploadSessionStore(str(tmp_path / 'sessions.sqlite3'))
+        store['c.dat'] = new_state()
+
+        def add_chunk(number):
+            with store.lock('c.dat'):
+                store['c.dat']['uploaded_chunks'].add(number)
+                store.save('c.dat', chunks=(number,))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(add_chunk, range(100)))
+        store.close()
+
+        assert UploadSessionStore(store.db_path)['c.dat']['uploaded_chunks'] == set(range(100))
+
+    def test_memory_only(self):
+        """测试不使用数据库时仅保存在内存中"""
+        store = UploadSessionStore()
+        store['d.dat'] = new_state()
+        store.save('d.dat', chunks=(1,))
+        assert store.pop('d.dat')['status'] == UPLOAD_STATUS['UPLOADING']
+        assert len(store) == 0
+
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])